@@ -4,5 +4,11 @@ from . import models
 
 admin.site.register(models.User)
 admin.site.register(models.Project)
+admin.site.register(models.Todo)
 admin.site.register(models.Stamp)
-admin.site.register(models.Main)
\ No newline at end of file
+admin.site.register(models.Subelement)
+admin.site.register(models.SubelementArg)
+admin.site.register(models.Main)
+admin.site.register(models.Ledger)
+admin.site.register(models.Daily)
+admin.site.register(models.Tombstone)
\ No newline at end of file
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class RestapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restAPI'
+
+    def ready(self):
+        from . import database
+        connection_created.connect(database.apply_sqlite_profile, dispatch_uid='restAPI.apply_sqlite_profile')
+
+        from . import auth_cache
+        user_model = self.get_model('User')
+        post_save.connect(auth_cache.invalidate_user, sender=user_model, dispatch_uid='restAPI.invalidate_user')
+        post_delete.connect(auth_cache.invalidate_user, sender=user_model, dispatch_uid='restAPI.invalidate_user')
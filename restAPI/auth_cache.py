@@ -0,0 +1,55 @@
+# auth_cache.py
+# logged in user of the session, cached in settings.USER_CACHE. the session itself is cached by the cached_db engine.
+# so the authentication of the usual request reads no row of django_session or restAPI_user.
+# cached user is dropped when the user row is saved or deleted. (User_UPDATE, set_password, last_login, admin)
+# other worker processes of LocMemCache keep it until USER_CACHE_TIMEOUT, so the timeout is short.
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+from .hashing import passwords
+
+
+def user_cache():
+    return caches[getattr(settings, 'USER_CACHE', 'default')]
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+class Cached_backend(ModelBackend):
+    """
+    # Cached_backend
+        - ModelBackend whose get_user() is cached. the permissions are same as ModelBackend.
+        - authenticate() checks the password in hashing.passwords, so the logins of api_auth/ and BasicAuthentication
+          share the concurrency limit of the hashing.
+        - get_user() runs on every request of the session by django.contrib.auth.get_user(),
+          which still verifies the session hash with the cached user, so the password change logs out the other sessions.
+        - inactive user is not cached, ModelBackend returns None for it.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        return passwords.run(super().authenticate, request, username, password, **kwargs)
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = user_cache().get(key)
+        if user == None:
+            user = super().get_user(user_id)
+            if user != None:
+                user_cache().set(key, user, getattr(settings, 'USER_CACHE_TIMEOUT', 60))
+        return user
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """
+    # invalidate_user
+        - post_save, post_delete receiver of the user model.
+        - dropped again after the commit, so get_user() between the save and the commit cannot keep the old row.
+    """
+    key = user_key(instance.pk)
+    user_cache().delete(key)
+    transaction.on_commit(lambda: user_cache().delete(key))
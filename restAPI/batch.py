@@ -0,0 +1,179 @@
+# batch.py
+# operations of api/batch. each operation is the existing view of api/<op>, called in the process with an inner request,
+# so the batch has the same validations and the same response bodies as the sequential calls.
+
+import io
+import json
+import re
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, transaction
+from django.urls import Resolver404, resolve
+
+from . import subelement as sub
+
+
+OPERATIONS = ('project/', 'stamp/', 'main/') # paths under api/ that a batch can run.
+
+WRITE = re.compile(r'(?:INSERT INTO|UPDATE|DELETE FROM) "(\w+)"')
+TOUCH = re.compile(r'UPDATE "\w+" SET "updated_at" = %s, "change_seq" = %s WHERE ')
+REFERENCE = re.compile(r'\$(\d+)\.(\w+)')
+
+
+class Object_cache():
+    """
+    # Object_cache
+        - rows fetched by IsOwner_permission_Mixin.fetch_validation() during one batch, keyed by the SQL of the queryset.
+        - entry is dropped when an operation writes into any table its query reads. (seen by connection.execute_wrapper)
+        - touch of updated_at, change_seq alone keeps the entries. no serializer shows updated_at, and the rows are the same rows.
+    """
+
+    def __init__(self):
+        self._entries = {} # (sql, params) -> (tables, rows)
+        self.hits = 0
+
+    def fetch(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        key = (sql, tuple(params))
+        entry = self._entries.get(key)
+        if entry != None:
+            self.hits += 1
+            return list(entry[1])
+        rows = list(queryset)
+        tables = {join.table_name for join in queryset.query.alias_map.values()}
+        self._entries[key] = (tables, rows)
+        return list(rows)
+
+    def written(self, table):
+        self._entries = {key: entry for key, entry in self._entries.items() if table not in entry[0]}
+
+    def watch(self, execute, sql, params, many, context):
+        # connection.execute_wrapper()
+        match = WRITE.match(sql)
+        if match != None and TOUCH.match(sql) == None:
+            self.written(match.group(1))
+        return execute(sql, params, many, context)
+
+
+def inner_request(request, op, params):
+    """
+    # inner_request
+        - POST request of api/<op>, urlencoded from params. rendered as JSON.
+        - user is forced to the batch's user, so the operation runs no authentication and no csrf check again.
+        - conditional headers of the batch are not passed, the operation always runs.
+    """
+    body = urlencode(params, doseq=True).encode()
+    environ = {name: value for name, value in request.META.items()
+               if not name.startswith('HTTP_IF_') and name not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'wsgi.input')}
+    environ.update({'REQUEST_METHOD': 'POST', 'PATH_INFO': f'/api/{op}', 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                    'CONTENT_TYPE': 'application/x-www-form-urlencoded', 'CONTENT_LENGTH': str(len(body)),
+                    'HTTP_ACCEPT': 'application/json', 'wsgi.input': io.BytesIO(body)})
+    inner = WSGIRequest(environ)
+    inner.user = request.user
+    inner._force_auth_user = request.user # rest_framework.request.ForcedAuthentication
+    return inner
+
+
+def resolve_references(params, results):
+    """
+    # resolve_references
+        - replace the param value "$<n>.<field>" by the field of the response data of the n-th operation.
+        - if the data is a list, its first row is used.
+    Raises
+        - ValueError : n is not an earlier operation, or its data has no field.
+    """
+    resolved = {}
+    for name, value in params.items():
+        match = REFERENCE.fullmatch(value) if isinstance(value, str) else None
+        if match != None:
+            number, field = int(match.group(1)), match.group(2)
+            if number >= len(results):
+                raise ValueError(f'{name} : {value} refers to the operation not run yet.')
+            data = results[number]['data']
+            if isinstance(data, list) and len(data) != 0:
+                data = data[0]
+            if not isinstance(data, dict) or field not in data:
+                raise ValueError(f'{name} : response of the operation {number} has no {field}.')
+            value = data[field]
+        resolved[name] = value
+    return resolved
+
+
+def response_data(response):
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        if hasattr(response, 'render'):
+            response.render()
+        content = response.content
+    if len(content) == 0:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode(errors='replace')
+
+
+def execute(request, user_id, operations):
+    """
+    # execute
+        - run the operations in order, in one transaction. stops at the first operation of status >= 400, then rolls back all.
+        - every operation gets the user_id of the batch, so the owner check of the batch covers them.
+        - compiled stamps cached during the rolled back operations are dropped. (sub.definitions.clear())
+    Args
+        - request : request of the batch, already authenticated and owner checked.
+        - user_id : user_id of the batch.
+        - operations : list of {'op': <path under api/>, 'params': {<name>: <value or list>}}, already validated.
+    Returns
+        - (committed, results) : results is [{'op', 'status', 'data'}] of the operations that ran.
+    """
+    objects = Object_cache()
+    results = []
+    committed = False
+    try:
+        with transaction.atomic(), connection.execute_wrapper(objects.watch):
+            for operation in operations:
+                op = operation['op']
+                try:
+                    params = resolve_references(operation['params'], results)
+                except ValueError as error:
+                    results.append({'op': op, 'status': 400, 'data': {'detail': str(error)}})
+                    transaction.set_rollback(True)
+                    break
+                match = resolve(f'/api/{op}')
+                inner = inner_request(request, op, {**params, 'user_id': user_id})
+                inner.batch_objects = objects
+                response = match.func(inner, *match.args, **match.kwargs)
+                results.append({'op': op, 'status': response.status_code, 'data': response_data(response)})
+                if response.status_code >= 400:
+                    transaction.set_rollback(True)
+                    break
+            else:
+                committed = True
+    finally:
+        if committed == False:
+            sub.definitions.clear()
+    return committed, results
+
+
+def validate_operations(operations):
+    # raises ValueError with the message of the first wrong operation.
+    limit = getattr(settings, 'BATCH_MAX_OPERATIONS', 100)
+    if not isinstance(operations, list) or len(operations) == 0:
+        raise ValueError('operations must be a non-empty list.')
+    if len(operations) > limit:
+        raise ValueError(f'at most {limit} operations in a batch.')
+    for number, operation in enumerate(operations):
+        if not isinstance(operation, dict) or not isinstance(operation.get('op'), str) or not isinstance(operation.get('params', {}), dict):
+            raise ValueError(f'operation {number} : must be {{"op": <str>, "params": <object>}}.')
+        op = operation['op']
+        if not op.startswith(OPERATIONS):
+            raise ValueError(f'operation {number} : {op} cannot run in a batch.')
+        try:
+            resolve(f'/api/{op}')
+        except Resolver404:
+            raise ValueError(f'operation {number} : {op} does not exist.')
+        operation.setdefault('params', {})
+    return operations
@@ -0,0 +1,684 @@
+# benchmarks.py
+# performance benchmarks of the api, run by "python manage.py bench <name>". see restAPI/management/commands/bench.py
+# every benchmark makes its own throwaway test database (settings.DATABASES TEST NAME), so the real db is never touched.
+# the numbers are printed, not asserted. the behaviours they rely on are asserted by restAPI/tests.py
+
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from . import models
+from . import push
+from . import serializers
+from . import subelement as sub
+from . import tokens
+from .broker import broker
+from .hashing import passwords
+
+
+@contextmanager
+def throwaway_db():
+    """
+    # throwaway_db
+        - create the test database, then destroy it at the end. same as the test runner, without the tests.
+        - caches are keyed by the ids, which the new db reuses, so they are cleared too.
+    """
+    creation = connections['default'].creation
+    old_name = creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    clear_caches()
+    try:
+        yield
+    finally:
+        connections.close_all()
+        creation.destroy_test_db(old_name, verbosity=0)
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    sub.definitions.clear()
+
+
+def bench_user(username):
+    # (user, logged in test client)
+    user = models.User.objects.create_user(username, f'{username}@bench.local', f'{username}-pass')
+    client = Client()
+    client.force_login(user)
+    return user, client
+
+
+def call(client, url, **data):
+    # (status, body) of the api view, body is decoded from JSON.
+    response = client.post('/api/' + url, data, HTTP_ACCEPT='application/json')
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, (json.loads(content) if len(content) != 0 else None)
+
+
+def percentiles(latencies, *points):
+    # milliseconds of the latencies (seconds) at the points (0~1).
+    ordered = sorted(latencies)
+    return [ordered[min(len(ordered) - 1, int(len(ordered) * point))] * 1000 for point in points]
+
+
+def scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def create_stamp(client, user_id, stamp_name, arg_names='lowerbound upperbound acc_lbound acc_ubound', arg_vals='0 100 0 100000000'):
+    # stamp with one accumulated discrete_point subelement 'pages'. returns the stamp_id.
+    status, body = call(client, 'stamp/create/stamp', user_id=user_id, stamp_name=stamp_name)
+    assert status == 201, (status, body)
+    status, body = call(client, 'stamp/create/subelement', user_id=user_id, stamp_name=stamp_name, subelement_name='pages',
+                        defFunc_name='discrete_point', arg_names=arg_names, arg_vals=arg_vals)
+    assert status == 201, (status, body)
+    return models.Stamp.objects.get(user_id=user_id, stamp_name=stamp_name).id
+
+
+def fill_history(user_id, stamp_id, count, last_date, value=1):
+    """
+    # fill_history
+        - count daily recodes of the stamp, ending at last_date, written by bulk_create.
+        - accumulate of each recode and the total of models.Ledger are same as the views would write.
+    """
+    first = last_date - datetime.timedelta(days=count - 1)
+    rows = []
+    for day in range(count):
+        date = first + datetime.timedelta(days=day)
+        rows += [models.Main(user_id_id=user_id, stamp_id_id=stamp_id, date=date),
+                 models.Main(user_id_id=user_id, stamp_id_id=stamp_id, date=date, arg_name='value', arg_val=str(value)),
+                 models.Main(user_id_id=user_id, stamp_id_id=stamp_id, date=date, arg_name='accumulate', arg_val=str(day * value))]
+    models.Main.objects.bulk_create(rows, batch_size=5000)
+    models.Daily.objects.bulk_create([models.Daily(user_id_id=user_id, stamp_id_id=stamp_id, date=first + datetime.timedelta(days=day),
+                                                   count=1, total=value)
+                                      for day in range(count)], batch_size=5000)
+    models.Ledger.objects.update_or_create(user_id_id=user_id, stamp_id_id=stamp_id, subelement_name='pages',
+                                           defaults={'total': count * value})
+
+
+def ledger(out, scale=1.0):
+    """
+    # ledger
+        - latency and queries of main/create/main, for the stamps of 10 to 100k recodes of history.
+        - accumulate is read from models.Ledger, so both stay flat while the history grows.
+    """
+    creates = scaled(200, scale)
+    with throwaway_db():
+        user, client = bench_user('ledger')
+        last = datetime.date(2020, 1, 1)
+        for history in (10, 1000, 10000, 100000):
+            history = scaled(history, scale)
+            stamp_id = create_stamp(client, user.id, f'history{history}')
+            fill_history(user.id, stamp_id, history, last)
+            latencies = []
+            for day in range(1, creates + 1):
+                date = last + datetime.timedelta(days=day)
+                started = time.perf_counter()
+                status, body = call(client, 'main/create/main', user_id=user.id, stamp_id=stamp_id, date=date, main_vals='1')
+                latencies.append(time.perf_counter() - started)
+                assert status == 201, (status, body)
+            with CaptureQueriesContext(connection) as queries:
+                call(client, 'main/create/main', user_id=user.id, stamp_id=stamp_id, date=last + datetime.timedelta(days=creates + 1), main_vals='1')
+            p50, p95 = percentiles(latencies, .5, .95)
+            out(f'history={history:6d} creates={creates} mean={statistics.mean(latencies) * 1000:6.2f}ms '
+                f'p50={p50:6.2f}ms p95={p95:6.2f}ms queries={len(queries.captured_queries)}')
+
+
+def bulk(out, scale=1.0):
+    """
+    # bulk
+        - recodes/s of main/create/main called per recode, against one main/create/bulk of the same recodes.
+        - a month and a year of daily recodes, for several stamps.
+    """
+    stamps = scaled(5, scale)
+    with throwaway_db():
+        user, client = bench_user('bulk')
+        first = datetime.date(2020, 1, 1)
+        for days in (30, 365):
+            days = scaled(days, scale)
+            for path in ('main', 'bulk'):
+                stamp_ids = [create_stamp(client, user.id, f'{path}{days}-{index}') for index in range(stamps)]
+                records = [{'stamp_id': stamp_id, 'date': str(first + datetime.timedelta(days=day)), 'main_vals': '3'}
+                           for stamp_id in stamp_ids for day in range(days)]
+                started = time.perf_counter()
+                if path == 'main':
+                    for record in records:
+                        status, body = call(client, 'main/create/main', user_id=user.id, **record)
+                        assert status == 201, (status, body)
+                    requests = len(records)
+                else:
+                    status, body = call(client, 'main/create/bulk', user_id=user.id, records=json.dumps(records))
+                    assert status == 201, (status, body)
+                    requests = 1
+                elapsed = time.perf_counter() - started
+                out(f'{path:4s} stamps={stamps} days={days:3d} recodes={len(records):5d} requests={requests:5d} '
+                    f'time={elapsed:6.2f}s recodes/s={len(records) / elapsed:8.1f}')
+
+
+def subelement(out, scale=1.0):
+    """
+    # subelement
+        - rows/s of stamp/create/subelement and stamp/update/subelement, on the file of the test database.
+        - the update writes the "untrusted" row of every past recode of the stamp, with the resync of accumulate.
+    """
+    subelements = scaled(200, scale)
+    args = {'defFunc_name': 'discrete_point', 'arg_names': 'lowerbound upperbound acc_lbound acc_ubound', 'arg_vals': '0 100 0 100000'}
+    with throwaway_db():
+        user, client = bench_user('subelement')
+        call(client, 'stamp/create/stamp', user_id=user.id, stamp_name='many')
+        started = time.perf_counter()
+        for index in range(subelements):
+            status, body = call(client, 'stamp/create/subelement', user_id=user.id, stamp_name='many', subelement_name=f'pages{index}', **args)
+            assert status == 201, (status, body)
+        elapsed = time.perf_counter() - started
+        rows = models.Subelement.objects.count() + models.SubelementArg.objects.count()
+        out(f'create subelement : subelements={subelements} rows={rows} time={elapsed:6.2f}s rows/s={rows / elapsed:8.1f}')
+
+        for recodes in (100, 2000, 20000):
+            recodes = scaled(recodes, scale)
+            stamp_id = create_stamp(client, user.id, f'history{recodes}', args['arg_names'], args['arg_vals'])
+            fill_history(user.id, stamp_id, recodes, datetime.date(2020, 1, 1))
+            before = models.Main.objects.count()
+            started = time.perf_counter()
+            status, body = call(client, 'stamp/update/subelement', user_id=user.id, stamp_name=f'history{recodes}', subelement_name='pages',
+                                defFunc_rename='discrete_point', arg_names=args['arg_names'], arg_vals='0 100 0 500')
+            elapsed = time.perf_counter() - started
+            assert status == 202, (status, body)
+            rows = models.Main.objects.count() - before
+            out(f'update subelement : recodes={recodes:5d} untrusted rows={rows:5d} time={elapsed:6.2f}s rows/s={rows / elapsed:8.1f}')
+
+
+def range_view(out, scale=1.0):
+    """
+    # range_view
+        - latency of main/retrieve/range on the user of 10 years of daily recodes of 3 stamps, among the recodes of another user.
+        - week, month and year views, then the whole 10 years read page by page with the cursor.
+    """
+    years = 10
+    repeat = scaled(50, scale)
+    with throwaway_db():
+        user, client = bench_user('range')
+        other, other_client = bench_user('other')
+        last = datetime.date(2023, 12, 31)
+        days = scaled(years * 365, scale)
+        for index in range(3):
+            fill_history(user.id, create_stamp(client, user.id, f'stamp{index}'), days, last)
+        fill_history(other.id, create_stamp(other_client, other.id, 'stamp0'), days, last)
+        first = last - datetime.timedelta(days=days - 1)
+
+        for name, date_from in (('week', last - datetime.timedelta(days=6)), ('month', last - datetime.timedelta(days=29)),
+                                ('year', last - datetime.timedelta(days=364))):
+            latencies = []
+            for _ in range(repeat):
+                caches['response'].clear()
+                started = time.perf_counter()
+                status, body = call(client, 'main/retrieve/range', user_id=user.id, date_from=date_from, date_to=last, limit=1000)
+                latencies.append(time.perf_counter() - started)
+                assert status == 200, (status, body)
+            p50, p95 = percentiles(latencies, .5, .95)
+            out(f'{name:5s} view : days={len(body["days"]):3d} p50={p50:7.2f}ms p95={p95:7.2f}ms')
+
+        caches['response'].clear()
+        pages = 0
+        recodes = 0
+        cursor = ''
+        started = time.perf_counter()
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                status, body = call(client, 'main/retrieve/range', user_id=user.id, date_from=first, date_to=last, limit=1000, cursor=cursor)
+            assert status == 200, (status, body)
+            pages += 1
+            recodes += sum(len(stamps) for stamps in body['days'].values())
+            if body['cursor'] == None:
+                break
+            cursor = body['cursor']
+        elapsed = time.perf_counter() - started
+        out(f'{years} years by pages : recodes={recodes} pages={pages} time={elapsed:6.2f}s '
+            f'per page={elapsed / pages * 1000:7.2f}ms queries of the last page={len(queries.captured_queries)}')
+
+
+def measure(function):
+    # (result, cpu seconds, peak bytes traced) of function(). cpu is timed without tracemalloc, which slows the allocations.
+    function()
+    started = time.process_time()
+    result = function()
+    cpu = time.process_time() - started
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, cpu, peak
+
+
+def list_views(out, scale=1.0):
+    """
+    # list_views
+        - cpu and peak allocation of the retrieve views over 100k rows, against ModelSerializer of the same rows.
+        - the views read values_list() and render the rows directly, the bytes must be same as the serializer's.
+    """
+    rows = scaled(100000, scale)
+    with throwaway_db():
+        user, client = bench_user('lists')
+        stamp_id = create_stamp(client, user.id, 'big')
+        subelement = models.Subelement.objects.get(stamp_id=stamp_id)
+        models.SubelementArg.objects.bulk_create([models.SubelementArg(subelement_id=subelement, arg_name=f'arg{index}', arg_val=str(index))
+                                                  for index in range(rows)], batch_size=5000)
+        models.Subelement.objects.bulk_create([models.Subelement(stamp_id_id=stamp_id, subelement_name=f'subelement{index}',
+                                                                 defFunc_name='discrete_point')
+                                               for index in range(rows)], batch_size=5000)
+        models.Stamp.objects.bulk_create([models.Stamp(user_id=user, stamp_name=f'stamp{index}') for index in range(rows)], batch_size=5000)
+        call(client, 'project/create/project', user_id=user.id, project_name='big')
+        project = models.Project.objects.get(user_id=user, project_name='big')
+        models.Todo.objects.bulk_create([models.Todo(project_id=project, todo_name=f'todo{index}') for index in range(rows)], batch_size=5000)
+        models.Project.objects.bulk_create([models.Project(user_id=user, project_name=f'project{index}') for index in range(rows)], batch_size=5000)
+
+        cases = [('project/retrieve/project', {'project_name': 'big'}, serializers.Project_all,
+                  models.Todo.objects.filter(project_id__project_name='big', project_id__user_id=user.id).select_related('project_id')),
+                 ('project/retrieve/user', {}, serializers.Project_project, models.Project.objects.filter(user_id=user.id)),
+                 ('project/retrieve/list', {}, serializers.Project_count,
+                  models.Project.objects.filter(user_id=user.id).annotate(todo_count=Count('todo_project')).order_by('id')),
+                 ('stamp/retrieve/user', {}, serializers.Stamp_stamp, models.Stamp.objects.filter(user_id=user.id)),
+                 ('stamp/retrieve/stamp', {'stamp_name': 'big'}, serializers.Stamp_subelement,
+                  models.Subelement.objects.filter(stamp_id__stamp_name='big', stamp_id__user_id=user.id).select_related('stamp_id')),
+                 ('stamp/retrieve/subelement', {'stamp_name': 'big', 'subelement_name': 'pages'}, serializers.Stamp_all,
+                  models.SubelementArg.objects.filter(subelement_id__stamp_id__stamp_name='big', subelement_id__subelement_name='pages',
+                                                      subelement_id__stamp_id__user_id=user.id).select_related('subelement_id__stamp_id'))]
+        for url, data, serializer_class, queryset in cases:
+            def view():
+                caches['response'].clear()
+                response = client.post('/api/' + url, {'user_id': user.id, **data}, HTTP_ACCEPT='application/json')
+                return b''.join(response.streaming_content) if response.streaming else response.content
+
+            def serializer():
+                return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+            view_bytes, view_cpu, view_peak = measure(view)
+            serializer_bytes, serializer_cpu, serializer_peak = measure(serializer)
+            same = 'same' if view_bytes == serializer_bytes else 'DIFFERENT'
+            out(f'{url:26s} rows={len(json.loads(view_bytes)):6d} cpu={view_cpu:5.2f}s (serializer {serializer_cpu:5.2f}s) '
+                f'peak={view_peak / 2**20:6.1f}MB (serializer {serializer_peak / 2**20:6.1f}MB) '
+                f'bytes {same} sha1={hashlib.sha1(view_bytes).hexdigest()[:12]}')
+
+
+async def asgi_call(application, path, data, headers=()):
+    # (status, body) of one POST through the asgi application, in the running event loop. no server, no socket.
+    body = urlencode(data).encode()
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+             'headers': [(b'host', b'testserver'), (b'content-type', b'application/x-www-form-urlencoded'),
+                         (b'content-length', str(len(body)).encode()), (b'accept', b'application/json'), *headers],
+             'client': ('127.0.0.1', 1), 'server': ('testserver', 80)}
+    sent = False
+    response = {'status': None, 'body': b''}
+
+    async def receive():
+        nonlocal sent
+        if sent == False:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait() # no disconnect until the response is sent.
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    await application(scope, receive, send)
+    return response['status'], response['body']
+
+
+async def asgi_load(application, path, data, headers, concurrency, total):
+    # (requests/s, latencies) of total requests, sent by concurrency clients at once.
+    latencies = []
+    requests = iter(range(total))
+
+    async def client():
+        for _ in requests:
+            started = time.perf_counter()
+            status, body = await asgi_call(application, path, data, headers)
+            latencies.append(time.perf_counter() - started)
+            assert status == 200, (path, status, body[:200])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return total / (time.perf_counter() - started), latencies
+
+
+def async_views(out, scale=1.0):
+    """
+    # async_views
+        - requests/s and latency of the sync retrieve views against their api/async/ versions, under the asgi application.
+        - 100 clients at once, Bearer token. responses of the both are checked equal first.
+    """
+    concurrency = 100
+    total = scaled(2000, scale)
+    from sticker_grasser_main.asgi import application
+
+    with throwaway_db():
+        user, client = bench_user('asgi')
+        headers = ((b'authorization', b'Bearer ' + tokens.issue(user)['access'].encode()),)
+        for index in range(50):
+            call(client, 'project/create/project', user_id=user.id, project_name=f'project{index}')
+            call(client, 'project/create/todo', user_id=user.id, project_name=f'project{index}', todo_name='todo')
+        stamp_ids = [create_stamp(client, user.id, f'stamp{index}') for index in range(10)]
+        first = datetime.date(2023, 1, 1)
+        call(client, 'main/create/bulk', user_id=user.id,
+             records=json.dumps([{'stamp_id': stamp_id, 'date': str(first + datetime.timedelta(days=day)), 'main_vals': '3'}
+                                 for stamp_id in stamp_ids for day in range(200)]))
+        cases = [('project/retrieve/list', {}),
+                 ('stamp/retrieve/tree', {}),
+                 ('main/retrieve/range', {'date_from': '2023-01-01', 'date_to': '2023-12-31', 'limit': 100}),
+                 ('main/heatmap', {'year': 2023, 'stamp_id': stamp_ids[0]})]
+
+        async def run():
+            for url, data in cases:
+                data = {'user_id': user.id, **data}
+                sync = await asgi_call(application, '/api/' + url, data, headers)
+                assert sync == await asgi_call(application, '/api/async/' + url, data, headers), url
+                for path in ('/api/' + url, '/api/async/' + url):
+                    await asgi_load(application, path, data, headers, concurrency, total) # warm
+                    rps, latencies = await asgi_load(application, path, data, headers, concurrency, total)
+                    p50, p99 = percentiles(latencies, .5, .99)
+                    out(f'{path:38s} concurrency={concurrency} requests={total} rps={rps:7.1f} p50={p50:7.1f}ms p99={p99:7.1f}ms')
+
+        asyncio.run(run())
+
+
+def subscribers(out, scale=1.0):
+    """
+    # subscribers
+        - thousands of idle api/push connections of one user, held by the asgi application in one event loop.
+        - traced memory per connection, then the time until one change event reaches every connection.
+    """
+    count = scaled(5000, scale)
+    # imported here, the asgi module makes the django application when it is imported.
+    from sticker_grasser_main.asgi import application
+
+    with throwaway_db():
+        user, client = bench_user('subscriber')
+        authorization = b'Bearer ' + tokens.issue(user)['access'].encode()
+
+        async def run():
+            received = [0]
+            disconnects = []
+
+            async def send(message):
+                if message.get('body', b'').startswith(b'event:'):
+                    received[0] += 1
+
+            def subscribe():
+                disconnect = asyncio.Event()
+                disconnects.append(disconnect)
+
+                async def receive():
+                    await disconnect.wait()
+                    return {'type': 'http.disconnect'}
+                scope = {'type': 'http', 'path': '/api/push', 'query_string': b'', 'headers': [(b'authorization', authorization)]}
+                return asyncio.ensure_future(application(scope, receive, send))
+
+            # the first connection loads the modules and the user cache.
+            streams = [subscribe()]
+            while broker.count() < 1:
+                await asyncio.sleep(0.01)
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            streams += [subscribe() for _ in range(count - 1)]
+            while broker.count() < count:
+                await asyncio.sleep(0.05)
+            connected = time.perf_counter() - started
+            await asyncio.sleep(0.5)
+            held = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            out(f'subscribers={broker.count()} connect={connected:5.2f}s per connection={held / max(1, count - 1) / 1024:5.2f}KiB '
+                f'maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB')
+
+            # the write view runs in a worker thread, and publishes after its commit.
+            started = time.perf_counter()
+            writer = threading.Thread(target=call, args=(client, 'stamp/create/stamp'), kwargs={'user_id': user.id, 'stamp_name': 'pushed'})
+            writer.start()
+            while received[0] < count:
+                await asyncio.sleep(0.01)
+            out(f'delivered={received[0]} in {time.perf_counter() - started:5.2f}s')
+            writer.join()
+            for disconnect in disconnects:
+                disconnect.set()
+            await asyncio.gather(*streams)
+            out(f'after disconnect subscribers={broker.count()}')
+
+        keepalive = push.KEEPALIVE
+        push.KEEPALIVE = 3600 # idle, no keepalive line while measuring.
+        try:
+            asyncio.run(run())
+        finally:
+            push.KEEPALIVE = keepalive
+
+
+def soak_worker(kind, number, user_id, stamp_ids, session, operations, results):
+    # one forked process of soak(). puts (latencies, errors) into results.
+    client = Client(raise_request_exception=False)
+    client.cookies[settings.SESSION_COOKIE_NAME] = session
+    latencies = []
+    errors = {}
+    for index in range(operations):
+        if kind == 'write':
+            # each writer has its own stamp and dates, the recodes go forward in time.
+            url, data = 'main/create/main', {'user_id': user_id, 'stamp_id': stamp_ids[number % len(stamp_ids)], 'main_vals': '3',
+                                             'date': str(datetime.date(2000, 1, 1) + datetime.timedelta(days=(number // len(stamp_ids)) * 10000 + index))}
+        elif index % 2 == 0:
+            url, data = 'main/heatmap', {'user_id': user_id, 'year': 2000}
+        else:
+            url, data = 'main/retrieve/range', {'user_id': user_id, 'date_from': '2000-01-01', 'date_to': '2099-12-31', 'limit': 100}
+        started = time.perf_counter()
+        try:
+            status = client.post('/api/' + url, data, HTTP_ACCEPT='application/json').status_code
+            error = f'{kind} {status}' if status >= 300 else None
+        except Exception as exception:
+            error = f'{kind} {type(exception).__name__}: {exception}'
+        latencies.append(time.perf_counter() - started)
+        if error != None:
+            errors[error] = errors.get(error, 0) + 1
+    connection.close()
+    results.put((kind, latencies, errors))
+
+
+def soak(out, scale=1.0):
+    """
+    # soak
+        - 8 writer and 8 reader processes on one db file, per settings.SQLITE_PROFILE. (see restAPI/database.py)
+        - processes, not threads, so the lock of sqlite is contended as under the workers of the wsgi server.
+        - "database is locked" and the other failures are counted, not raised.
+    """
+    writers, readers = 8, 8
+    operations = scaled(150, scale)
+    context = multiprocessing.get_context('fork')
+
+    for profile in ('default', 'production'):
+        with override_settings(SQLITE_PROFILE=profile), throwaway_db():
+            user, client = bench_user('soak')
+            stamp_ids = [create_stamp(client, user.id, f'stamp{index}') for index in range(4)]
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal = cursor.fetchone()[0]
+            # the forked processes must not share the connection of the parent.
+            connections.close_all()
+
+            results = context.Queue()
+            processes = [context.Process(target=soak_worker, args=(kind, number, user.id, stamp_ids, session, operations, results))
+                         for kind, count in (('write', writers), ('read', readers)) for number in range(count)]
+            latencies = {'write': [], 'read': []}
+            errors = {}
+            started = time.perf_counter()
+            for process in processes:
+                process.start()
+            for _ in processes:
+                kind, process_latencies, process_errors = results.get()
+                latencies[kind] += process_latencies
+                for error, count in process_errors.items():
+                    errors[error] = errors.get(error, 0) + count
+            elapsed = time.perf_counter() - started
+            for process in processes:
+                process.join()
+
+            line = f'profile={profile:10s} journal={journal:8s} ops/s={len(processes) * operations / elapsed:6.1f}'
+            for kind in ('write', 'read'):
+                p50, p95, p99 = percentiles(latencies[kind], .5, .95, .99)
+                line += f' {kind} p50={p50:6.1f} p95={p95:6.1f} p99={p99:7.1f}ms'
+            out(line)
+            out(f'  errors={errors or 0} recodes={models.Main.objects.filter(arg_name="").count()}/{writers * operations}')
+
+
+def login_storm(out, scale=1.0):
+    """
+    # login_storm
+        - 100 clients logging in by api/token/login at once, with the real PBKDF2 hasher of the password. (see restAPI/hashing.py)
+        - latency of the stamp views of the other user, without the storm and during it.
+        - logins over the pool's workers and backlog get 429 at once, instead of waiting for the CPU.
+    """
+    storm = 100
+    seconds = max(1.0, 10 * scale)
+    from sticker_grasser_main.asgi import application
+
+    with throwaway_db():
+        models.User.objects.create_user('storm', 'storm@bench.local', 'storm-pass')
+        user, client = bench_user('reader')
+        headers = ((b'authorization', b'Bearer ' + tokens.issue(user)['access'].encode()),)
+        stamp_id = create_stamp(client, user.id, 'stamp')
+        dates = iter(datetime.date(2000, 1, 1) + datetime.timedelta(days=day) for day in range(1000000))
+
+        async def read_and_write(until):
+            # latencies of the stamp views, one request every 50ms. every 4th one writes a recode.
+            latencies = []
+            statuses = {}
+            index = 0
+            while time.perf_counter() < until:
+                index += 1
+                if index % 4 == 0:
+                    path, data = '/api/main/create/main', {'user_id': user.id, 'stamp_id': stamp_id, 'date': str(next(dates)), 'main_vals': '1'}
+                else:
+                    path, data = '/api/stamp/retrieve/tree', {'user_id': user.id}
+                started = time.perf_counter()
+                status, _ = await asgi_call(application, path, data, headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+                await asyncio.sleep(0.05)
+            return latencies, statuses
+
+        async def login(until, logins):
+            while time.perf_counter() < until:
+                started = time.perf_counter()
+                status, _ = await asgi_call(application, '/api/token/login', {'username': 'storm', 'password': 'storm-pass'})
+                logins.append((status, time.perf_counter() - started))
+                if status == 429:
+                    await asyncio.sleep(0.05) # Retry-After is 1s, the client of the storm ignores it.
+
+        def report(name, latencies, statuses):
+            p50, p95 = percentiles(latencies, .5, .95)
+            out(f'{name:12s} stamp requests={len(latencies)} p50={p50:6.1f}ms p95={p95:6.1f}ms max={max(latencies) * 1000:7.1f}ms statuses={statuses}')
+
+        async def run():
+            await read_and_write(time.perf_counter() + 1) # warm
+            report('no storm', *await read_and_write(time.perf_counter() + seconds))
+
+            logins = []
+            until = time.perf_counter() + seconds
+            stormers = [asyncio.ensure_future(login(until, logins)) for _ in range(storm)]
+            await asyncio.sleep(0.5)
+            report('storm', *await read_and_write(until))
+            await asyncio.gather(*stormers)
+
+            statuses = {}
+            for status, _ in logins:
+                statuses[status] = statuses.get(status, 0) + 1
+            accepted = [latency for status, latency in logins if status == 200]
+            out(f'logins={len(logins)} statuses={statuses} accepted p50={percentiles(accepted, .5)[0] if accepted else 0:6.0f}ms '
+                f'hash workers={passwords.executor._max_workers}')
+
+        # one warning line per 429 otherwise.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            asyncio.run(run())
+        finally:
+            request_logger.setLevel(level)
+
+
+def batch(out, scale=1.0):
+    """
+    # batch
+        - one new stamp with 3 subelements and its first recode, sent as 5 sequential requests against one api/batch request.
+        - latency and queries per round. same views run in both, so the difference is the request overhead.
+    """
+    rounds = scaled(40, scale)
+
+    def operations(stamp_name):
+        return ([{'op': 'stamp/create/stamp', 'params': {'stamp_name': stamp_name}}]
+                + [{'op': 'stamp/create/subelement', 'params': {'stamp_name': stamp_name, 'subelement_name': name,
+                                                                'defFunc_name': 'discrete_point', 'arg_names': 'lowerbound upperbound',
+                                                                'arg_vals': '0 100'}}
+                   for name in ('pages', 'mins', 'times')]
+                + [{'op': 'main/create/main', 'params': {'stamp_id': '$0.id', 'date': '2023-03-01', 'main_vals': '10 20 30'}}])
+
+    with throwaway_db():
+        user, client = bench_user('batch')
+
+        def sequential(stamp_name):
+            stamp = None
+            for operation in operations(stamp_name):
+                params = {**operation['params'], 'user_id': user.id}
+                if params.get('stamp_id') == '$0.id':
+                    params['stamp_id'] = stamp['id']
+                status, body = call(client, operation['op'], **params)
+                assert status == 201, (operation['op'], status, body)
+                stamp = stamp or body
+
+        def batched(stamp_name):
+            status, body = call(client, 'batch', user_id=user.id, operations=json.dumps(operations(stamp_name)))
+            assert status == 200, (status, body)
+
+        for name, function in (('sequential', sequential), ('batch', batched)):
+            function(f'{name}-warm')
+            latencies = []
+            with CaptureQueriesContext(connection) as queries:
+                for index in range(rounds):
+                    started = time.perf_counter()
+                    function(f'{name}{index}')
+                    latencies.append(time.perf_counter() - started)
+            out(f'{name:10s} rounds={rounds} p50={percentiles(latencies, .5)[0]:6.1f}ms mean={statistics.mean(latencies) * 1000:6.1f}ms '
+                f'queries/round={len(queries) / rounds:5.1f}')
+
+
+benchmarks = {
+    'ledger': ledger,
+    'bulk': bulk,
+    'subelement': subelement,
+    'range': range_view,
+    'lists': list_views,
+    'subscribers': subscribers,
+    'async': async_views,
+    'soak': soak,
+    'storm': login_storm,
+    'batch': batch,
+}
@@ -0,0 +1,102 @@
+# broker.py
+# publish the change events of the write views, to the push subscribers of the same user.
+# the broker in use is settings.PUSH_BROKER. Local_broker only reaches the subscribers of this process,
+# so multi-worker setups replace it with a broker that has the same subscribe/unsubscribe/publish methods.
+
+import asyncio
+from threading import Lock
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription():
+    """
+    # Subscription
+        - events of one user for one push connection.
+        - events are put by the broker from any thread, then read by the connection in its event loop.
+        - if the connection is too slow and the queue is full, queued events are replaced by one 'resync' event.
+    Args
+        user_id (int) : owner of the events.
+        loop (asyncio loop) : event loop of the connection.
+        maxsize (int) : maximum count of the queued events.
+    """
+    __slots__ = ('user_id', 'loop', 'queue')
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        # runs in self.loop
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'kind': 'resync', 'op': 'overflow'}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Local_broker():
+    """
+    # Local_broker
+        - in-process broker. subscriptions live in the process memory.
+        - publish() is thread safe, so the sync write views can call it from their worker thread.
+    Args
+        maxsize (int) : maximum count of the queued events per subscription.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._subscriptions = {} # user_id -> set<Subscription>
+
+    def subscribe(self, user_id):
+        # must be called in the event loop of the connection.
+        subscription = Subscription(int(user_id), asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions != None:
+                subscriptions.discard(subscription)
+                if len(subscriptions) == 0:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(int(user_id), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError: # loop is already closed.
+                self.unsubscribe(subscription)
+
+    def count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+broker = import_string(getattr(settings, 'PUSH_BROKER', 'restAPI.broker.Local_broker'))()
+
+
+def notify(user_id, kind, op, **key):
+    """
+    # notify
+        - publish the change event of the user, after the current transaction is committed.
+        - rolled back change is never published. outside of the transaction, published at once.
+    Args
+        - user_id : owner of the changed rows.
+        - kind : 'project', 'stamp' or 'main'. 'resync' if the client should read api/sync. (overflow, import)
+        - op : 'update' or 'delete'. 'overflow' or 'import' for 'resync'.
+        - key : keys of the changed row. (project_name, stamp_name, stamp_id, date ...)
+    """
+    event = {'kind': kind, 'op': op, **key}
+    transaction.on_commit(lambda: broker.publish(user_id, event))
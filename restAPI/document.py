@@ -0,0 +1,259 @@
+# document.py
+# convert the user's rows of the EAV models <-> documents of tests/database_noSQLstyle.json
+# documents are written as NDJSON, one document per line, so both sides run in bounded memory.
+
+import datetime
+import json
+
+from django.db import transaction, IntegrityError
+
+from . import broker
+from . import models
+from . import subelement as sub
+from .response_cache import responses
+
+
+"""
+document kinds :
+    user -> {"kind": "user", "user_id": <int>, "username": <str>, "email": <str>}
+        - first line of the export. ignored by the import, rows are imported into the requested user.
+    project -> {"kind": "project", "proj_name": <str>, "todo_name": <str|null>}
+        - todo_name is null for the project itself, then one document per todo follows.
+    stamp -> {"kind": "stamp", "name": <str>, "sub-properties": [[<defFunc_name>, <subelement_name>, {<arg_name>: <arg_val>}], ...],
+              "ledger": {<subelement_name>: <total>}}
+        - ledger is optional. running totals of models.Ledger.
+    main -> {"kind": "main", "stamp_name": <str>, "target_date": <str|null>, "sub_variable": {<arg_name>: <arg_val>}}
+        - must follow the stamp document of stamp_name.
+        - values are the strings saved in the db, so the recodes are restored as they were, without the recompute.
+"""
+
+CHUNK_SIZE = 2000
+
+
+def dumps(document):
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def export_documents(user):
+    """
+    # export_documents
+        - yield the documents of the user, in the order that import_documents() needs. (project -> stamp -> main)
+        - rows are read by QuerySet.iterator(), so the memory is bounded by the largest single document.
+    Args
+        - user : models.User to be exported.
+    """
+    yield {'kind': 'user', 'user_id': user.id, 'username': user.username, 'email': user.email}
+
+    # project with its todos. one document per row.
+    rows = models.Project.objects.filter(user_id = user.id).order_by('id', 'todo_project__id').values_list(
+        'id', 'project_name', 'todo_project__todo_name')
+    last_id = None
+    for project_id, project_name, todo_name in rows.iterator(chunk_size=CHUNK_SIZE):
+        if project_id != last_id:
+            last_id = project_id
+            yield {'kind': 'project', 'proj_name': project_name, 'todo_name': None}
+        if todo_name != None:
+            yield {'kind': 'project', 'proj_name': project_name, 'todo_name': todo_name}
+
+    # stamp with its subelements and args. one document per stamp.
+    ledgers = {}
+    for stamp_id, subelement_name, total in models.Ledger.objects.filter(user_id = user.id).values_list('stamp_id', 'subelement_name', 'total'):
+        ledgers.setdefault(stamp_id, {})[subelement_name] = total
+
+    rows = models.Stamp.objects.filter(user_id = user.id).order_by('id', 'subelement_stamp__id', 'subelement_stamp__arg_subelement__id').values_list(
+        'id', 'stamp_name', 'subelement_stamp__id', 'subelement_stamp__subelement_name', 'subelement_stamp__defFunc_name',
+        'subelement_stamp__arg_subelement__arg_name', 'subelement_stamp__arg_subelement__arg_val')
+    stamp_names = {} # stamp_id -> stamp_name, for the main documents.
+    document = None
+    last_subelement_id = None
+    for stamp_id, stamp_name, subelement_id, subelement_name, defFunc_name, arg_name, arg_val in rows.iterator(chunk_size=CHUNK_SIZE):
+        if stamp_id not in stamp_names:
+            if document != None:
+                yield document
+            stamp_names[stamp_id] = stamp_name
+            document = {'kind': 'stamp', 'name': stamp_name, 'sub-properties': [], 'ledger': ledgers.get(stamp_id, {})}
+        if subelement_id != None and subelement_id != last_subelement_id:
+            last_subelement_id = subelement_id
+            document['sub-properties'].append([defFunc_name, subelement_name, {}])
+        if arg_name != None:
+            document['sub-properties'][-1][2][arg_name] = arg_val
+    if document != None:
+        yield document
+
+    # recode with its sub variables. one document per (stamp, date), recode descriptional row (arg_name == '') comes first.
+    rows = models.Main.objects.filter(user_id = user.id).order_by('stamp_id', 'date', 'arg_name').values_list(
+        'stamp_id', 'date', 'arg_name', 'arg_val')
+    document = None
+    last_key = None
+    for stamp_id, date, arg_name, arg_val in rows.iterator(chunk_size=CHUNK_SIZE):
+        if (stamp_id, date) != last_key:
+            if document != None:
+                yield document
+            last_key = (stamp_id, date)
+            document = {'kind': 'main', 'stamp_name': stamp_names[stamp_id],
+                        'target_date': None if date == None else date.isoformat(), 'sub_variable': {}}
+        if arg_name != '':
+            document['sub_variable'][arg_name] = arg_val
+    if document != None:
+        yield document
+
+
+class Batch():
+    """
+    # Batch
+        - pending rows of bulk_create. flushed in the FK order, when batch_size rows are pending.
+        - parent is always flushed before its children, so the children's FK gets the parent's id.
+    Args
+        batch_size (int) : maximum count of the pending rows.
+    """
+    order = (models.Project, models.Todo,
+             models.Stamp, models.Subelement, models.SubelementArg, models.Ledger,
+             models.Main, models.Daily)
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.pending = {model: [] for model in self.order}
+        self.size = 0
+
+    def add(self, obj):
+        self.pending[type(obj)].append(obj)
+        self.size += 1
+        if self.size >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model in self.order:
+            if len(self.pending[model]) != 0:
+                model.objects.bulk_create(self.pending[model], batch_size=self.batch_size)
+                self.pending[model] = []
+        self.size = 0
+
+
+def bury_all(user, batch_size):
+    """
+    # bury_all
+        - leave the tombstones of every project, stamp and recode of the user, before they are replaced.
+        - written by batch_size, so the clients syncing this user get them as deleted.
+    """
+    queries = (('project', models.Project.objects.filter(user_id = user.id).values_list('id', 'project_name')),
+               ('stamp', models.Stamp.objects.filter(user_id = user.id).values_list('id', 'stamp_name')),
+               ('main', models.Main.objects.filter(user_id = user.id, arg_name = '').values_list('stamp_id', 'date')))
+    for kind, rows in queries:
+        targets = []
+        for target_id, key in rows.iterator(chunk_size=CHUNK_SIZE):
+            targets.append((target_id, '', key) if kind == 'main' else (target_id, key, None))
+            if len(targets) == batch_size:
+                models.Tombstone.objects.bury(user.id, kind, targets)
+                targets = []
+        models.Tombstone.objects.bury(user.id, kind, targets)
+
+
+def import_documents(user, lines, batch_size=1000, replace=False):
+    """
+    # import_documents
+        - create the rows of the documents into the user, by batched bulk_create in one transaction.
+        - lines are read one by one, so the memory is bounded by batch_size, not by the number of documents.
+        - models.Daily is made from the main documents, models.Ledger from the stamp documents.
+    Args
+        - user : models.User to be imported into.
+        - lines : iterable of NDJSON lines. (str or bytes)
+        - batch_size : count of rows per bulk_create.
+        - replace : delete every project, stamp and recode of the user first. tombstones are left for them.
+    Returns
+        - counts (dict) : kind -> count of the imported documents.
+    Raises
+        - ValueError : broken document, or conflict with the user's rows. nothing is imported.
+    """
+    counts = {'project': 0, 'todo': 0, 'stamp': 0, 'main': 0}
+    number = 0
+    try:
+        with transaction.atomic():
+            if replace == True:
+                bury_all(user, batch_size)
+                stamp_names = list(models.Stamp.objects.filter(user_id = user.id).values_list('stamp_name', flat=True))
+                models.Main.objects.filter(user_id = user.id).delete()
+                models.Stamp.objects.filter(user_id = user.id).delete()
+                models.Project.objects.filter(user_id = user.id).delete()
+                for stamp_name in stamp_names:
+                    sub.definitions.invalidate(user.id, stamp_name)
+                    transaction.on_commit(lambda stamp_name=stamp_name: sub.definitions.invalidate(user.id, stamp_name))
+
+            # every row of the import is one change.
+            change_seq = models.Sequence.objects.next()
+            existing_projects = set(models.Project.objects.filter(user_id = user.id).values_list('project_name', flat=True))
+            existing_stamps = set(models.Stamp.objects.filter(user_id = user.id).values_list('stamp_name', flat=True))
+            projects = {} # proj_name -> models.Project
+            stamps = {} # stamp_name -> models.Stamp
+
+            batch = Batch(batch_size)
+            for number, line in enumerate(lines, start=1):
+                if len(line.strip()) == 0:
+                    continue
+                document = json.loads(line)
+                kind = document['kind']
+
+                if kind == 'user':
+                    continue
+
+                elif kind == 'project':
+                    proj_name = document['proj_name']
+                    if proj_name not in projects:
+                        if proj_name in existing_projects:
+                            raise ValueError(f'project {proj_name} already exists.')
+                        projects[proj_name] = models.Project(user_id_id = user.id, project_name = proj_name, change_seq = change_seq)
+                        batch.add(projects[proj_name])
+                        counts['project'] += 1
+                    if document['todo_name'] != None:
+                        batch.add(models.Todo(project_id = projects[proj_name], todo_name = document['todo_name']))
+                        counts['todo'] += 1
+
+                elif kind == 'stamp':
+                    name = document['name']
+                    if name in stamps or name in existing_stamps:
+                        raise ValueError(f'stamp {name} already exists.')
+                    stamp = stamps[name] = models.Stamp(user_id_id = user.id, stamp_name = name, change_seq = change_seq)
+                    batch.add(stamp)
+                    for defFunc_name, subelement_name, args in document['sub-properties']:
+                        if defFunc_name not in sub.loc:
+                            raise ValueError(f'wrong name : defFunc_name {defFunc_name}')
+                        # args are checked and filled by the defFunc, same as Stamp_CREATE_subelement.
+                        try:
+                            args = sub.loc[defFunc_name].subelement_set(**args)
+                        except (TypeError, ValueError) as error:
+                            raise ValueError(f'wrong args of the subelement {subelement_name} : {error}')
+                        subelement = models.Subelement(stamp_id = stamp, subelement_name = subelement_name, defFunc_name = defFunc_name)
+                        batch.add(subelement)
+                        for arg_name, arg_val in args.items():
+                            batch.add(models.SubelementArg(subelement_id = subelement, arg_name = arg_name, arg_val = arg_val))
+                    for subelement_name, total in document.get('ledger', {}).items():
+                        batch.add(models.Ledger(user_id_id = user.id, stamp_id = stamp, subelement_name = subelement_name, total = int(total)))
+                    counts['stamp'] += 1
+
+                elif kind == 'main':
+                    stamp = stamps.get(document['stamp_name'])
+                    if stamp == None:
+                        raise ValueError(f'main must follow the stamp {document["stamp_name"]}.')
+                    date = document['target_date']
+                    if date != None:
+                        date = datetime.date.fromisoformat(date)
+                    batch.add(models.Main(user_id_id = user.id, stamp_id = stamp, date = date, change_seq = change_seq))
+                    for arg_name, arg_val in document['sub_variable'].items():
+                        batch.add(models.Main(user_id_id = user.id, stamp_id = stamp, date = date, arg_name = arg_name, arg_val = arg_val))
+                    if date != None:
+                        batch.add(models.Daily(user_id_id = user.id, stamp_id = stamp, date = date,
+                                               count = 1, total = int(document['sub_variable'].get('value', 0))))
+                    counts['main'] += 1
+
+                else:
+                    raise ValueError(f'wrong kind : {kind}')
+            batch.flush()
+            # too many rows for the single events, the subscribers read api/sync.
+            broker.notify(user.id, 'resync', 'import')
+            responses.invalidate_on_commit(user.id)
+
+    except IntegrityError:
+        raise ValueError('document has the duplicated recodes.')
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        # json.JSONDecodeError is a ValueError.
+        raise ValueError(f'line {number} : {error}')
+    return counts
@@ -0,0 +1,54 @@
+# hashing.py
+# password hashing and checking, run by the bounded thread pool of settings.PASSWORD_HASH_WORKERS.
+# PBKDF2 takes hundreds of milliseconds of CPU. with the pool, a burst of logins uses at most PASSWORD_HASH_WORKERS cores,
+# the other requests keep the rest.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, local
+
+from django.conf import settings
+from rest_framework import exceptions
+
+
+class Busy(exceptions.Throttled):
+    default_detail = 'too many password checks are waiting, retry later.'
+
+
+class Hash_pool():
+    """
+    # Hash_pool
+        - at most `workers` hashes run at once, the others wait in the pool.
+        - run() is called by the sync code (serializers, authentication backend) and waits for its turn.
+        - arun() is awaited by the async views. if `backlog` calls are already waiting, Busy (429) is raised at once.
+        - call from a thread of the pool runs inline, so run() in run() does not deadlock.
+    Args
+        workers (int) : count of the threads, the concurrency limit of the hashing.
+        backlog (int) : maximum count of the waiting arun() calls.
+    """
+
+    def __init__(self, workers, backlog):
+        self._local = local()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash',
+                                           initializer=self._mark_worker)
+        self.slots = BoundedSemaphore(workers + backlog)
+
+    def _mark_worker(self):
+        self._local.worker = True
+
+    def run(self, function, *args, **kwargs):
+        if getattr(self._local, 'worker', False):
+            return function(*args, **kwargs)
+        return self.executor.submit(function, *args, **kwargs).result()
+
+    async def arun(self, function, *args, **kwargs):
+        if not self.slots.acquire(blocking=False):
+            raise Busy(wait=1)
+        try:
+            return await asyncio.wrap_future(self.executor.submit(function, *args, **kwargs))
+        finally:
+            self.slots.release()
+
+
+passwords = Hash_pool(getattr(settings, 'PASSWORD_HASH_WORKERS', 1),
+                      getattr(settings, 'PASSWORD_HASH_BACKLOG', 64))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from restAPI import benchmarks
+
+
+class Command(BaseCommand):
+    help = "run the benchmarks of the api in a throwaway test database, then print the numbers. see restAPI/benchmarks.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"benchmarks to run, every one if not given. ({', '.join(benchmarks.benchmarks)})")
+        parser.add_argument('--scale', type=float, default=1.0, help="multiplies the counts of rows and requests. 0.1 for a quick run.")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(benchmarks.benchmarks)
+        for name in names:
+            if name not in benchmarks.benchmarks:
+                raise CommandError(f"benchmark {name} does not exist. ({', '.join(benchmarks.benchmarks)})")
+
+        # same environment as the test runner : DEBUG off, 'testserver' allowed for the test client.
+        setup_test_environment()
+        try:
+            for name in names:
+                self.stdout.write(f'# {name}')
+                benchmarks.benchmarks[name](self.stdout.write, scale=options['scale'])
+        finally:
+            teardown_test_environment()
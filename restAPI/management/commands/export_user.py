@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI import models
+from restAPI import document
+
+
+class Command(BaseCommand):
+    help = "export every project, stamp and recode of the user, as NDJSON documents. see restAPI/document.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('-o', '--output', default='-', help="output file. '-' for stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            user = models.User.objects.get(username = options['username'])
+        except models.User.DoesNotExist:
+            raise CommandError(f"user {options['username']} does not exist.")
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        try:
+            for doc in document.export_documents(user):
+                output.write(document.dumps(doc))
+        finally:
+            if output != sys.stdout:
+                output.close()
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI import models
+from restAPI import document
+
+
+class Command(BaseCommand):
+    help = "import NDJSON documents made by export_user into the user. see restAPI/document.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('input', nargs='?', default='-', help="input file. '-' for stdin.")
+        parser.add_argument('--replace', action='store_true', help="delete every project, stamp and recode of the user first.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="count of rows per bulk_create.")
+
+    def handle(self, *args, **options):
+        try:
+            user = models.User.objects.get(username = options['username'])
+        except models.User.DoesNotExist:
+            raise CommandError(f"user {options['username']} does not exist.")
+
+        lines = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8')
+        try:
+            counts = document.import_documents(user, lines, batch_size=options['batch_size'], replace=options['replace'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            if lines != sys.stdin:
+                lines.close()
+        self.stdout.write(', '.join(f'{kind}: {count}' for kind, count in counts.items()))
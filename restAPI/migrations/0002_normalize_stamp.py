@@ -0,0 +1,182 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_stamp_rows(apps, schema_editor):
+    """
+    old Stamp rows -> Stamp (descriptional row only) + Subelement + SubelementArg.
+    id of the stamp descriptional row is kept, so Main.stamp_id, Ledger.stamp_id stay valid.
+    """
+    Stamp = apps.get_model('restAPI', 'Stamp')
+    Subelement = apps.get_model('restAPI', 'Subelement')
+    SubelementArg = apps.get_model('restAPI', 'SubelementArg')
+    Main = apps.get_model('restAPI', 'Main')
+    Ledger = apps.get_model('restAPI', 'Ledger')
+
+    # (user_id, stamp_name) -> stamp descriptional row
+    headers = {}
+    for row in Stamp.objects.filter(subelement_name='', arg_name='').order_by('id'):
+        headers.setdefault((row.user_id_id, row.stamp_name), row)
+
+    # (user_id, stamp_name, subelement_name) -> Subelement
+    subelements = {}
+    args = []
+    for row in Stamp.objects.exclude(subelement_name='').order_by('id'):
+        key = (row.user_id_id, row.stamp_name)
+        if key not in headers:
+            headers[key] = Stamp.objects.create(user_id_id=row.user_id_id, stamp_name=row.stamp_name)
+
+        subelement_key = key + (row.subelement_name,)
+        if subelement_key not in subelements:
+            subelements[subelement_key] = Subelement.objects.create(stamp_id=headers[key],
+                                                                    subelement_name=row.subelement_name,
+                                                                    defFunc_name=row.defFunc_name)
+        if row.arg_name != '':
+            args.append(SubelementArg(subelement_id=subelements[subelement_key],
+                                      arg_name=row.arg_name,
+                                      arg_val=row.arg_val))
+    SubelementArg.objects.bulk_create(args)
+
+    # recodes pointing the non-descriptional rows are moved to the descriptional row.
+    header_ids = set(header.id for header in headers.values())
+    for model in (Main, Ledger):
+        for obj in model.objects.exclude(stamp_id__in=header_ids).select_related('stamp_id'):
+            obj.stamp_id = headers[(obj.stamp_id.user_id_id, obj.stamp_id.stamp_name)]
+            obj.save(update_fields=['stamp_id'])
+
+    Stamp.objects.exclude(id__in=header_ids).delete()
+
+
+def fill_ledger(apps, schema_editor):
+    """
+    Ledger of the db made before it. the accumulate of every recode is walked from the first one by date,
+    same as subelement.Discrete_point.subvar_resync, so the accumulates left stale by the previous layout are fixed too.
+    """
+    Subelement = apps.get_model('restAPI', 'Subelement')
+    Main = apps.get_model('restAPI', 'Main')
+    Ledger = apps.get_model('restAPI', 'Ledger')
+
+    ledgers = []
+    for subelement in Subelement.objects.filter(defFunc_name='discrete_point').select_related('stamp_id').order_by('id'):
+        args = dict(subelement.arg_subelement.values_list('arg_name', 'arg_val'))
+        if args.get('is_accumulated') != 'T':
+            continue
+        acc_lbound = int(args.get('acc_lbound', -100000))
+        acc_ubound = int(args.get('acc_ubound', 100000))
+
+        # date -> {'value': row, 'accumulate': row}
+        recodes = {}
+        for row in Main.objects.filter(stamp_id=subelement.stamp_id_id, arg_name__in=['value', 'accumulate']).order_by('date'):
+            recodes.setdefault(row.date, {})[row.arg_name] = row
+
+        accumulated = 0
+        changed = []
+        for date, rows in recodes.items():
+            if 'value' not in rows:
+                continue
+            value = int(rows['value'].arg_val)
+            accumulate = accumulated
+            if acc_lbound > accumulated + value:
+                accumulate = acc_lbound - value
+            elif accumulated + value >= acc_ubound:
+                accumulate = acc_ubound - value
+            if 'accumulate' in rows and rows['accumulate'].arg_val != str(accumulate):
+                rows['accumulate'].arg_val = str(accumulate)
+                changed.append(rows['accumulate'])
+            accumulated = accumulate + value
+        Main.objects.bulk_update(changed, ['arg_val'])
+
+        ledgers.append(Ledger(user_id_id=subelement.stamp_id.user_id_id,
+                              stamp_id_id=subelement.stamp_id_id,
+                              subelement_name=subelement.subelement_name,
+                              total=accumulated))
+    Ledger.objects.bulk_create(ledgers)
+
+
+def join_stamp_rows(apps, schema_editor):
+    """
+    reverse of split_stamp_rows. Subelement, SubelementArg -> old Stamp rows.
+    """
+    Stamp = apps.get_model('restAPI', 'Stamp')
+    Subelement = apps.get_model('restAPI', 'Subelement')
+
+    rows = []
+    for subelement in Subelement.objects.select_related('stamp_id').prefetch_related('arg_subelement').order_by('id'):
+        header = subelement.stamp_id
+        for arg in subelement.arg_subelement.all():
+            rows.append(Stamp(user_id_id=header.user_id_id,
+                              stamp_name=header.stamp_name,
+                              subelement_name=subelement.subelement_name,
+                              defFunc_name=subelement.defFunc_name,
+                              arg_name=arg.arg_name,
+                              arg_val=arg.arg_val))
+        rows.append(Stamp(user_id_id=header.user_id_id,
+                          stamp_name=header.stamp_name,
+                          subelement_name=subelement.subelement_name,
+                          defFunc_name=subelement.defFunc_name))
+    Stamp.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subelement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subelement_name', models.CharField(max_length=254)),
+                ('defFunc_name', models.CharField(max_length=254)),
+                ('stamp_id', models.ForeignKey(db_column='stamp_id', on_delete=django.db.models.deletion.CASCADE, related_name='subelement_stamp', to='restAPI.stamp')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubelementArg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arg_name', models.CharField(max_length=254)),
+                ('arg_val', models.CharField(blank=True, max_length=254)),
+                ('subelement_id', models.ForeignKey(db_column='subelement_id', on_delete=django.db.models.deletion.CASCADE, related_name='arg_subelement', to='restAPI.subelement')),
+            ],
+        ),
+        # Ledger is new to the db of the previous layout, so it is made here, not in 0001_initial.
+        migrations.CreateModel(
+            name='Ledger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subelement_name', models.CharField(max_length=254)),
+                ('total', models.IntegerField(default=0)),
+                ('stamp_id', models.ForeignKey(db_column='stamp_id', on_delete=django.db.models.deletion.CASCADE, related_name='ledger_stamp', to='restAPI.stamp')),
+                ('user_id', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='ledger_user', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(split_stamp_rows, join_stamp_rows),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='stamp',
+            name='arg_name',
+        ),
+        migrations.RemoveField(
+            model_name='stamp',
+            name='arg_val',
+        ),
+        migrations.RemoveField(
+            model_name='stamp',
+            name='defFunc_name',
+        ),
+        migrations.RemoveField(
+            model_name='stamp',
+            name='subelement_name',
+        ),
+        migrations.AlterField(
+            model_name='main',
+            name='stamp_id',
+            field=models.ForeignKey(db_column='stamp_id', on_delete=django.db.models.deletion.DO_NOTHING, related_name='main_stamp', to='restAPI.stamp'),
+        ),
+    ]
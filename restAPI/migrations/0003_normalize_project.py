@@ -0,0 +1,65 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_project_rows(apps, schema_editor):
+    """
+    old Project rows -> Project (todo_name == '' row only) + Todo.
+    """
+    Project = apps.get_model('restAPI', 'Project')
+    Todo = apps.get_model('restAPI', 'Todo')
+
+    # (user_id, project_name) -> project descriptional row
+    headers = {}
+    for row in Project.objects.filter(todo_name='').order_by('id'):
+        headers.setdefault((row.user_id_id, row.project_name), row)
+
+    todos = []
+    for row in Project.objects.exclude(todo_name='').order_by('id'):
+        key = (row.user_id_id, row.project_name)
+        if key not in headers:
+            headers[key] = Project.objects.create(user_id_id=row.user_id_id, project_name=row.project_name)
+        todos.append(Todo(project_id=headers[key], todo_name=row.todo_name))
+    Todo.objects.bulk_create(todos)
+
+    Project.objects.exclude(id__in=set(header.id for header in headers.values())).delete()
+
+
+def join_project_rows(apps, schema_editor):
+    """
+    reverse of split_project_rows. Todo -> old Project rows.
+    """
+    Project = apps.get_model('restAPI', 'Project')
+    Todo = apps.get_model('restAPI', 'Todo')
+
+    rows = []
+    for todo in Todo.objects.select_related('project_id').order_by('id'):
+        rows.append(Project(user_id_id=todo.project_id.user_id_id,
+                            project_name=todo.project_id.project_name,
+                            todo_name=todo.todo_name))
+    Project.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0002_normalize_stamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Todo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_name', models.CharField(max_length=254)),
+                ('project_id', models.ForeignKey(db_column='project_id', on_delete=django.db.models.deletion.CASCADE, related_name='todo_project', to='restAPI.project')),
+            ],
+        ),
+        migrations.RunPython(split_project_rows, join_project_rows),
+        migrations.RemoveField(
+            model_name='project',
+            name='todo_name',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0003_normalize_project'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['user_id', 'stamp_id', 'subelement_name'], name='ledger_user_stamp_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='main',
+            index=models.Index(fields=['user_id', 'stamp_id', 'date', 'arg_name'], name='main_user_stamp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user_id', 'project_name'], name='project_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stamp',
+            index=models.Index(fields=['user_id', 'stamp_name'], name='stamp_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subelement',
+            index=models.Index(fields=['stamp_id', 'subelement_name'], name='subelement_stamp_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['project_id', 'todo_name'], name='todo_project_name_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+def drop_duplicates(apps, schema_editor):
+    """
+    rows duplicated by the check-then-insert race are merged into the first row, before the unique constraints.
+    """
+    Stamp = apps.get_model('restAPI', 'Stamp')
+    Subelement = apps.get_model('restAPI', 'Subelement')
+    Todo = apps.get_model('restAPI', 'Todo')
+    Main = apps.get_model('restAPI', 'Main')
+    Ledger = apps.get_model('restAPI', 'Ledger')
+
+    # (user_id, stamp_name) -> first stamp id. rows pointing the later one are moved to the first one.
+    first = {}
+    for stamp_id, user_id, stamp_name in Stamp.objects.order_by('id').values_list('id', 'user_id', 'stamp_name'):
+        key = (user_id, stamp_name)
+        if key not in first:
+            first[key] = stamp_id
+            continue
+        for model in (Subelement, Main, Ledger):
+            model.objects.filter(stamp_id=stamp_id).update(stamp_id=first[key])
+        Stamp.objects.filter(id=stamp_id).delete()
+
+    # (project_id, todo_name) -> first todo
+    seen = set()
+    for todo_id, project_id, todo_name in Todo.objects.order_by('id').values_list('id', 'project_id', 'todo_name'):
+        if (project_id, todo_name) in seen:
+            Todo.objects.filter(id=todo_id).delete()
+        seen.add((project_id, todo_name))
+
+    # (user_id, stamp_id, date) -> first recode descriptional row
+    seen = set()
+    for main_id, user_id, stamp_id, date in Main.objects.filter(arg_name='').order_by('id').values_list('id', 'user_id', 'stamp_id', 'date'):
+        if (user_id, stamp_id, date) in seen:
+            Main.objects.filter(id=main_id).delete()
+        seen.add((user_id, stamp_id, date))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='stamp',
+            name='stamp_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todo',
+            name='todo_project_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='main',
+            constraint=models.UniqueConstraint(condition=models.Q(('arg_name', '')), fields=('user_id', 'stamp_id', 'date'), name='main_user_stamp_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='stamp',
+            constraint=models.UniqueConstraint(fields=('user_id', 'stamp_name'), name='stamp_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='todo',
+            constraint=models.UniqueConstraint(fields=('project_id', 'todo_name'), name='todo_project_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_daily(apps, schema_editor):
+    """
+    models.Daily is filled from the existing models.Main recodes.
+    """
+    Main = apps.get_model('restAPI', 'Main')
+    Daily = apps.get_model('restAPI', 'Daily')
+
+    # (user_id, stamp_id, date) -> Daily
+    days = {}
+    for user_id, stamp_id, date in Main.objects.filter(arg_name='').exclude(date=None).values_list('user_id', 'stamp_id', 'date'):
+        day = days.setdefault((user_id, stamp_id, date), Daily(user_id_id=user_id, stamp_id_id=stamp_id, date=date))
+        day.count += 1
+    for user_id, stamp_id, date, arg_val in Main.objects.filter(arg_name='value').values_list('user_id', 'stamp_id', 'date', 'arg_val'):
+        if (user_id, stamp_id, date) in days:
+            days[(user_id, stamp_id, date)].total += int(arg_val)
+    Daily.objects.bulk_create(days.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0005_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Daily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('stamp_id', models.ForeignKey(db_column='stamp_id', on_delete=django.db.models.deletion.CASCADE, related_name='daily_stamp', to='restAPI.stamp')),
+                ('user_id', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='daily_user', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='daily',
+            index=models.Index(fields=['user_id', 'date'], name='daily_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='daily',
+            constraint=models.UniqueConstraint(fields=('user_id', 'stamp_id', 'date'), name='daily_user_stamp_date_uniq'),
+        ),
+        migrations.RunPython(fill_daily, migrations.RunPython.noop),
+    ]
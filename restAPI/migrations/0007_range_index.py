@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0006_daily_aggregate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='main',
+            index=models.Index(fields=['user_id', 'arg_name', 'date'], name='main_user_arg_date_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.7 on 2026-10-18 15:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0007_range_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('target_id', models.BigIntegerField()),
+                ('target_name', models.CharField(blank=True, max_length=254)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='main',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='stamp',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='main',
+            index=models.Index(fields=['user_id', 'arg_name', 'updated_at'], name='main_user_arg_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user_id', 'updated_at'], name='project_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stamp',
+            index=models.Index(fields=['user_id', 'updated_at'], name='stamp_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user_id',
+            field=models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='tombstone_user', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+    ]
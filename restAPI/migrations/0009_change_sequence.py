@@ -0,0 +1,72 @@
+# Generated by Django 4.1.7 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0008_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='main',
+            name='main_user_arg_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='project',
+            name='project_user_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='stamp',
+            name='stamp_user_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tombstone',
+            name='tombstone_user_deleted_idx',
+        ),
+        migrations.AddField(
+            model_name='main',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='stamp',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='main',
+            index=models.Index(fields=['user_id', 'arg_name', 'change_seq'], name='main_user_arg_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user_id', 'change_seq'], name='project_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stamp',
+            index=models.Index(fields=['user_id', 'change_seq'], name='stamp_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user_id', 'change_seq'], name='tombstone_user_change_idx'),
+        ),
+    ]
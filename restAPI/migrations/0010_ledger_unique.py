@@ -0,0 +1,34 @@
+# Generated by Django 4.1.7 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+def drop_duplicates(apps, schema_editor):
+    """
+    ledgers duplicated by the concurrent first writes : the first row is the one read and updated since, the others are dropped.
+    """
+    Ledger = apps.get_model('restAPI', 'Ledger')
+    seen = set()
+    for ledger_id, user_id, stamp_id, subelement_name in Ledger.objects.order_by('id').values_list('id', 'user_id', 'stamp_id', 'subelement_name'):
+        if (user_id, stamp_id, subelement_name) in seen:
+            Ledger.objects.filter(id=ledger_id).delete()
+        seen.add((user_id, stamp_id, subelement_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0009_change_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='ledger',
+            name='ledger_user_stamp_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='ledger',
+            constraint=models.UniqueConstraint(fields=('user_id', 'stamp_id', 'subelement_name'), name='ledger_user_stamp_name_uniq'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
 class UserManager(BaseUserManager):
@@ -69,16 +69,50 @@ class Project(models.Model):
         - user_id : foregin key from User model.
         - project_name : project name
 
-        - todo_name : todo name
-            ~ if todo name == BLANK, this object only define sub_key-project_name.~
-            ~ if todo name != BLANK, this object define list-todo elements.~
+        - updated_at : last time that this project or its todos were changed.
+        - change_seq : number of models.Sequence, given by the last transaction that changed this project or its todos.
+
+        - list todo : rows of model Todo, which project_id is this project.
     """
     user_id = models.ForeignKey('User', related_name='project', on_delete=models.CASCADE, db_column='user_id')
     project_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
-    todo_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Project_* views : filter(user_id, project_name)
+            models.Index(fields=['user_id', 'project_name'], name='project_user_name_idx'),
+            # Sync_RETRIEVE : filter(user_id, change_seq >= since).order_by('change_seq', 'id')
+            models.Index(fields=['user_id', 'change_seq'], name='project_user_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.project_name}"
+
+
+class Todo(models.Model):
+    """
+    Virtual structure :
+        - foregin key project_id
+        - todo_name
+
+    Actual structure :
+        - project_id : foregin key from Project model.
+        - todo_name : todo name
+    """
+    project_id = models.ForeignKey('Project', related_name='todo_project', on_delete=models.CASCADE, db_column='project_id')
+    todo_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
+
+    class Meta:
+        constraints = [
+            # Project_CREATE_todo : duplicated todo is rejected by the db. also serves filter(project_id, todo_name)
+            models.UniqueConstraint(fields=['project_id', 'todo_name'], name='todo_project_name_uniq'),
+        ]
 
     def __str__(self):
-        return f"{self.user_id}:{self.project_name}  [{self.todo_name}]"
+        return f"{self.project_id}  [{self.todo_name}]"
 
 
 class Stamp(models.Model):
@@ -89,28 +123,82 @@ class Stamp(models.Model):
         - List<tuple> subElements
             + (subelement_name, arg_dict<argname:argval>, definefunc_name)
             + ...
-    
-    Actual structure:
-        - user_id : foregin key 
-        - stamp_name : sub key 
 
-        - subelement_name : subElements->subelement_name
-        - definefunc_name : subElements->definefunc_name
+    Actual structure:
+        - user_id : foregin key
+        - stamp_name : sub key
+        - updated_at : last time that this stamp or its subelements were changed.
+        - change_seq : number of models.Sequence, given by the last transaction that changed this stamp or its subelements.
 
-        - arg_name : subElements-> arg_dict -> key
-        - arg_val : subElements-> arg_dict -> val
+        - subElements : rows of model Subelement, which stamp_id is this stamp.
     """
     user_id = models.ForeignKey('User', related_name='stamp_user', on_delete=models.CASCADE, db_column='user_id')
     stamp_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
 
-    subelement_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
-    defFunc_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0)
 
-    arg_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
+    class Meta:
+        indexes = [
+            # Sync_RETRIEVE : filter(user_id, change_seq >= since).order_by('change_seq', 'id')
+            models.Index(fields=['user_id', 'change_seq'], name='stamp_user_change_idx'),
+        ]
+        constraints = [
+            # Stamp_CREATE_stamp : duplicated stamp is rejected by the db. also serves Stamp_* views filter(user_id, stamp_name)
+            models.UniqueConstraint(fields=['user_id', 'stamp_name'], name='stamp_user_name_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.stamp_name}"
+
+
+class Subelement(models.Model):
+    """
+    Virtual structure:
+        - foregin key stamp_id
+        - sub key subelement_name
+        - definefunc_name
+        - dict<argname:argval> arg_dict
+
+    Actual structure:
+        - stamp_id : foregin key
+        - subelement_name : sub key
+        - defFunc_name : key of subelement.loc
+
+        - arg_dict : rows of model SubelementArg, which subelement_id is this subelement.
+    """
+    stamp_id = models.ForeignKey('Stamp', related_name='subelement_stamp', on_delete=models.CASCADE, db_column='stamp_id')
+    subelement_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
+    defFunc_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
+
+    class Meta:
+        indexes = [
+            # Stamp_*_subelement views : filter(stamp_id, subelement_name)
+            models.Index(fields=['stamp_id', 'subelement_name'], name='subelement_stamp_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stamp_id}  [{self.subelement_name}, {self.defFunc_name}]"
+
+
+class SubelementArg(models.Model):
+    """
+    Virtual structure:
+        - foregin key subelement_id
+        - arg_dict -> key
+        - arg_dict -> val
+
+    Actual structure:
+        - subelement_id : foregin key
+        - arg_name : arg_dict -> key
+        - arg_val : arg_dict -> val, string form made by subelement.loc[defFunc_name].subelement_set
+    """
+    subelement_id = models.ForeignKey('Subelement', related_name='arg_subelement', on_delete=models.CASCADE, db_column='subelement_id')
+    arg_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
     arg_val = models.CharField(max_length=254, unique=False, null=False, blank=True)
 
     def __str__(self):
-        return f"{self.user_id}:{self.stamp_name}  [{self.subelement_name}, {self.defFunc_name}] -> <{self.arg_name}:{self.arg_val} >"
+        return f"{self.subelement_id} -> <{self.arg_name}:{self.arg_val} >"
     
 
 class Main(models.Model):
@@ -131,17 +219,210 @@ class Main(models.Model):
 
         - arg_name : arg_dict -> key
         - arg_val : arg_dict -> val
+
+        - updated_at : last time that the row was changed.
+            ~ updated_at of the recode descriptional row (arg_name == '') is the recode's, touched whenever its arg rows are changed.~
+        - change_seq : number of models.Sequence, given with updated_at. only the recode descriptional row's is read.
     """
 
     user_id = models.ForeignKey('User', related_name='main_user', on_delete=models.CASCADE, db_column='user_id')
 
-    stamp_id = models.ForeignKey('Stamp', related_name='main_stamp', on_delete=models.DO_NOTHING , db_column='stamp_id',
-                                 limit_choices_to={"subelement_name": ''})
+    stamp_id = models.ForeignKey('Stamp', related_name='main_stamp', on_delete=models.DO_NOTHING , db_column='stamp_id')
     date = models.DateField(unique=False, null=True, blank=True)
 
     arg_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
     arg_val = models.CharField(max_length=254, unique=False, null=False, blank=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Main_* views : filter(user_id, stamp_id, date)
+            # subvar_resync : filter(user_id, stamp_id, date < since, arg_name in (...)).order_by('-date', '-arg_name')
+            # Main_CREATE_main : filter(user_id, stamp_id, date > date, arg_name='')
+            models.Index(fields=['user_id', 'stamp_id', 'date', 'arg_name'], name='main_user_stamp_date_idx'),
+            # Main_RETRIEVE_range : filter(user_id, arg_name, date range).order_by('date', 'id'). (id is the implicit rowid suffix)
+            models.Index(fields=['user_id', 'arg_name', 'date'], name='main_user_arg_date_idx'),
+            # Sync_RETRIEVE : filter(user_id, arg_name='', change_seq >= since).order_by('change_seq', 'id')
+            models.Index(fields=['user_id', 'arg_name', 'change_seq'], name='main_user_arg_change_idx'),
+        ]
+        constraints = [
+            # Main_CREATE_main, Main_CREATE_bulk : one recode per (user, stamp, date). only the recode descriptional row (arg_name == '') is unique.
+            models.UniqueConstraint(fields=['user_id', 'stamp_id', 'date'], condition=models.Q(arg_name=''), name='main_user_stamp_date_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.user_id}:{self.stamp_id}:{str(self.date)}   <{self.arg_name}:{self.arg_val} >"
-    
+
+
+class Ledger(models.Model):
+    """
+    Virtual structure:
+        - foregin key user_id
+        - foregin key stamp_id
+        - sub key subelement_name
+
+        - int total
+
+    Actual structure
+        - user_id : foregin key
+        - stamp_id : foregin key
+        - subelement_name : subelement which is_accumulated == True
+
+        - total : running total of every Main recode's value of this stamp.
+            ~ next recode's accumulate is read from here, instead of scanning models.Main.~
+            ~ updated by Main_CREATE_main, Main_DELETE_main in the same transaction.~
+    """
+
+    user_id = models.ForeignKey('User', related_name='ledger_user', on_delete=models.CASCADE, db_column='user_id')
+    stamp_id = models.ForeignKey('Stamp', related_name='ledger_stamp', on_delete=models.CASCADE, db_column='stamp_id')
+    subelement_name = models.CharField(max_length=254, unique=False, null=False, blank=False)
+
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Main_CREATE_main, resync_accumulate : filter(user_id, stamp_id, subelement_name)
+            # one row per subelement, so the concurrent first writes cannot make two running totals.
+            models.UniqueConstraint(fields=['user_id', 'stamp_id', 'subelement_name'], name='ledger_user_stamp_name_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.stamp_id}:{self.subelement_name}   <total:{self.total} >"
+
+class Daily(models.Model):
+    """
+    Virtual structure:
+        - foregin key user_id
+        - foregin key stamp_id
+        - datetime date
+
+        - int count
+        - int total
+
+    Actual structure
+        - user_id : foregin key
+        - stamp_id : foregin key
+        - date : date of the recodes
+
+        - count : number of recodes of this stamp in this date.
+        - total : sum of the recodes' value of this stamp in this date.
+            ~ daily aggregate of models.Main, read by Main_RETRIEVE_heatmap instead of scanning models.Main.~
+            ~ updated by Main_CREATE_main, Main_CREATE_bulk, Main_DELETE_main in the same transaction.~
+    """
+
+    user_id = models.ForeignKey('User', related_name='daily_user', on_delete=models.CASCADE, db_column='user_id')
+    stamp_id = models.ForeignKey('Stamp', related_name='daily_stamp', on_delete=models.CASCADE, db_column='stamp_id')
+    date = models.DateField(unique=False, null=False, blank=False)
+
+    count = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Main_RETRIEVE_heatmap (every stamp) : filter(user_id, date range)
+            models.Index(fields=['user_id', 'date'], name='daily_user_date_idx'),
+        ]
+        constraints = [
+            # Main_RETRIEVE_heatmap (one stamp) : filter(user_id, stamp_id, date range)
+            models.UniqueConstraint(fields=['user_id', 'stamp_id', 'date'], name='daily_user_stamp_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.stamp_id}:{str(self.date)}   <count:{self.count}, total:{self.total} >"
+
+
+class TombstoneManager(models.Manager):
+    def bury(self, user_id, kind, targets):
+        """
+        Leaves the tombstones of the deleted rows, so Sync_RETRIEVE
+        can return them as deleted.
+        targets are (target_id, target_name, date) tuples.
+        Must be called in the transaction of the delete, see Sequence.
+        """
+        if len(targets) == 0:
+            return []
+        change_seq = Sequence.objects.next()
+        return self.bulk_create([self.model(user_id_id=int(user_id), kind=kind,
+                                            target_id=target_id, target_name=target_name, date=date,
+                                            change_seq=change_seq)
+                                 for target_id, target_name, date in targets])
+
+
+class Tombstone(models.Model):
+    """
+    Virtual structure:
+        - foregin key user_id
+        - kind of the deleted row
+        - key of the deleted row
+
+        - datetime deleted_at
+
+    Actual structure
+        - user_id : foregin key
+        - kind : 'project', 'stamp' or 'main'
+        - target_id : id of the deleted Project, Stamp. stamp_id of the deleted Main recode.
+        - target_name : project_name, stamp_name of the deleted row. blank for Main.
+        - date : date of the deleted Main recode. null for the others.
+
+        - deleted_at : time that the row was deleted.
+            ~ written in the same transaction with the delete.~
+        - change_seq : number of models.Sequence, given by the transaction of the delete. read by Sync_RETRIEVE.
+    """
+
+    user_id = models.ForeignKey('User', related_name='tombstone_user', on_delete=models.CASCADE, db_column='user_id')
+    kind = models.CharField(max_length=16, unique=False, null=False, blank=False)
+
+    target_id = models.BigIntegerField()
+    target_name = models.CharField(max_length=254, unique=False, null=False, blank=True)
+    date = models.DateField(unique=False, null=True, blank=True)
+
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = TombstoneManager()
+
+    class Meta:
+        indexes = [
+            # Sync_RETRIEVE : filter(user_id, change_seq >= since).order_by('change_seq', 'id')
+            models.Index(fields=['user_id', 'change_seq'], name='tombstone_user_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.kind}:{self.target_id}   <{self.target_name}, {str(self.date)} >"
+
+
+class SequenceManager(models.Manager):
+    def next(self):
+        """
+        Next number of the change sequence.
+        Must be called in the write transaction, before its commit.
+        Called first in the transaction, it takes the write lock before the reads, as BEGIN IMMEDIATE does.
+        """
+        if not transaction.get_connection(self.db).in_atomic_block:
+            raise RuntimeError('Sequence.objects.next() must be called in the write transaction.')
+        if self.filter(id=1).update(seq=models.F('seq') + 1) == 0:
+            self.create(id=1, seq=1)
+        return self.get(id=1).seq
+
+
+class Sequence(models.Model):
+    """
+    Virtual structure:
+        - int seq
+
+    Actual structure
+        - seq : last number of the change sequence. one row. (id = 1)
+            ~ the update of this row takes the write lock of the db, which is held until the commit.
+              so a transaction that got the larger number is always committed later,
+              and Sync_RETRIEVE's cursor never passes the number of the uncommitted transaction.
+              updated_at cannot do this : it is the time before the writer waited for the lock.~
+    """
+
+    seq = models.BigIntegerField(default=0)
+
+    objects = SequenceManager()
+
+    def __str__(self):
+        return f"{self.seq}"
@@ -0,0 +1,124 @@
+# push.py
+# server-sent events of the user's changes. raw ASGI application, routed by sticker_grasser_main/asgi.py
+# Django 4.1 serves StreamingHttpResponse only with the sync iterator, so an idle connection would hold a thread.
+# here each connection is one coroutine, waiting on its broker.Subscription.
+
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.http import HttpRequest
+
+from . import tokens
+from .broker import broker
+
+
+KEEPALIVE = 15 # seconds between the comment lines, so the proxies do not close the idle connection.
+
+
+@sync_to_async
+def session_user(session_key):
+    # same user as the SessionAuthentication of the views.
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    return auth.get_user(request)
+
+
+@sync_to_async
+def token_user(token):
+    # same user as the tokens.Token_authentication of the views. None if the token is invalid.
+    return tokens.verify(token, 'access')
+
+
+async def authorize(scope):
+    """
+    # authorize
+        - resolve the logged in user from "Authorization: Bearer <access token>" or the session cookie,
+          then check the requested user_id like IsOwner_permission_Mixin.
+        - the other Authorization scheme is rejected, not passed to the cookie.
+        - returns user_id to subscribe, or None if not allowed.
+    """
+    cookies = SimpleCookie()
+    authorization = None
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+        elif name == b'authorization':
+            authorization = value.split()
+
+    if authorization != None:
+        if len(authorization) != 2 or authorization[0].lower() != tokens.Token_authentication.keyword.encode():
+            return None
+        user = await token_user(authorization[1].decode('latin-1'))
+    elif settings.SESSION_COOKIE_NAME in cookies:
+        user = await session_user(cookies[settings.SESSION_COOKIE_NAME].value)
+    else:
+        return None
+    if user == None or user.is_authenticated != True:
+        return None
+
+    try:
+        requested_user_id = int(parse_qs(scope.get('query_string', b'').decode()).get('user_id', [user.id])[0])
+    except ValueError:
+        return None
+    if requested_user_id != user.id and user.is_superuser != True:
+        return None
+    return requested_user_id
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def push_application(scope, receive, send):
+    """
+    # push_application
+        SECURITY LEVEL r2
+        - GET api/push?user_id=<user_id> : text/event-stream of the user's change events.
+        - authenticated by the session cookie, or the access token of api/token/login.
+        - each event is "event: <kind>" with the JSON of broker.notify(). see the broker.py
+        - event 'resync' means that events were dropped. read api/sync for the changes.
+    """
+    user_id = await authorize(scope)
+    if user_id == None:
+        await send({'type': 'http.response.start', 'status': 403, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'current logged in user have not owned licence for this request.'})
+        return
+
+    subscription = broker.subscribe(user_id)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    event = None
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'),
+                                (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+        while True:
+            # the pending get() is kept over the keepalives, so no event is lost by the timeout.
+            if event == None:
+                event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait((event, disconnect), timeout=KEEPALIVE, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                return
+            if event.done():
+                data = event.result()
+                event = None
+                body = f"event: {data['kind']}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+            else:
+                body = ': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+    finally:
+        if event != None:
+            event.cancel()
+        disconnect.cancel()
+        broker.unsubscribe(subscription)
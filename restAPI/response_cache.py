@@ -0,0 +1,145 @@
+# response_cache.py
+# rendered responses of the retrieve views, in the Django cache of settings.RESPONSE_CACHE.
+# keyed by the data version of the user, so a write view drops every cached response of the user by one set().
+# LocMemCache is per process. with several worker processes, use the shared backend (FileBasedCache), or the
+# version changed by one worker is not seen by the others.
+# the same key gives the strong ETag of the response, so the unchanged read is answered by 304 without the queries.
+
+from hashlib import sha1
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+
+
+class Response_cache():
+    """
+    # Response_cache
+        - response body is keyed by (user_id, version of the user, path, media type, POST params).
+        - version of the user is a random token, replaced after the commit of every write. (see invalidate())
+          responses of the old version are never read again, and left to the backend's eviction.
+        - evicted version is made again as a new token, so the old responses cannot be matched by the chance.
+        - entries are bounded by the backend's MAX_ENTRIES and TIMEOUT. bodies larger than max_bytes are not stored.
+    Args
+        alias (str) : alias of settings.CACHES.
+        max_bytes (int) : largest body to be stored.
+    """
+
+    def __init__(self, alias, max_bytes):
+        self.alias = alias
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self.counts = {'hit': 0, 'miss': 0, 'store': 0, 'skip': 0, 'not_modified': 0}
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        # counters of this process.
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['hit'] + counts['miss']
+        counts['hit_rate'] = counts['hit'] / lookups if lookups != 0 else None
+        return counts
+
+    def version(self, user_id):
+        key = f'version:{int(user_id)}'
+        version = self.cache.get(key)
+        if version == None:
+            self.cache.add(key, uuid4().hex, timeout=None)
+            version = self.cache.get(key, uuid4().hex)
+        return version
+
+    def invalidate(self, user_id):
+        # O(1) : the next version() returns the new token.
+        self.cache.set(f'version:{int(user_id)}', uuid4().hex, timeout=None)
+
+    def invalidate_on_commit(self, user_id):
+        # invalidated after the commit, so the response of the uncommitted rows is never cached with the new version.
+        transaction.on_commit(lambda: self.invalidate(user_id))
+
+    def key(self, user_id, request, media_type=None):
+        """
+        # key
+            - version is read before the queries of the view, so the response is stored with the version it was made under.
+            - media_type is the accepted_media_type of the DRF request, if not given.
+        """
+        if media_type == None:
+            media_type = request.accepted_media_type
+        params = sorted((name, tuple(values)) for name, values in request.POST.lists())
+        digest = sha1(repr((request.path, media_type, params)).encode()).hexdigest()
+        return f'response:{int(user_id)}:{self.version(user_id)}:{digest}'
+
+    def etag(self, key):
+        # strong ETag. the body of the same key is the same bytes, until the version is replaced.
+        return '"' + sha1(key.encode()).hexdigest() + '"'
+
+    def not_modified(self, request, etag, exists=False):
+        """
+        # not_modified
+            - True if If-None-Match of the request has the etag. compared by the weak comparison, as RFC 9110 13.1.2.
+            - the read views are POST, so 304 is returned in place of the 412 of the unsafe methods.
+            - "*" matches any current response, so it is True only if exists : the view has already made its 200.
+              before the view runs, the target may not exist, and the view returns 400 for it.
+        """
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if header == None:
+            return False
+        etags = parse_etags(header)
+        if (exists == True and '*' in etags) or etag in [value.removeprefix('W/') for value in etags]:
+            self.count('not_modified')
+            return True
+        return False
+
+    def get(self, key):
+        # (content_type, body) or None.
+        cached = self.cache.get(key)
+        self.count('miss' if cached == None else 'hit')
+        return cached
+
+    def set(self, key, content_type, body):
+        if len(body) > self.max_bytes:
+            self.count('skip')
+            return
+        self.cache.set(key, (content_type, body))
+        self.count('store')
+
+    def store(self, key, response):
+        """
+        # store
+            - store the body of the response, when it is made.
+            - DRF Response : after its rendering. StreamingHttpResponse : after the last chunk is sent, only if it is small enough.
+        """
+        if isinstance(response, StreamingHttpResponse):
+            response.streaming_content = self._tee(key, response['Content-Type'], response.streaming_content)
+        else:
+            response.add_post_render_callback(lambda response: self.set(key, response['Content-Type'], response.content))
+
+    def _tee(self, key, content_type, chunks):
+        parts = []
+        size = 0
+        for chunk in chunks:
+            yield chunk
+            if parts != None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+        if parts != None:
+            self.set(key, content_type, b''.join(parts))
+        else:
+            self.count('skip')
+
+
+responses = Response_cache(getattr(settings, 'RESPONSE_CACHE', 'default'),
+                           getattr(settings, 'RESPONSE_CACHE_MAX_BYTES', 256 * 1024))
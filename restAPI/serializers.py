@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from . import models 
+from .hashing import passwords
 
 
 #region USER
@@ -15,7 +16,7 @@ class User_createSafe(serializers.ModelSerializer):
     def create(self, validated_data):
         user = super().create(validated_data)
         password = user.password
-        user.set_password(password)
+        passwords.run(user.set_password, password)
         user.save()
         return user
 
@@ -29,27 +30,40 @@ class User_updateSafe(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         instance.email = validated_data["email"]
-        instance.set_password(validated_data["password"])
+        passwords.run(instance.set_password, validated_data["password"])
         instance.save()
 
         return instance
 
+class Token_login_argsGet(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField(trim_whitespace=False)
+
+class Token_refresh_argsGet(serializers.Serializer):
+    refresh = serializers.CharField()
+
+class User_import_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    document = serializers.FileField()
+    replace = serializers.BooleanField(required=False, default=False)
+
 #endregion
 
 
 #region PROJECT
 
 class Project_all(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source='project_id.user_id_id', read_only=True)
+    project_name = serializers.CharField(source='project_id.project_name', read_only=True)
     class Meta:
         fields = (
             'user_id',
             'project_name',
             'todo_name'
         )
-        model = models.Project
+        model = models.Todo
 
 class Project_project(serializers.ModelSerializer):
-    todo_name = ''
     class Meta:
         fields = (
             'user_id',
@@ -58,18 +72,31 @@ class Project_project(serializers.ModelSerializer):
         model = models.Project
 
 class Project_user(serializers.ModelSerializer):
-    todo_name = ''
     class Meta:
         fields = (
             'user_id',
         )
         model = models.Project
 
+class Project_count(serializers.ModelSerializer):
+    todo_count = serializers.IntegerField(read_only=True)
+    class Meta:
+        fields = (
+            'user_id',
+            'project_name',
+            'todo_count',
+        )
+        model = models.Project
+
 #endregion
 
 #region  STAMP
 
 class Stamp_all(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source='subelement_id.stamp_id.user_id_id', read_only=True)
+    stamp_name = serializers.CharField(source='subelement_id.stamp_id.stamp_name', read_only=True)
+    subelement_name = serializers.CharField(source='subelement_id.subelement_name', read_only=True)
+    defFunc_name = serializers.CharField(source='subelement_id.defFunc_name', read_only=True)
     class Meta:
         fields = (
             'user_id',
@@ -79,9 +106,12 @@ class Stamp_all(serializers.ModelSerializer):
             'arg_name',
             'arg_val',
         )
-        model = models.Stamp
+        model = models.SubelementArg
 
 class Stamp_arg(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source='subelement_id.stamp_id.user_id_id', read_only=True)
+    stamp_name = serializers.CharField(source='subelement_id.stamp_id.stamp_name', read_only=True)
+    subelement_name = serializers.CharField(source='subelement_id.subelement_name', read_only=True)
     class Meta:
         fields = (
             'user_id',
@@ -89,7 +119,7 @@ class Stamp_arg(serializers.ModelSerializer):
             'subelement_name',
             'arg_name',
         )
-        model = models.Stamp
+        model = models.SubelementArg
 
 class Stamp_subelement_argsGet(serializers.Serializer):
     user_id = serializers.PrimaryKeyRelatedField(queryset=models.User.objects.all()) 
@@ -102,52 +132,58 @@ class Stamp_subelement_argsGet(serializers.Serializer):
     arg_vals = serializers.CharField()
 
 class Stamp_subelement(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source='stamp_id.user_id_id', read_only=True)
+    stamp_name = serializers.CharField(source='stamp_id.stamp_name', read_only=True)
     class Meta:
-        arg_name = ''
-        arg_val = ''
         fields = (
             'user_id',
             'stamp_name',
             'subelement_name',
             'defFunc_name',
         )
-        model = models.Stamp
+        model = models.Subelement
 
 class Stamp_subelement_retrieve(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source='stamp_id.user_id_id', read_only=True)
+    stamp_name = serializers.CharField(source='stamp_id.stamp_name', read_only=True)
     class Meta:
-        arg_name = ''
-        arg_val = ''
         fields = (
             'user_id',
             'stamp_name',
             'subelement_name',
 
         )
-        model = models.Stamp
+        model = models.Subelement
 
 class Stamp_stamp(serializers.ModelSerializer):
     class Meta:
-        arg_name = ''
-        arg_val = ''
-        subelement_name = ''
-        defFunc_name = ''
         fields = (
             'user_id',
             'stamp_name',
         )
         model = models.Stamp
 
+class Stamp_stamp_created(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id',
+            'user_id',
+            'stamp_name',
+        )
+        model = models.Stamp
+
 class Stamp_user(serializers.ModelSerializer):
     class Meta:
-        arg_name = ''
-        arg_val = ''
-        subelement_name = ''
-        defFunc_name = ''
         fields = (
             'user_id',
         )
         model = models.Stamp
 
+class Stamp_tree_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+
+    stamp_name = serializers.CharField(required=False)
+
 class Stamp_update_stamp(serializers.Serializer):
     user_id = serializers.PrimaryKeyRelatedField(queryset=models.User.objects.all()) 
 
@@ -209,4 +245,51 @@ class Main_main_argsGet(serializers.Serializer):
 
     main_vals = serializers.CharField()
 
-# endregion
\ No newline at end of file
+class Main_bulk_record(serializers.Serializer):
+    stamp_id = serializers.IntegerField()
+    date = serializers.DateField()
+
+    main_vals = serializers.CharField()
+
+class Main_bulk_argsGet(serializers.Serializer):
+    user_id = serializers.PrimaryKeyRelatedField(queryset=models.User.objects.all())
+
+    records = serializers.CharField()
+
+class Main_heatmap_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    stamp_id = serializers.IntegerField(required=False)
+
+    year = serializers.IntegerField(min_value=1, max_value=9998)
+
+class Main_range_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    stamp_id = serializers.IntegerField(required=False)
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+# endregion
+
+
+#region SYNC
+
+class Sync_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+
+    since = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+#endregion
+
+
+#region BATCH
+
+class Batch_argsGet(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    operations = serializers.JSONField(binary=True) # JSON text of the POST param.
+
+#endregion
@@ -1,7 +1,14 @@
 # subelement.py
-# interpret the Models.Stamp -> subelements -> args
+# interpret the Models.Stamp -> Subelement -> SubelementArg
 # then change them to Main saved form.
 
+from collections import OrderedDict
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
 from . import models
 
 def stringify_bool(target):
@@ -105,8 +112,8 @@ class Discrete_point():
 
         Args:
             - db_dict (dict) : string-only dict from db.
-            - target_queryset (queryset) : object obtained from Stamp model. 
-                + models.Stamp.objects.filter(< query for user_id & stamp_id & subelement_name & ~arg_name='' >)
+            - target_queryset (queryset) : object obtained from SubelementArg model.
+                + models.SubelementArg.objects.filter(< query for subelement_id >)
         """
         # get args from queryset
         querydict = {}
@@ -130,7 +137,7 @@ class Discrete_point():
         return result
 
     @classmethod
-    def subvar_set(cls, subelement_queryset, *value_list):
+    def subvar_set(cls, subelement, *value_list, accumulated=0):
         """
         # subvar_set
             - Main model dosen't decide what subvars should put in the arg.
@@ -138,8 +145,10 @@ class Discrete_point():
 
         Args:
             - value (int) : value for discrete_point.
-            - subelement_queryset (queryset) : object that targeted subelement is included, where from stamp model
-                + you can obtain it like models.Stamp.objects.filter(< query for user_id & stamp_id & subelement_name & ~arg_name='' >)
+            - subelement (Compiled_subelement) : typed args of the targeted subelement.
+                + you can obtain it like definitions.get(user_id, stamp_id).subelements
+            - accumulated (int) : running total of the previous recodes.
+                + read it from models.Ledger, so no models.Main scan is needed.
         Returns:
             - (dict) result  : string-only dict that can directly put in Main model's subvar arg.
             - (bool)  : False will returned if the value is inapproate with Stamp model's subelement args. (like if value is over the upperbound value.)
@@ -153,15 +162,8 @@ class Discrete_point():
             raise TypeError("value should be able to converted to the integer.")
         
 
-        # get args from queryset
-        parsed_db = {}
-        for obj in subelement_queryset:
-            arg_name = getattr(obj, 'arg_name')
-            typefunc = cls.subelement_type[arg_name]
-            arg_val = typefunc(getattr(obj, 'arg_val'))
-            if arg_name != '' and arg_val != '':
-                parsed_db[arg_name] = arg_val
-
+        # typed args, already parsed by compile_stamp
+        parsed_db = subelement.args
 
         result = {}
 
@@ -175,26 +177,7 @@ class Discrete_point():
 
         # accumulated value calculation
         if parsed_db['is_accumulated'] == True:
-            user_id = getattr(subelement_queryset[0], 'user_id')
-            stamp_id = getattr(subelement_queryset[0], 'id')
-
-            #find the records of user, with matching stamp_id
-            filtered_recode = models.Main.objects.filter(user_id = user_id, stamp_id = stamp_id, arg_name='value')
-            if filtered_recode.exists() == False:
-                result['accumulate'] = 0
-            else:
-                count = filtered_recode.count()
-                if count == 1:
-                    result['accumulate'] = int(getattr(filtered_recode[0], 'arg_val'))
-                else:
-                    result['accumulate'] = int(getattr(filtered_recode.order_by('-date')[0], 'arg_val'))
-        
-            # accumulated value boundary validation
-            acc_added = result['accumulate'] + result['value']
-            if parsed_db['acc_lbound'] > acc_added:
-                result['accumulate'] = parsed_db['acc_lbound'] - result['value']
-            elif acc_added >= parsed_db['acc_ubound']:
-                result['accumulate'] = parsed_db['acc_ubound'] - result['value']
+            result['accumulate'] = cls._accumulate(parsed_db, accumulated, result['value'])
 
         #stringify result
         stringified = {}
@@ -202,6 +185,100 @@ class Discrete_point():
             stringified[k] = str(v)
 
         return stringified
+
+    @classmethod
+    def subvar_resync(cls, subelement, user_id, stamp_id, since=None):
+        """
+        # subvar_resync
+            - Main model's accumulate is the running total of the recodes before it, ordered by date.
+            - back-dated create, delete or subelement update makes the later recodes' accumulate stale.
+            - this function recompute only the suffix starts from the since date, then write it with one bulk update.
+            - acc boundary clamps the running total, so it cannot be split into prefix sums.
+              instead, the recode right before the since date (accumulate + value) is used as the checkpoint.
+
+        Args:
+            - subelement (Compiled_subelement) : same as subvar_set.
+            - user_id (int) : owner of the recodes.
+            - stamp_id (int) : id of the stamp descriptional row.
+            - since (str|date) : first date to recompute. None for the whole history.
+        Returns:
+            - (int, list) : running total after the last recode, that should be saved in models.Ledger,
+                            and the dates of the recodes touched by the new change_seq. (see models.Sequence)
+            - (None, []) : if the subelement is not accumulated.
+        """
+        parsed_db = subelement.args
+        if parsed_db['is_accumulated'] == False:
+            return None, []
+
+        recodes = models.Main.objects.filter(user_id = user_id, stamp_id = stamp_id, arg_name__in = ['value', 'accumulate'])
+
+        # checkpoint : the running total right before the since date.
+        accumulated = 0
+        if since != None:
+            prev = list(recodes.filter(date__lt = since).order_by('-date', '-arg_name').values_list('date', 'arg_name', 'arg_val')[:2])
+            for date, arg_name, arg_val in prev:
+                if date == prev[0][0]:
+                    accumulated += int(arg_val)
+            recodes = recodes.filter(date__gte = since)
+
+        # suffix : group arg rows by date, then walk them in order.
+        suffix = {}
+        for obj in recodes.order_by('date', 'arg_name'):
+            suffix.setdefault(getattr(obj, 'date'), {})[getattr(obj, 'arg_name')] = obj
+
+        changed = []
+        created = []
+        for date, args in suffix.items():
+            if 'value' not in args:
+                continue
+            value = int(getattr(args['value'], 'arg_val'))
+            accumulate = cls._accumulate(parsed_db, accumulated, value)
+            if 'accumulate' not in args:
+                created.append(models.Main(user_id_id = user_id,
+                                           stamp_id_id = stamp_id,
+                                           date = date,
+                                           arg_name = 'accumulate',
+                                           arg_val = str(accumulate)))
+            elif getattr(args['accumulate'], 'arg_val') != str(accumulate):
+                args['accumulate'].arg_val = str(accumulate)
+                changed.append(args['accumulate'])
+            accumulated = accumulate + value
+
+        models.Main.objects.bulk_update(changed, ['arg_val'])
+        models.Main.objects.bulk_create(created)
+
+        # changed recodes are touched by their descriptional row. they are in the suffix, so touch from the first one.
+        # new change_seq too, so api/sync sends the recomputed accumulate.
+        dates = [getattr(obj, 'date') for obj in changed + created]
+        touched = []
+        if len(dates) != 0:
+            headers = models.Main.objects.filter(user_id = user_id, stamp_id = stamp_id, arg_name = '', date__gte = min(dates))
+            touched = list(headers.values_list('date', flat=True))
+            headers.update(updated_at = timezone.now(), change_seq = models.Sequence.objects.next())
+
+        return accumulated, touched
+
+    @classmethod
+    def _subelement_parse(cls, arg_pairs):
+        # SubelementArg model's (arg_name, arg_val) -> typed dict
+        parsed_db = {}
+        for arg_name, arg_val in arg_pairs:
+            typefunc = cls.subelement_type[arg_name]
+            arg_val = typefunc(arg_val)
+            if arg_name != '' and arg_val != '':
+                parsed_db[arg_name] = arg_val
+        return parsed_db
+
+    @classmethod
+    def _accumulate(cls, parsed_db, accumulated, value):
+        # accumulated value boundary validation
+        accumulate = int(accumulated)
+        acc_added = accumulate + value
+        if parsed_db['acc_lbound'] > acc_added:
+            accumulate = parsed_db['acc_lbound'] - value
+        elif acc_added >= parsed_db['acc_ubound']:
+            accumulate = parsed_db['acc_ubound'] - value
+        return accumulate
     
     @classmethod
     def subvar_get(cls, target_queryset, *target_key):
@@ -239,3 +316,138 @@ class Discrete_point():
 loc = {
     "discrete_point" : Discrete_point,
 }
+
+
+class Compiled_subelement():
+    """
+    # Compiled_subelement
+        - one subelement of the stamp, with args already parsed by subelement_type typefuncs.
+    Args
+        subelement_name (str) : subelement's name.
+        defFunc_name (str) : key of loc.
+        args (dict) : typed arg_name -> arg_val.
+    """
+    __slots__ = ('subelement_name', 'defFunc_name', 'args')
+
+    def __init__(self, subelement_name, defFunc_name, args):
+        self.subelement_name = subelement_name
+        self.defFunc_name = defFunc_name
+        self.args = args
+
+    @property
+    def defFunc(self):
+        return loc[self.defFunc_name]
+
+
+class Compiled_stamp():
+    """
+    # Compiled_stamp
+        - whole definition of the stamp, that Main_CREATE_main needs.
+    Args
+        user_id (int) : owner of the stamp.
+        stamp_id (int) : id of the stamp descriptional row.
+        stamp_name (str) : stamp's name.
+        subelements (list<Compiled_subelement>) : subelements in the creation order.
+    """
+    __slots__ = ('user_id', 'stamp_id', 'stamp_name', 'subelements')
+
+    def __init__(self, user_id, stamp_id, stamp_name, subelements):
+        self.user_id = user_id
+        self.stamp_id = stamp_id
+        self.stamp_name = stamp_name
+        self.subelements = subelements
+
+
+def compile_stamp(user_id, stamp_id):
+    """
+    # compile_stamp
+        - read the stamp from models.Stamp, Subelement, SubelementArg then make the Compiled_stamp.
+        - raise models.Stamp.DoesNotExist if user does not own the stamp.
+    """
+    stamp_name = models.Stamp.objects.values_list('stamp_name', flat=True).get(id = stamp_id, user_id = user_id)
+    rows = models.Subelement.objects.filter(stamp_id = stamp_id).order_by('id', 'arg_subelement__id').values_list(
+        'subelement_name', 'defFunc_name', 'arg_subelement__arg_name', 'arg_subelement__arg_val')
+
+    # group the joined rows by subelement_name.
+    defFunc_names = OrderedDict()
+    arg_pairs = {}
+    for subelement_name, defFunc_name, arg_name, arg_val in rows:
+        defFunc_names[subelement_name] = defFunc_name
+        if arg_name != None:
+            arg_pairs.setdefault(subelement_name, []).append((arg_name, arg_val))
+
+    subelements = []
+    for subelement_name, defFunc_name in defFunc_names.items():
+        args = loc[defFunc_name]._subelement_parse(arg_pairs.get(subelement_name, []))
+        subelements.append(Compiled_subelement(subelement_name, defFunc_name, args))
+
+    return Compiled_stamp(int(user_id), int(stamp_id), stamp_name, subelements)
+
+
+class Definition_cache():
+    """
+    # Definition_cache
+        - bounded LRU cache of Compiled_stamp, keyed by (user_id, stamp_id).
+        - every view that changes models.Stamp MUST call invalidate() with the user_id, stamp_name.
+        - get() stores whatever it compiled, so it must not be called on the uncommitted stamp.
+          the write transaction and the operations of api/batch compile by compile_stamp() directly. (see views.IsOwner_permission_Mixin.fetch_definition)
+        - cache lives in the process memory, and invalidate() reaches this process only.
+          it assumes the single server process (manage.py runserver of the Dockerfile, its threads share the cache).
+          with several worker processes, the others keep the old stamp until it is evicted,
+          so run one process, or set settings.DEFINITION_CACHE_SIZE to 0 there.
+    Args
+        maxsize (int) : maximum count of the cached stamps. least recently used one is dropped first.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._entries = OrderedDict() # (user_id, stamp_id) -> Compiled_stamp
+        self._names = {} # (user_id, stamp_name) -> (user_id, stamp_id)
+        self._generation = 0 # bumped by invalidate(), compiled result from older generation is not stored.
+
+    def get(self, user_id, stamp_id):
+        key = (int(user_id), int(stamp_id))
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled != None:
+                self._entries.move_to_end(key)
+                return compiled
+            generation = self._generation
+
+        compiled = compile_stamp(*key)
+        with self._lock:
+            if generation != self._generation:
+                return compiled
+            self._entries[key] = compiled
+            self._names[(compiled.user_id, compiled.stamp_name)] = key
+            while len(self._entries) > self.maxsize:
+                _, dropped = self._entries.popitem(last=False)
+                self._names.pop((dropped.user_id, dropped.stamp_name), None)
+        return compiled
+
+    async def aget(self, user_id, stamp_id):
+        # async version of get(). cached one is returned without the thread hop.
+        key = (int(user_id), int(stamp_id))
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled != None:
+                self._entries.move_to_end(key)
+                return compiled
+        return await sync_to_async(self.get)(*key)
+
+    def invalidate(self, user_id, stamp_name):
+        with self._lock:
+            self._generation += 1
+            key = self._names.pop((int(user_id), stamp_name), None)
+            if key != None:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._names.clear()
+
+
+definitions = Definition_cache(getattr(settings, 'DEFINITION_CACHE_SIZE', 1024))
@@ -1,3 +1,819 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import random
+import threading
+import tracemalloc
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from . import document
+from . import hashing
+from . import models
+from . import push
+from . import serializers
+from . import subelement as sub
+from . import tokens
+from . import views
+
+
+def post(client, url, **data):
+    # (status, body) of the api view, body is decoded from JSON.
+    response = client.post('/api/' + url, data, HTTP_ACCEPT='application/json')
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, (json.loads(content) if len(content) != 0 else None)
+
+
+def clear_caches():
+    # the caches are keyed by the ids, which the next test db reuses.
+    for cache in caches.all():
+        cache.clear()
+    sub.definitions.clear()
+
+
+class Unique_race_TestCase(TransactionTestCase):
+    """
+    # Unique_race_TestCase
+        - the same create is sent by the threads at once. the unique constraint of the db lets one of them in,
+          the others get 400 instead of the duplicated row or 500.
+    """
+
+    racers = 2
+
+    def setUp(self):
+        self.user = models.User.objects.create_user('racer', 'racer@a.com', 'pw')
+        self.client.force_login(self.user)
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names='lowerbound upperbound', arg_vals='0 500')
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='run')
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='home')
+        self.stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+
+    def race(self, url, *requests):
+        # each thread sends one of the requests, or the same request if only one is given.
+        requests = requests * self.racers if len(requests) == 1 else requests
+        barrier = threading.Barrier(len(requests))
+        statuses = []
+
+        def racer(data):
+            client = Client()
+            client.force_login(self.user)
+            try:
+                barrier.wait()
+                statuses.append(post(client, url, **data)[0])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=racer, args=(data,)) for data in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def test_stamp(self):
+        statuses = self.race('stamp/create/stamp', dict(user_id=self.user.id, stamp_name='code'))
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(models.Stamp.objects.filter(user_id=self.user.id, stamp_name='code').count(), 1)
+
+    def test_stamp_rename(self):
+        # two stamps renamed to the same name.
+        statuses = self.race('stamp/update/stamp', dict(user_id=self.user.id, stamp_name='run', stamp_rename='jog'),
+                             dict(user_id=self.user.id, stamp_name='read', stamp_rename='jog'))
+        self.assertEqual(statuses, [202, 400])
+        self.assertEqual(models.Stamp.objects.filter(user_id=self.user.id, stamp_name='jog').count(), 1)
+
+    def test_stamp_rename_empty(self):
+        # empty rename keeps the name, never writes NULL.
+        status, body = post(self.client, 'stamp/update/stamp', user_id=self.user.id, stamp_name='run', stamp_rename='')
+        self.assertEqual(status, 400)
+        self.assertTrue(models.Stamp.objects.filter(user_id=self.user.id, stamp_name='run').exists())
+
+    def test_todo(self):
+        statuses = self.race('project/create/todo', dict(user_id=self.user.id, project_name='home', todo_name='dishes'))
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(models.Todo.objects.filter(todo_name='dishes').count(), 1)
+
+    def test_main(self):
+        statuses = self.race('main/create/main', dict(user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-01', main_vals='7'))
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(models.Main.objects.filter(stamp_id=self.stamp_id, date='2023-01-01', arg_name='').count(), 1)
+        self.assertEqual(models.Ledger.objects.get(stamp_id=self.stamp_id).total, 7)
+
+    def test_first_ledger(self):
+        # first recodes of the stamp on the different dates : both are in, and share one ledger row.
+        statuses = self.race('main/create/main', dict(user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-01', main_vals='7'),
+                             dict(user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-02', main_vals='5'))
+        self.assertEqual(statuses, [201, 201])
+        self.assertEqual(models.Ledger.objects.get(stamp_id=self.stamp_id, subelement_name='pages').total, 12)
+
+
+class Upgrade_TestCase(TransactionTestCase):
+    """
+    # Upgrade_TestCase
+        - db of the previous layout (0001_initial, no Ledger) is migrated to the latest, as project_settings_howTo.md does.
+        - its stamp rows are split, and its stale accumulates and Ledger are walked from the first recode.
+    """
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(target)
+        return executor.loader.project_state(target).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('restAPI'))
+
+    def test_from_initial(self):
+        apps = self.migrate([('restAPI', '0001_initial')])
+        User, Stamp, Main = (apps.get_model('restAPI', name) for name in ('User', 'Stamp', 'Main'))
+        user = User.objects.create(username='old', email='old@a.com')
+        header = Stamp.objects.create(user_id=user, stamp_name='read')
+        for arg_name, arg_val in (('', ''), ('is_accumulated', 'T'), ('acc_lbound', '0'), ('acc_ubound', '12')):
+            Stamp.objects.create(user_id=user, stamp_name='read', subelement_name='pages', defFunc_name='discrete_point',
+                                 arg_name=arg_name, arg_val=arg_val)
+        for day, value in ((1, 10), (2, 5), (3, 7)):
+            for arg_name, arg_val in (('', ''), ('value', str(value)), ('accumulate', '0')):
+                Main.objects.create(user_id=user, stamp_id=header, date=datetime.date(2023, 1, day), arg_name=arg_name, arg_val=arg_val)
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('restAPI'))
+        # 0, then clamped by acc_ubound : 12 - 5, 12 - 7.
+        self.assertEqual(list(models.Main.objects.filter(arg_name='accumulate').order_by('date').values_list('arg_val', flat=True)),
+                         ['0', '7', '5'])
+        self.assertEqual(list(models.Ledger.objects.values_list('stamp_id', 'subelement_name', 'total')), [(header.id, 'pages', 12)])
+        self.assertEqual(models.Subelement.objects.get().stamp_id_id, header.id)
+
+
+class Ledger_TestCase(TestCase):
+    """
+    # Ledger_TestCase
+        - accumulate of every recode and the total of models.Ledger are same as the naive walk of all the recodes by date,
+          after the back-dated creates, deletes, bulk creates and the bound changes of the subelement.
+        - acc bounds are small, so the running total is clamped on the way.
+    """
+
+    bounds = 'lowerbound upperbound acc_lbound acc_ubound'
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('counter', 'counter@a.com', 'pw')
+        self.client.force_login(self.user)
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names=self.bounds, arg_vals='-20 40 -30 60')
+        self.stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+        self.random = random.Random(2)
+        self.dates = []
+
+    def naive(self):
+        # running total walked from the first recode, by the current args of the subelement.
+        args = {arg_name: sub.Discrete_point.subelement_type[arg_name](arg_val)
+                for arg_name, arg_val in models.SubelementArg.objects.filter(subelement_id__stamp_id=self.stamp_id)
+                                                                     .values_list('arg_name', 'arg_val')}
+        values = dict(models.Main.objects.filter(stamp_id=self.stamp_id, arg_name='value').values_list('date', 'arg_val'))
+        accumulated = 0
+        expected = {}
+        for date in sorted(values):
+            expected[date] = sub.Discrete_point._accumulate(args, accumulated, int(values[date]))
+            accumulated = expected[date] + int(values[date])
+        return expected, accumulated
+
+    def assertLedger(self):
+        expected, total = self.naive()
+        accumulates = {date: int(arg_val) for date, arg_val in
+                       models.Main.objects.filter(stamp_id=self.stamp_id, arg_name='accumulate').values_list('date', 'arg_val')}
+        self.assertEqual(accumulates, expected)
+        self.assertEqual(models.Ledger.objects.get(stamp_id=self.stamp_id, subelement_name='pages').total, total)
+
+    def new_date(self):
+        date = datetime.date(2023, 1, 1) + datetime.timedelta(days=self.random.randrange(365))
+        while date in self.dates:
+            date = datetime.date(2023, 1, 1) + datetime.timedelta(days=self.random.randrange(365))
+        self.dates.append(date)
+        return date
+
+    def create(self):
+        status, _ = post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=self.stamp_id,
+                         date=self.new_date(), main_vals=str(self.random.randint(-30, 50)))
+        self.assertEqual(status, 201)
+
+    def delete(self):
+        date = self.dates.pop(self.random.randrange(len(self.dates)))
+        status, _ = post(self.client, 'main/delete/main', user_id=self.user.id, stamp_id=self.stamp_id, date=date)
+        self.assertLess(status, 300)
+
+    def bulk(self, count):
+        records = [{'stamp_id': self.stamp_id, 'date': str(self.new_date()), 'main_vals': str(self.random.randint(-30, 50))}
+                   for _ in range(count)]
+        status, _ = post(self.client, 'main/create/bulk', user_id=self.user.id, records=json.dumps(records))
+        self.assertEqual(status, 201)
+
+    def test_back_dated(self):
+        for step in range(40):
+            if len(self.dates) > 3 and self.random.random() < 0.3:
+                self.delete()
+            else:
+                self.create()
+            self.assertLedger()
+
+    def test_bulk(self):
+        for _ in range(5):
+            self.create()
+        for count in (1, 6, 6):
+            self.bulk(count)
+            self.assertLedger()
+            self.delete()
+            self.assertLedger()
+
+    def test_bound_change(self):
+        for _ in range(15):
+            self.create()
+        for arg_vals in ('-20 40 0 30', '-20 40 -500 500', '-20 40 10 20'):
+            with self.subTest(arg_vals):
+                status, _ = post(self.client, 'stamp/update/subelement', user_id=self.user.id, stamp_name='read',
+                                 subelement_name='pages', defFunc_rename='discrete_point', arg_names=self.bounds, arg_vals=arg_vals)
+                self.assertEqual(status, 202)
+                self.assertLedger()
+                self.create()
+                self.assertLedger()
+
+
+class Conditional_response_TestCase(TestCase):
+    """
+    # Conditional_response_TestCase
+        - unchanged read is revalidated by If-None-Match with the ETag of the 200, and answered by 304 without the view's queries.
+    """
+
+    reads = [('project/retrieve/project', {'project_name': 'home'}),
+             ('stamp/retrieve/stamp', {'stamp_name': 'read'}),
+             ('stamp/retrieve/tree', {}),
+             ('main/retrieve/range', {'date_from': '2023-01-01', 'date_to': '2023-12-31'}),
+             ('main/heatmap', {'year': 2023}),
+             ('sync', {}),
+             ('async/stamp/retrieve/stamp', {'stamp_name': 'read'})]
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('reader', 'reader@a.com', 'pw')
+        self.client.force_login(self.user)
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='home')
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names='lowerbound upperbound', arg_vals='0 500')
+        stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+        post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=stamp_id, date='2023-01-01', main_vals='7')
+
+    def read(self, url, data, **headers):
+        return self.client.post('/api/' + url, {'user_id': self.user.id, **data}, HTTP_ACCEPT='application/json', **headers)
+
+    def test_revalidation(self):
+        for url, data in self.reads:
+            with self.subTest(url):
+                etag = self.read(url, data)['ETag']
+                # the session and the user are cached, and the owner check compares the ids. no query at all.
+                with self.assertNumQueries(0):
+                    response = self.read(url, data, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        url, data = self.reads[0]
+        etag = self.read(url, data)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            post(self.client, 'project/create/todo', user_id=self.user.id, project_name='home', todo_name='dishes')
+        response = self.read(url, data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_any_etag(self):
+        # "*" is 304 only for the existing target, the missing one is still 400.
+        for url in ('project/retrieve/project', 'async/project/retrieve/project'):
+            with self.subTest(url):
+                self.assertEqual(self.read(url, {'project_name': 'home'}, HTTP_IF_NONE_MATCH='*').status_code, 304)
+                self.assertEqual(self.read(url, {'project_name': 'nothing'}, HTTP_IF_NONE_MATCH='*').status_code, 400)
+
+
+class Query_budget_TestCase(TestCase):
+    """
+    # Query_budget_TestCase
+        - queries of each view, on the miss of the response cache. the session and the user are cached already.
+        - the owner check and the fetch of the rows are one query, the missing target is answered from the same rows.
+    """
+
+    reads = [('project/retrieve/user', {}, 1),
+             ('project/retrieve/project', {'project_name': 'home'}, 1),
+             ('project/retrieve/list', {}, 1),
+             ('stamp/retrieve/user', {}, 1),
+             ('stamp/retrieve/stamp', {'stamp_name': 'read'}, 1),
+             ('stamp/retrieve/subelement', {'stamp_name': 'read', 'subelement_name': 'pages'}, 1),
+             ('stamp/retrieve/tree', {}, 1),
+             ('stamp/retrieve/tree', {'stamp_name': 'read'}, 1),
+             ('main/retrieve/range', {'date_from': '2023-01-01', 'date_to': '2023-12-31'}, 3), # recodes, stamp names, arg rows.
+             ('main/heatmap', {'year': 2023}, 1)]
+
+    missing = [('project/retrieve/project', {'project_name': 'nothing'}),
+               ('stamp/retrieve/stamp', {'stamp_name': 'nothing'}),
+               ('stamp/retrieve/subelement', {'stamp_name': 'read', 'subelement_name': 'nothing'}),
+               ('stamp/retrieve/tree', {'stamp_name': 'nothing'})]
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('budget', 'budget@a.com', 'pw')
+        self.client.force_login(self.user)
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='home')
+        post(self.client, 'project/create/todo', user_id=self.user.id, project_name='home', todo_name='dishes')
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names='lowerbound upperbound', arg_vals='0 500')
+        self.stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+        post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-01', main_vals='7')
+        post(self.client, 'project/retrieve/user', user_id=self.user.id) # session and user into the cache.
+
+    def miss(self):
+        caches['response'].clear()
+        sub.definitions.clear()
+
+    def test_reads(self):
+        for url, data, budget in self.reads:
+            with self.subTest(url, **data):
+                self.miss()
+                with self.assertNumQueries(budget):
+                    status, _ = post(self.client, url, user_id=self.user.id, **data)
+                self.assertEqual(status, 200)
+
+    def test_missing(self):
+        for url, data in self.missing:
+            with self.subTest(url, **data):
+                self.miss()
+                with self.assertNumQueries(1):
+                    status, _ = post(self.client, url, user_id=self.user.id, **data)
+                self.assertEqual(status, 400)
+
+    def test_deletes(self):
+        # the rows fetched by the owner check are deleted, never read again.
+        deletes = [('project/delete/todo', {'project_name': 'home', 'todo_name': 'dishes'}),
+                   ('main/delete/main', {'stamp_id': self.stamp_id, 'date': '2023-01-01'}),
+                   ('stamp/delete/subelement', {'stamp_name': 'read', 'subelement_name': 'pages'}),
+                   ('project/delete/project', {'project_name': 'home'})]
+        for url, data in deletes:
+            with self.subTest(url):
+                with CaptureQueriesContext(connection) as queries:
+                    status, _ = post(self.client, url, user_id=self.user.id, **data)
+                self.assertEqual(status, 200)
+                statements = [query['sql'].split(' ', 1)[0] for query in queries.captured_queries if not query['sql'].startswith('SAVEPOINT')]
+                self.assertEqual(statements[:2], ['SELECT', 'DELETE'])
+
+
+class Query_plan_TestCase(TestCase):
+    """
+    # Query_plan_TestCase
+        - EXPLAIN QUERY PLAN of the hot querysets, on the db of several users with thousands of recodes.
+        - each queryset searches by its own index, and no query of the views scans a whole table.
+    """
+
+    users = 3
+    stamps = 10
+    days = 120
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_ids = []
+        first = datetime.date(2023, 1, 1)
+        for number in range(cls.users):
+            user = models.User.objects.create_user(f'planner{number}', f'planner{number}@a.com', 'pw')
+            cls.user_ids.append(user.id)
+            projects = models.Project.objects.bulk_create([models.Project(user_id=user, project_name=f'project{index}', change_seq=index)
+                                                           for index in range(cls.stamps)])
+            models.Todo.objects.bulk_create([models.Todo(project_id=project, todo_name=f'todo{index}')
+                                             for project in projects for index in range(5)])
+            stamps = models.Stamp.objects.bulk_create([models.Stamp(user_id=user, stamp_name=f'stamp{index}', change_seq=index)
+                                                       for index in range(cls.stamps)])
+            subelements = models.Subelement.objects.bulk_create([models.Subelement(stamp_id=stamp, subelement_name='pages',
+                                                                                   defFunc_name='discrete_point')
+                                                                 for stamp in stamps])
+            models.SubelementArg.objects.bulk_create([models.SubelementArg(subelement_id=subelement, arg_name=arg_name, arg_val=arg_val)
+                                                      for subelement in subelements
+                                                      for arg_name, arg_val in sub.Discrete_point.subelement_set().items()])
+            models.Main.objects.bulk_create([models.Main(user_id=user, stamp_id=stamp, date=first + datetime.timedelta(days=day),
+                                                         arg_name=arg_name, arg_val=arg_val, change_seq=day)
+                                             for stamp in stamps for day in range(cls.days)
+                                             for arg_name, arg_val in (('', ''), ('value', '1'), ('accumulate', str(day)))])
+            models.Daily.objects.bulk_create([models.Daily(user_id=user, stamp_id=stamp, date=first + datetime.timedelta(days=day),
+                                                           count=1, total=1)
+                                              for stamp in stamps for day in range(cls.days)])
+            models.Ledger.objects.bulk_create([models.Ledger(user_id=user, stamp_id=stamp, subelement_name='pages', total=cls.days)
+                                               for stamp in stamps])
+            models.Tombstone.objects.bulk_create([models.Tombstone(user_id=user, kind='stamp', target_id=index,
+                                                                   target_name=f'gone{index}', change_seq=index)
+                                                  for index in range(cls.stamps)])
+
+    def setUp(self):
+        clear_caches()
+        self.user_id = self.user_ids[1]
+        self.stamp_id = models.Stamp.objects.get(user_id=self.user_id, stamp_name='stamp3').id
+        self.project_id = models.Project.objects.get(user_id=self.user_id, project_name='project3').id
+
+    def plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def index_name(self, model, name):
+        # UniqueConstraint without condition is made in CREATE TABLE, so sqlite names its index sqlite_autoindex_<table>_<n>.
+        for constraint in model._meta.constraints:
+            if constraint.name == name and constraint.condition == None:
+                columns = [model._meta.get_field(field).column for field in constraint.fields]
+                table = model._meta.db_table
+                for index in self.plan_rows(f'PRAGMA index_list("{table}")'):
+                    if [info[2] for info in self.plan_rows(f'PRAGMA index_info("{index[1]}")')] == columns:
+                        return index[1]
+        return name
+
+    def plan_rows(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def hot_querysets(self):
+        user_id = self.user_id
+        date = datetime.date(2023, 2, 1)
+        sync = views.Sync_RETRIEVE()
+        sync.args = {'user_id': user_id}
+        sync.cursor = (5, 0, 0)
+        changes = sync.get_queryset()
+        range_args = {'user_id': user_id, 'date_from': date, 'date_to': datetime.date(2023, 3, 1)}
+        return [
+            ('project', models.Project.objects.filter(user_id=user_id, project_name='project3'), models.Project, 'project_user_name_idx'),
+            ('todo', models.Todo.objects.filter(project_id=self.project_id, todo_name='todo1'), models.Todo, 'todo_project_name_uniq'),
+            ('stamp', models.Stamp.objects.filter(user_id=user_id, stamp_name='stamp3'), models.Stamp, 'stamp_user_name_uniq'),
+            ('subelement', models.Subelement.objects.filter(stamp_id=self.stamp_id, subelement_name='pages'),
+             models.Subelement, 'subelement_stamp_name_idx'),
+            ('main', models.Main.objects.filter(user_id=user_id, stamp_id=self.stamp_id, date=date), models.Main, 'main_user_stamp_date_idx'),
+            # arg_name='' is also served by the partial unique index, the covering one is taken for exists().
+            ('main later', models.Main.objects.filter(user_id=user_id, stamp_id=self.stamp_id, date__gt=date, arg_name=''),
+             models.Main, ('main_user_stamp_date_idx', 'main_user_stamp_date_uniq')),
+            ('resync checkpoint', models.Main.objects.filter(user_id=user_id, stamp_id=self.stamp_id, date__lt=date,
+                                                             arg_name__in=['value', 'accumulate']).order_by('-date', '-arg_name')[:2],
+             models.Main, 'main_user_stamp_date_idx'),
+            ('range', views.range_headers(range_args, None), models.Main, 'main_user_arg_date_idx'),
+            ('range cursor', views.range_headers(range_args, (date, 1)), models.Main, 'main_user_arg_date_idx'),
+            ('ledger', models.Ledger.objects.filter(user_id=user_id, stamp_id=self.stamp_id, subelement_name='pages'),
+             models.Ledger, 'ledger_user_stamp_name_uniq'),
+            ('heatmap', views.heatmap_rows({'user_id': user_id, 'year': 2023}), models.Daily, 'daily_user_date_idx'),
+            ('heatmap stamp', views.heatmap_rows({'user_id': user_id, 'year': 2023, 'stamp_id': self.stamp_id}),
+             models.Daily, 'daily_user_stamp_date_uniq'),
+            ('sync project', changes['project'], models.Project, 'project_user_change_idx'),
+            ('sync stamp', changes['stamp'], models.Stamp, 'stamp_user_change_idx'),
+            ('sync main', changes['main'], models.Main, 'main_user_arg_change_idx'),
+            ('sync tombstone', changes['tombstone'], models.Tombstone, 'tombstone_user_change_idx'),
+        ]
+
+    def test_hot_querysets(self):
+        for name, queryset, model, indexes in self.hot_querysets():
+            with self.subTest(name):
+                plan = self.plan(*queryset.query.sql_with_params())
+                indexes = [indexes] if isinstance(indexes, str) else indexes
+                self.assertTrue(any(f' INDEX {self.index_name(model, index)} ' in line for line in plan for index in indexes), plan)
+                self.assertEqual([line for line in plan if line.startswith('SCAN')], [])
+
+    def test_views(self):
+        user_id = self.user_id
+        client = Client()
+        client.force_login(models.User.objects.get(id=user_id))
+        requests = [('project/retrieve/user', {}), ('project/retrieve/project', {'project_name': 'project3'}),
+                    ('project/retrieve/list', {}),
+                    ('stamp/retrieve/user', {}), ('stamp/retrieve/stamp', {'stamp_name': 'stamp3'}),
+                    ('stamp/retrieve/subelement', {'stamp_name': 'stamp3', 'subelement_name': 'pages'}),
+                    ('stamp/retrieve/tree', {}), ('stamp/retrieve/tree', {'stamp_name': 'stamp3'}),
+                    ('main/retrieve/range', {'date_from': '2023-02-01', 'date_to': '2023-03-01', 'limit': 10}),
+                    ('main/heatmap', {'year': 2023}), ('main/heatmap', {'year': 2023, 'stamp_id': self.stamp_id}),
+                    ('sync', {'limit': 10}),
+                    ('main/create/main', {'stamp_id': self.stamp_id, 'date': '2022-12-01', 'main_vals': '3'}),
+                    ('main/create/bulk', {'records': json.dumps([{'stamp_id': self.stamp_id, 'date': '2022-12-02', 'main_vals': '3'}])}),
+                    ('main/delete/main', {'stamp_id': self.stamp_id, 'date': '2023-01-10'}),
+                    ('stamp/update/subelement', {'stamp_name': 'stamp3', 'subelement_name': 'pages', 'defFunc_rename': 'discrete_point',
+                                                 'arg_names': 'lowerbound', 'arg_vals': '0'}),
+                    ('stamp/update/stamp', {'stamp_name': 'stamp4', 'stamp_rename': 'book'}),
+                    ('project/create/todo', {'project_name': 'project3', 'todo_name': 'dishes'}),
+                    ('project/delete/todo', {'project_name': 'project3', 'todo_name': 'todo1'}),
+                    ('project/delete/project', {'project_name': 'project4'})]
+        for url, data in requests:
+            with CaptureQueriesContext(connection) as queries:
+                status, _ = post(client, url, user_id=user_id, **data)
+            self.assertLess(status, 300, url)
+            for query in queries.captured_queries:
+                # sql of the captured query has the params quoted in already.
+                if query['sql'].startswith(('SELECT', 'UPDATE', 'DELETE')) and 'django_session' not in query['sql']:
+                    with self.subTest(url, sql=query['sql'][:120]):
+                        plan = self.plan(query['sql'])
+                        self.assertEqual([line for line in plan if line.startswith('SCAN')], [], plan)
+
+
+class Streaming_list_TestCase(TestCase):
+    """
+    # Streaming_list_TestCase
+        - peak memory of the streamed list is bounded by the chunk, not by the count of the rows.
+        - streamed bytes are same JSON as the buffered response.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('streamer', 'streamer@a.com', 'pw')
+        self.client.force_login(self.user)
+        self.rows = 0
+
+    def grow(self, count):
+        models.Project.objects.bulk_create([models.Project(user_id=self.user, project_name=f'project{index}')
+                                            for index in range(self.rows, count)], batch_size=5000)
+        models.Stamp.objects.bulk_create([models.Stamp(user_id=self.user, stamp_name=f'stamp{index}')
+                                          for index in range(self.rows, count)], batch_size=5000)
+        self.rows = count
+
+    def peak(self, url):
+        # (peak bytes traced while the response is made and read, size of the body)
+        caches['response'].clear()
+        tracemalloc.start()
+        try:
+            response = self.client.post('/api/' + url, {'user_id': self.user.id}, HTTP_ACCEPT='application/json')
+            self.assertTrue(response.streaming)
+            size = sum(len(part) for part in response.streaming_content)
+            return tracemalloc.get_traced_memory()[1], size
+        finally:
+            tracemalloc.stop()
+
+    @mock.patch.object(views.Streaming_list_Mixin, 'stream_chunk_size', 500)
+    def test_bounded_peak(self):
+        urls = ('project/retrieve/user', 'stamp/retrieve/user')
+        self.grow(10000)
+        small = {url: self.peak(url) for url in urls}
+        self.grow(40000)
+        for url in urls:
+            with self.subTest(url):
+                small_peak, small_size = small[url]
+                large_peak, large_size = self.peak(url)
+                self.assertGreater(large_size, small_size * 3)
+                # 4 times the rows, the peak stays at a few chunks of stream_chunk_size, smaller than the body.
+                self.assertLess(large_peak, small_peak * 1.25)
+                self.assertLess(large_peak, large_size / 2)
+
+    def test_same_bytes_as_serializer(self):
+        # more rows than a chunk, in the order of the model queryset. not in the order of the (user_id, name) index.
+        self.grow(5000)
+        for url, serializer_class, model in (('project/retrieve/user', serializers.Project_project, models.Project),
+                                             ('stamp/retrieve/user', serializers.Stamp_stamp, models.Stamp),
+                                             ('async/project/retrieve/user', serializers.Project_project, models.Project),
+                                             ('async/stamp/retrieve/user', serializers.Stamp_stamp, models.Stamp)):
+            with self.subTest(url):
+                response = self.client.post('/api/' + url, {'user_id': self.user.id}, HTTP_ACCEPT='application/json')
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                expected = JSONRenderer().render(serializer_class(model.objects.filter(user_id=self.user.id), many=True).data)
+                self.assertEqual(content, expected)
+
+    def test_same_json(self):
+        self.grow(3000)
+        streamed = self.client.post('/api/project/retrieve/user', {'user_id': self.user.id}, HTTP_ACCEPT='application/json')
+        buffered = self.client.post('/api/project/retrieve/user', {'user_id': self.user.id}, HTTP_ACCEPT='application/json; indent=2')
+        self.assertTrue(streamed.streaming)
+        self.assertFalse(buffered.streaming)
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), json.loads(buffered.content))
+
+
+class Document_import_TestCase(TestCase):
+    """
+    # Document_import_TestCase
+        - args of the imported subelements are checked by the defFunc, same as api/stamp/create/subelement.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('importer', 'importer@a.com', 'pw')
+
+    def stamp_document(self, args):
+        return json.dumps({'kind': 'stamp', 'name': 'read', 'sub-properties': [['discrete_point', 'pages', args]]})
+
+    def test_args_are_filled(self):
+        document.import_documents(self.user, [self.stamp_document({'upperbound': '5000'})])
+        args = dict(models.SubelementArg.objects.filter(subelement_id__stamp_id__user_id=self.user.id).values_list('arg_name', 'arg_val'))
+        # clamped and filled with the defaults of Discrete_point.subelement_set()
+        self.assertEqual(args['upperbound'], '1000')
+        self.assertEqual(args['lowerbound'], '-1000')
+
+    def test_wrong_args(self):
+        for args in ({'upper': '10'}, {'lowerbound': 'ten'}):
+            with self.subTest(args):
+                with self.assertRaises(ValueError):
+                    document.import_documents(self.user, [self.stamp_document(args)])
+                self.assertFalse(models.Stamp.objects.filter(user_id=self.user.id).exists())
+
+
+class Definition_cache_TestCase(TestCase):
+    """
+    # Definition_cache_TestCase
+        - the stamp changed by the uncommitted transaction is never stored in sub.definitions.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('definer', 'definer@a.com', 'pw')
+        self.client.force_login(self.user)
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names='lowerbound upperbound', arg_vals='0 500')
+        self.stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+        post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-02', main_vals='7')
+
+    def test_write_does_not_cache(self):
+        # TestCase never commits, so the on_commit callbacks are held until the end of the block.
+        with self.captureOnCommitCallbacks(execute=False):
+            sub.definitions.clear()
+            status, _ = post(self.client, 'stamp/update/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+                             defFunc_rename='discrete_point', arg_names='lowerbound upperbound', arg_vals='0 5')
+            self.assertEqual(status, 202)
+            self.assertEqual(len(sub.definitions._entries), 0)
+            # back-dated recode resyncs with the definition of its own request.
+            status, _ = post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=self.stamp_id, date='2023-01-01', main_vals='3')
+            self.assertEqual(status, 201)
+
+
+class Batch_TestCase(TestCase):
+    """
+    # Batch_TestCase
+        - operations of api/batch are committed all together, or rolled back all together.
+    """
+
+    operations = [{'op': 'stamp/create/stamp', 'params': {'stamp_name': 'read'}},
+                  {'op': 'stamp/create/subelement', 'params': {'stamp_name': 'read', 'subelement_name': 'pages',
+                                                               'defFunc_name': 'discrete_point', 'arg_names': 'lowerbound', 'arg_vals': '0'}},
+                  {'op': 'main/create/main', 'params': {'stamp_id': '$0.id', 'date': '2023-03-01', 'main_vals': '10'}}]
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('batcher', 'batcher@a.com', 'pw')
+        self.client.force_login(self.user)
+
+    def test_committed(self):
+        status, body = post(self.client, 'batch', user_id=self.user.id, operations=json.dumps(self.operations))
+        self.assertEqual(status, 200)
+        self.assertEqual([result['status'] for result in body['results']], [201, 201, 201])
+        self.assertTrue(models.Main.objects.filter(user_id=self.user.id, date='2023-03-01').exists())
+
+    def test_not_cached(self):
+        # the stamp is made by the batch, so its operations never store it in sub.definitions before the commit.
+        status, _ = post(self.client, 'batch', user_id=self.user.id, operations=json.dumps(self.operations))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(sub.definitions._entries), 0)
+
+    def test_stamp_without_subelement(self):
+        # the recode needs the subelement of the stamp. 400, and the created stamp is rolled back.
+        operations = [self.operations[0], self.operations[2]]
+        status, body = post(self.client, 'batch', user_id=self.user.id, operations=json.dumps(operations))
+        self.assertEqual(status, 400)
+        self.assertEqual(body['committed'], False)
+        self.assertFalse(models.Stamp.objects.filter(user_id=self.user.id).exists())
+
+
+class Sync_TestCase(TestCase):
+    """
+    # Sync_TestCase
+        - api/sync returns every change after the cursor once, in the order of the commit.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('syncer', 'syncer@a.com', 'pw')
+        self.client.force_login(self.user)
+
+    def sync(self, since='', limit=100):
+        status, body = post(self.client, 'sync', user_id=self.user.id, since=since, limit=limit)
+        self.assertEqual(status, 200)
+        return body
+
+    def test_pages(self):
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='home')
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'project/create/todo', user_id=self.user.id, project_name='home', todo_name='dishes')
+        post(self.client, 'stamp/delete/stamp', user_id=self.user.id, stamp_name='read')
+        changes = []
+        cursor = ''
+        while True:
+            body = self.sync(cursor, limit=1)
+            changes += [(change['kind'], change['op']) for change in body['changes']]
+            cursor = body['cursor']
+            if body['more'] == False:
+                break
+        # the project is changed twice, but it is one row : only its last change is left. the deleted stamp is only deleted.
+        self.assertEqual(changes, [('project', 'update'), ('stamp', 'delete')])
+        self.assertEqual(self.sync(cursor)['changes'], [])
+
+    def test_commit_order(self):
+        # the writer that waited on the lock stamps updated_at before the commit of the others.
+        # its change is still after the cursor, the cursor is not the time.
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='home')
+        cursor = self.sync()['cursor']
+        post(self.client, 'project/create/project', user_id=self.user.id, project_name='work')
+        models.Project.objects.filter(project_name='work').update(updated_at=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual([change['project_name'] for change in self.sync(cursor)['changes']], ['work'])
+
+    def test_resynced_accumulate(self):
+        # back-dated create, then delete : the later recode's accumulate is rewritten, so it is changed too.
+        post(self.client, 'stamp/create/stamp', user_id=self.user.id, stamp_name='read')
+        post(self.client, 'stamp/create/subelement', user_id=self.user.id, stamp_name='read', subelement_name='pages',
+             defFunc_name='discrete_point', arg_names='lowerbound upperbound acc_lbound acc_ubound', arg_vals='0 100 0 1000')
+        stamp_id = models.Stamp.objects.get(user_id=self.user.id, stamp_name='read').id
+        post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=stamp_id, date='2023-01-05', main_vals='10')
+        cursor = self.sync()['cursor']
+        post(self.client, 'main/create/main', user_id=self.user.id, stamp_id=stamp_id, date='2023-01-01', main_vals='3')
+        body = self.sync(cursor)
+        changes = {(change['op'], change['date']): change.get('accumulate') for change in body['changes']}
+        self.assertEqual(changes, {('update', '2023-01-01'): 0, ('update', '2023-01-05'): 3})
+        post(self.client, 'main/delete/main', user_id=self.user.id, stamp_id=stamp_id, date='2023-01-01')
+        changes = {(change['op'], change['date']): change.get('accumulate') for change in self.sync(body['cursor'])['changes']}
+        self.assertEqual(changes, {('delete', '2023-01-01'): None, ('update', '2023-01-05'): 0})
+
+    def test_old_cursor(self):
+        status, _ = post(self.client, 'sync', user_id=self.user.id, since='2023-01-01T00:00:00+00:00,0,1')
+        self.assertEqual(status, 400)
+
+    def test_sequence_outside_transaction(self):
+        with self.assertRaises(RuntimeError):
+            # TestCase wraps the test in atomic, so the connection is left by the test's block.
+            transaction.get_connection().in_atomic_block = False
+            try:
+                models.Sequence.objects.next()
+            finally:
+                transaction.get_connection().in_atomic_block = True
+
+
+class Push_authorize_TestCase(TestCase):
+    """
+    # Push_authorize_TestCase
+        - api/push takes the access token of api/token/login, same as the views.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.user = models.User.objects.create_user('listener', 'listener@a.com', 'pw')
+        self.other = models.User.objects.create_user('other', 'other@a.com', 'pw')
+
+    def scope(self, authorization, query=''):
+        return {'type': 'http', 'path': '/api/push', 'query_string': query.encode(),
+                'headers': [(b'authorization', authorization.encode())]}
+
+    async def test_bearer(self):
+        access = (await sync_to_async(tokens.issue)(self.user))['access']
+        self.assertEqual(await push.authorize(self.scope(f'Bearer {access}')), self.user.id)
+        self.assertEqual(await push.authorize(self.scope(f'bearer {access}', f'user_id={self.user.id}')), self.user.id)
+
+    async def test_rejected(self):
+        access = (await sync_to_async(tokens.issue)(self.user))['access']
+        refresh = (await sync_to_async(tokens.issue)(self.user))['refresh']
+        for authorization, query in ((f'Bearer {access}', f'user_id={self.other.id}'), (f'Bearer {refresh}', ''),
+                                     ('Bearer broken', ''), (f'Token {access}', ''), ('Bearer', '')):
+            with self.subTest(authorization=authorization[:12], query=query):
+                self.assertEqual(await push.authorize(self.scope(authorization, query)), None)
+
+
+class Hash_pool_TestCase(SimpleTestCase):
+    """
+    # Hash_pool_TestCase
+        - arun() raises Busy (429) at once when the workers and the backlog are taken, and frees the slot after the hash.
+    """
+
+    def setUp(self):
+        self.pool = hashing.Hash_pool(1, 1)
+        self.release = threading.Event()
+        self.addCleanup(self.pool.executor.shutdown)
+        self.addCleanup(self.release.set)
+
+    def hold(self):
+        self.release.wait(10)
+        return 'hashed'
+
+    async def test_busy(self):
+        running = [asyncio.ensure_future(self.pool.arun(self.hold)) for _ in range(2)] # 1 worker, 1 waiting.
+        await asyncio.sleep(0)
+        with self.assertRaises(hashing.Busy) as busy:
+            await self.pool.arun(self.hold)
+        self.assertEqual(busy.exception.status_code, 429)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*running), ['hashed', 'hashed'])
+        self.assertEqual(await self.pool.arun(str, 1), '1')
+
+    async def test_login_storm(self):
+        running = [asyncio.ensure_future(self.pool.arun(self.hold)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with mock.patch('restAPI.views.passwords', self.pool):
+            response = await self.async_client.post('/api/token/login', 'username=alice&password=pw',
+                                                    content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.release.set()
+        await asyncio.gather(*running)
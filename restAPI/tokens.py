@@ -0,0 +1,70 @@
+# tokens.py
+# stateless tokens of the token login. signed by SECRET_KEY with django.core.signing, nothing is stored in the db.
+# the token carries the session auth hash of the user, so changing the password invalidates every issued token,
+# same as the sessions.
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .auth_cache import Cached_backend
+
+
+def max_age(kind):
+    if kind == 'access':
+        return getattr(settings, 'TOKEN_ACCESS_MAX_AGE', 15 * 60)
+    return getattr(settings, 'TOKEN_REFRESH_MAX_AGE', 14 * 24 * 60 * 60)
+
+
+def issue(user):
+    """
+    # issue
+        - access token for the Authorization header, refresh token for api/token/refresh.
+        - kinds are signed by the different salts, so one cannot be used as the other.
+    """
+    payload = {'id': user.id, 'hash': user.get_session_auth_hash()}
+    return {'user_id': user.id,
+            'access': signing.dumps(payload, salt='restAPI.tokens.access'),
+            'refresh': signing.dumps(payload, salt='restAPI.tokens.refresh'),
+            'expires_in': max_age('access')}
+
+
+def verify(token, kind):
+    """
+    # verify
+        - returns the user of the token, or None if the token is broken, expired, or issued before the password change.
+        - user is read by Cached_backend, so the usual request reads no row.
+    """
+    try:
+        payload = signing.loads(token, salt=f'restAPI.tokens.{kind}', max_age=max_age(kind))
+    except signing.BadSignature: # SignatureExpired too.
+        return None
+    user = Cached_backend().get_user(payload['id'])
+    if user == None or not constant_time_compare(payload['hash'], user.get_session_auth_hash()):
+        return None
+    return user
+
+
+class Token_authentication(BaseAuthentication):
+    """
+    # Token_authentication
+        - "Authorization: Bearer <access token>" of api/token/login.
+        - no csrf check, the token is never sent by the browser on its own.
+    """
+    keyword = 'bearer'
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if len(header) == 0 or header[0].lower() != self.keyword.encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('invalid token header.')
+        user = verify(header[1].decode('latin-1'), 'access')
+        if user == None:
+            raise exceptions.AuthenticationFailed('token is expired or invalid.')
+        return (user, None)
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
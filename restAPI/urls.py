@@ -5,11 +5,16 @@ from . import views
 urlpatterns = [
     path('user/create', views.User_CREATE.as_view(), name='user_create'),
     path('user/update', views.User_UPDATE.as_view(), name='user_update'),
+    path('user/export', views.User_EXPORT.as_view(), name='user_export'),
+    path('user/import', views.User_IMPORT.as_view(), name='user_import'),
+    path('token/login', views.Token_LOGIN.as_view(), name='token_login'),
+    path('token/refresh', views.Token_REFRESH.as_view(), name='token_refresh'),
 
     path('project/create/project', views.Project_CREATE_project.as_view(), name='project_create_project'),
     path('project/create/todo', views.Project_CREATE_todo.as_view(), name='project_create_todo'),
     path('project/retrieve/user', views.Project_RETRIEVE_user.as_view(), name='project_retrieve_user'),
     path('project/retrieve/project', views.Project_RETRIEVE_project.as_view(), name='project_retrieve_project'),
+    path('project/retrieve/list', views.Project_RETRIEVE_list.as_view(), name='project_retrieve_list'),
     path('project/delete/todo', views.Project_DELETE_todo.as_view(), name='project_delete_todo'),
     path('project/delete/project', views.Project_DELETE_project.as_view(), name='project_delete_project'),
     
@@ -18,13 +23,31 @@ urlpatterns = [
     path('stamp/retrieve/user', views.Stamp_RETRIEVE_user.as_view(), name='stamp_retrieve_user'),
     path('stamp/retrieve/stamp', views.Stamp_RETRIEVE_stamp.as_view(), name='stamp_retrieve_stamp'),
     path('stamp/retrieve/subelement', views.Stamp_RETRIEVE_subelement.as_view(), name='stamp_retrieve_subelement'),
+    path('stamp/retrieve/tree', views.Stamp_RETRIEVE_tree.as_view(), name='stamp_retrieve_tree'),
     path('stamp/delete/stamp', views.Stamp_DELETE_stamp.as_view(), name='stamp_delete_stamp'),
     path('stamp/delete/subelement', views.Stamp_DELETE_subelement.as_view(), name='stamp_delete_subelement'),
     path('stamp/update/stamp', views.Stamp_UPDATE_stamp.as_view(), name='stamp_update_stamp'),
     path('stamp/update/subelement', views.Stamp_UPDATE_subelement.as_view(), name='stamp_update_sublement'),
 
     path('main/create/main', views.Main_CREATE_main.as_view(), name='main_create_main'),
+    path('main/create/bulk', views.Main_CREATE_bulk.as_view(), name='main_create_bulk'),
     path('main/delete/main', views.Main_DELETE_main.as_view(), name='main_delete_main'),
+    path('main/retrieve/range', views.Main_RETRIEVE_range.as_view(), name='main_retrieve_range'),
+    path('main/heatmap', views.Main_RETRIEVE_heatmap.as_view(), name='main_heatmap'),
+
+    path('sync', views.Sync_RETRIEVE.as_view(), name='sync'),
+    path('batch', views.Batch_EXECUTE.as_view(), name='batch'),
+    path('cache/stats', views.Cache_RETRIEVE_stats.as_view(), name='cache_stats'),
+
+    path('async/project/retrieve/user', views.Project_RETRIEVE_user_async.as_view(), name='async_project_retrieve_user'),
+    path('async/project/retrieve/project', views.Project_RETRIEVE_project_async.as_view(), name='async_project_retrieve_project'),
+    path('async/project/retrieve/list', views.Project_RETRIEVE_list_async.as_view(), name='async_project_retrieve_list'),
+    path('async/stamp/retrieve/user', views.Stamp_RETRIEVE_user_async.as_view(), name='async_stamp_retrieve_user'),
+    path('async/stamp/retrieve/stamp', views.Stamp_RETRIEVE_stamp_async.as_view(), name='async_stamp_retrieve_stamp'),
+    path('async/stamp/retrieve/subelement', views.Stamp_RETRIEVE_subelement_async.as_view(), name='async_stamp_retrieve_subelement'),
+    path('async/stamp/retrieve/tree', views.Stamp_RETRIEVE_tree_async.as_view(), name='async_stamp_retrieve_tree'),
+    path('async/main/retrieve/range', views.Main_RETRIEVE_range_async.as_view(), name='async_main_retrieve_range'),
+    path('async/main/heatmap', views.Main_RETRIEVE_heatmap_async.as_view(), name='async_main_heatmap'),
     
 ]
 
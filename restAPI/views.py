@@ -1,18 +1,41 @@
 #backend/post/views.py
 from django.shortcuts import render, get_object_or_404
-from django.contrib.auth import get_user_model  
+from django.contrib.auth import get_user_model, authenticate
 from rest_framework import generics, mixins, status
 from rest_framework import permissions 
 from rest_framework.views import exceptions
 from rest_framework.response import Response
-from django.db.models import Q
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from django.db import transaction, IntegrityError
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+from django.utils import timezone
+from django.db.models import Q, Max, Sum, Count, FilteredRelation
+from django.db.models.deletion import Collector
 
 from copy import deepcopy
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
+from asgiref.sync import sync_to_async
+import asyncio
+import datetime
+import heapq
+import json
 
 from . import models
 from . import serializers
 
 from . import subelement as sub
+from . import document
+from . import batch
+from . import broker
+from . import tokens
+from .hashing import passwords
+from .response_cache import responses
 
 
 """
@@ -38,6 +61,492 @@ class IsOwner_permission_Mixin:
             if superuser != True:
                 raise exceptions.ValidationError("current logged in user have not owned licence for this request.")
 
+    def fetch_validation(self, queryset, exist_error=None, unique_error=None):
+        """
+        # fetch_validation
+            - materialize the queryset once, then validate with the fetched rows.
+            - fetched rows are kept in self.fetched, so the response and the delete reuse them without another query.
+        Args
+            - queryset : rows to be fetched.
+            - exist_error : raised if nothing was fetched.
+            - unique_error : raised if anything was fetched.
+        """
+        # operations of api/batch share the fetched rows. see batch.Object_cache
+        objects = getattr(self.request, 'batch_objects', None)
+        self.fetched = list(queryset) if objects == None else objects.fetch(queryset)
+        if exist_error != None and len(self.fetched) == 0:
+            raise exceptions.ValidationError(exist_error)
+        if unique_error != None and len(self.fetched) != 0:
+            raise exceptions.ValidationError(unique_error)
+        return self.fetched
+
+    def fetch_definition(self, user_id, stamp_id):
+        """
+        # fetch_definition
+            - compiled stamp of the user from sub.definitions. raises models.Stamp.DoesNotExist, ValueError, TypeError.
+            - operations of api/batch compile it by sub.compile_stamp() directly, the cache is not touched.
+              the stamp may be made by the earlier operation, and uncommitted until the batch ends.
+        """
+        if getattr(self.request, 'batch_objects', None) != None:
+            return sub.compile_stamp(int(user_id), int(stamp_id))
+        return sub.definitions.get(user_id, stamp_id)
+
+    def fetch_children(self, queryset, related_name, condition=None, select_related=(), exist_error=None):
+        """
+        # fetch_children
+            - fetch the parent rows of queryset with their children rows, in one LEFT JOIN query.
+            - parent without children is fetched too, so existance of the parent is validated with the same rows.
+            - self.parents : fetched parent rows.
+            - self.fetched : fetched children rows, FK already attached to the fetched parent.
+        Args
+            - queryset : parent rows to be fetched.
+            - related_name : related_name of the children's FK to the parent.
+            - condition : Q on the children (related_name__field), applied inside of the JOIN.
+            - select_related : FK names of the parent, fetched in the same query.
+            - exist_error : raised if no parent was fetched.
+        """
+        parent_model = queryset.model
+        child_model = parent_model._meta.get_field(related_name).related_model
+        fk_name = parent_model._meta.get_field(related_name).field.name
+
+        path = related_name
+        if condition != None:
+            path = 'fetched_' + related_name
+            queryset = queryset.annotate(**{path: FilteredRelation(related_name, condition=condition)})
+
+        # column groups : parent, FKs of the parent, children
+        groups = [(parent_model, None, [field.attname for field in parent_model._meta.concrete_fields])]
+        for name in select_related:
+            model = parent_model._meta.get_field(name).related_model
+            groups.append((model, name, [name + '__' + field.attname for field in model._meta.concrete_fields]))
+        groups.append((child_model, fk_name, [path + '__' + field.attname for field in child_model._meta.concrete_fields]))
+
+        parents = {}
+        self.fetched = []
+        for row in queryset.values_list(*[column for _, _, columns in groups for column in columns]):
+            instances = []
+            for model, _, columns in groups:
+                values, row = row[:len(columns)], row[len(columns):]
+                field_names = [field.attname for field in model._meta.concrete_fields]
+                instances.append(None if values[0] == None else model.from_db(queryset.db, field_names, values))
+
+            parent = parents.setdefault(instances[0].pk, instances[0])
+            for (_, name, _), instance in zip(groups[1:-1], instances[1:-1]):
+                setattr(parent, name, instance)
+            if instances[-1] != None:
+                setattr(instances[-1], fk_name, parent)
+                self.fetched.append(instances[-1])
+        self.parents = list(parents.values())
+
+        if exist_error != None and len(self.parents) == 0:
+            raise exceptions.ValidationError(exist_error)
+        return self.fetched
+
+    def fetch_values(self, queryset, related_name, exist_error=None):
+        """
+        # fetch_values
+            - read-only version of fetch_children. children are fetched as the rows of the serializer, not as instances.
+            - parent without children is fetched too, so existance of the parent is validated with the same rows.
+            - self.fetched : dicts, same as serializer(children, many=True).data.
+        Args
+            - queryset : parent rows to be fetched.
+            - related_name : related_name of the children's FK to the parent.
+            - exist_error : raised if no parent was fetched.
+        """
+        keys, rows = related_values(queryset, related_name, self.get_serializer_class())
+        rows = list(rows)
+        self.fetched = [dict(zip(keys, row[1:])) for row in rows if row[0] != None]
+
+        if exist_error != None and len(rows) == 0:
+            raise exceptions.ValidationError(exist_error)
+        return self.fetched
+
+    def delete_fetched(self, rows):
+        """
+        # delete_fetched
+            - delete the fetched rows without selecting them again. cascades are collected as usual.
+        """
+        if len(rows) == 0:
+            return
+        collector = Collector(using=rows[0]._state.db)
+        collector.collect(rows)
+        collector.delete()
+
+
+@lru_cache(maxsize=None)
+def serializer_lookups(serializer_class):
+    """
+    # serializer_lookups
+        - (keys, lookups) of the serializer's fields, for the read-only list views.
+        - field source 'a.b' is the values_list() lookup 'a__b', so values_list() rows zipped with keys are same as serializer.data.
+        - only for the serializers whose fields are plain columns. (CharField, IntegerField, DateField, PrimaryKeyRelatedField)
+    """
+    fields = serializer_class().fields
+    return tuple(fields.keys()), tuple(field.source.replace('.', '__') for field in fields.values())
+
+
+def related_values(queryset, related_name, serializer_class):
+    """
+    # related_values
+        - (keys, values_list queryset) of the parent rows LEFT JOINed with their children, for fetch_values().
+        - first column is the child's pk, None for the parent without children. the rest are zipped with keys.
+    """
+    fk_name = queryset.model._meta.get_field(related_name).field.name
+    keys, lookups = serializer_lookups(serializer_class)
+
+    # lookups are relative to the children. through the FK -> parent's own columns, else -> through the relation.
+    columns = [related_name + '__pk']
+    for lookup in lookups:
+        if lookup == fk_name:
+            columns.append('pk')
+        elif lookup.startswith(fk_name + '__'):
+            columns.append(lookup[len(fk_name) + 2:])
+        else:
+            columns.append(related_name + '__' + lookup)
+    return keys, queryset.values_list(*columns)
+
+
+class Values_list_Mixin:
+    """
+    read-only fast path of mixins.ListModelMixin.
+        - get_queryset() returns the rows already, made by values_rows() or fetch_values().
+        - no model instance and no serializer field is made, but the response is same as serializer.data.
+    """
+    def values_rows(self, queryset):
+        keys, lookups = serializer_lookups(self.get_serializer_class())
+        return [dict(zip(keys, row)) for row in queryset.values_list(*lookups)]
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_queryset())
+
+
+class Streaming_list_Mixin(Values_list_Mixin):
+    """
+    streaming version of Values_list_Mixin, for the lists growing without bound.
+        - get_queryset() returns an iterator of rows, made by values_iterator().
+        - JSON array is written chunk by chunk, so the memory is bounded by stream_chunk_size, not by the number of rows.
+        - each chunk is rendered by the negotiated JSONRenderer, so the bytes are same as the buffered Response.
+        - other renderer (browsable API), or indented JSON is answered by the buffered Response.
+    """
+    stream_chunk_size = 2000
+
+    def values_iterator(self, queryset):
+        keys, lookups = serializer_lookups(self.get_serializer_class())
+        for row in queryset.values_list(*lookups).iterator(chunk_size=self.stream_chunk_size):
+            yield dict(zip(keys, row))
+
+    def stream_json(self, rows, renderer):
+        yield b'['
+        chunk = []
+        separator = b''
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.stream_chunk_size:
+                yield separator + renderer.render(chunk)[1:-1]
+                chunk = []
+                separator = b','
+        if len(chunk) != 0:
+            yield separator + renderer.render(chunk)[1:-1]
+        yield b']'
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_queryset()
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, JSONRenderer) \
+            or renderer.get_indent(request.accepted_media_type, self.get_renderer_context()) != None:
+            return Response(list(rows))
+        return StreamingHttpResponse(self.stream_json(rows, renderer), content_type=renderer.media_type)
+
+
+def resync_accumulate(user_id, stamp_id, since=None, definition=None):
+    """
+    # resync_accumulate
+        - recompute models.Main's accumulate from the since date, for every subelement of the stamp.
+        - then models.Ledger will be set to the recomputed running total.
+        - recodes whose accumulate is rewritten are published by changed(), the caller publishes its own recode.
+        - runs in the write transaction, so the stamp is compiled without sub.definitions.
+          the uncommitted stamp must not be cached, it would be kept after the rollback.
+    Args
+        - user_id : owner of the stamp.
+        - stamp_id : id of the stamp descriptional row of models.Stamp.
+        - since : first date to recompute. None for the whole history.
+        - definition : compiled stamp the caller already has, read before the transaction changed the stamp.
+    """
+    if definition == None:
+        definition = sub.compile_stamp(user_id, stamp_id)
+    touched = set()
+    for subelement in definition.subelements:
+        total, dates = subelement.defFunc.subvar_resync(subelement, definition.user_id, definition.stamp_id, since)
+        touched.update(dates)
+        if total != None:
+            models.Ledger.objects.update_or_create(user_id_id = definition.user_id,
+                                                   stamp_id_id = definition.stamp_id,
+                                                   subelement_name = subelement.subelement_name,
+                                                   defaults = {'total': total})
+    if len(touched) != 0:
+        changed(definition.user_id, 'main', 'update',
+                *[{'stamp_id': definition.stamp_id, 'date': str(date)} for date in sorted(touched)])
+
+
+def stamp_tree_rows(queryset):
+    """
+    # stamp_tree_rows
+        - stamp -> subelement -> arg rows of the stamps, ordered by the creation order. (one query)
+    """
+    return queryset.order_by('id', 'subelement_stamp__id', 'subelement_stamp__arg_subelement__id').values_list(
+        'id', 'stamp_name',
+        'subelement_stamp__id', 'subelement_stamp__subelement_name', 'subelement_stamp__defFunc_name',
+        'subelement_stamp__arg_subelement__arg_name', 'subelement_stamp__arg_subelement__arg_val')
+
+
+def stamp_tree(user_id, rows):
+    """
+    # stamp_tree
+        - rows of stamp_tree_rows() -> list of {user_id, stamp_id, stamp_name, subelements}, made in one pass.
+        - args are parsed by subelement_type of sub.loc[defFunc_name].
+    """
+    # rows are ordered, so the stamp, subelement of the previous row is the one that is being made.
+    tree = []
+    stamp = None
+    last_subelement_id = None
+    arg_pairs = []
+    for stamp_id, stamp_name, subelement_id, subelement_name, defFunc_name, arg_name, arg_val in rows:
+        if stamp == None or stamp['stamp_id'] != stamp_id:
+            stamp = {'user_id': user_id, 'stamp_id': stamp_id, 'stamp_name': stamp_name, 'subelements': []}
+            tree.append(stamp)
+        if subelement_id != None and subelement_id != last_subelement_id:
+            last_subelement_id = subelement_id
+            arg_pairs = []
+            subelement = {'subelement_name': subelement_name, 'defFunc_name': defFunc_name, 'args': arg_pairs}
+            stamp['subelements'].append(subelement)
+        if arg_name != None:
+            arg_pairs.append((arg_name, arg_val))
+
+    # string arg_vals -> typed args
+    for stamp in tree:
+        for subelement in stamp['subelements']:
+            subelement['args'] = sub.loc[subelement['defFunc_name']]._subelement_parse(subelement['args'])
+    return tree
+
+
+def heatmap_rows(args):
+    """
+    # heatmap_rows
+        - (date, count, total) rows of models.Daily in the year, summed over the stamps if stamp_id is not given.
+    """
+    year = args['year']
+    queryset = models.Daily.objects.filter(user_id = args['user_id'],
+                                           date__range = (datetime.date(year, 1, 1), datetime.date(year, 12, 31)))
+    if args.get('stamp_id') != None:
+        return queryset.filter(stamp_id = args['stamp_id']).values_list('date', 'count', 'total')
+    return queryset.values('date').annotate(day_count = Sum('count'), day_total = Sum('total')).values_list('date', 'day_count', 'day_total')
+
+
+def heatmap_grid(args, rows):
+    """
+    # heatmap_grid
+        - rows of heatmap_rows() -> response of Main_RETRIEVE_heatmap. the days without recode stay 0.
+    """
+    start = datetime.date(args['year'], 1, 1)
+    length = (datetime.date(args['year'] + 1, 1, 1) - start).days
+
+    counts = [0] * length
+    totals = [0] * length
+    for date, count, total in rows:
+        counts[(date - start).days] = count
+        totals[(date - start).days] = total
+
+    return {'user_id': args['user_id'],
+            'stamp_id': args.get('stamp_id'),
+            'year': args['year'],
+            'start': str(start),
+            'counts': counts,
+            'totals': totals}
+
+
+def range_cursor(args):
+    """
+    # range_cursor
+        - cursor : "<date>,<id>" of the last recode of the previous page -> (date, id). None for the first page.
+    """
+    if args.get('cursor') == None or args['cursor'] == '':
+        return None
+    try:
+        date, id = args['cursor'].split(',')
+        return (datetime.date.fromisoformat(date), int(id))
+    except ValueError:
+        raise exceptions.ValidationError('cursor must be the form of <date>,<id>.')
+
+
+def range_headers(args, cursor):
+    """
+    # range_headers
+        - one page of the recode descriptional rows, in (date, id) order. one more row to know the next page exists.
+    """
+    queryset = models.Main.objects.filter(user_id = args['user_id'],
+                                          arg_name = '',
+                                          date__range = (args['date_from'], args['date_to']))
+    if args.get('stamp_id') != None:
+        queryset = queryset.filter(stamp_id = args['stamp_id'])
+    if cursor != None:
+        queryset = queryset.filter(date__gte = cursor[0]).filter(Q(date__gt = cursor[0]) | Q(id__gt = cursor[1]))
+    return queryset.order_by('date', 'id').values_list('id', 'stamp_id', 'date')[:args.get('limit', 100) + 1]
+
+
+def range_page(args, headers):
+    """
+    # range_page
+        - rows of range_headers() -> (headers of this page, cursor of the next page or None).
+    """
+    limit = args.get('limit', 100)
+    if len(headers) > limit:
+        headers = headers[:limit]
+        return headers, f"{headers[-1][2]},{headers[-1][0]}"
+    return headers, None
+
+
+def range_detail_rows(args, headers):
+    """
+    # range_detail_rows
+        - (arg rows, stamp names) querysets of the page. headers must not be empty.
+    """
+    stamp_ids = set(stamp_id for _, stamp_id, _ in headers)
+    arg_rows = models.Main.objects.filter(user_id = args['user_id'],
+                                          stamp_id__in = stamp_ids,
+                                          date__range = (headers[0][2], headers[-1][2]),
+                                          arg_name__in = ['value', 'accumulate', 'untrusted']).values_list('stamp_id', 'date', 'arg_name', 'arg_val')
+    stamp_names = models.Stamp.objects.filter(id__in = stamp_ids).values_list('id', 'stamp_name')
+    return arg_rows, stamp_names
+
+
+def range_days(args, headers, cursor, stamp_names, arg_rows):
+    """
+    # range_days
+        - response of Main_RETRIEVE_range. pivot in one linear pass : date -> stamp_id -> recode
+    """
+    days = {}
+    recodes = {}
+    for _, stamp_id, date in headers:
+        recode = {'stamp_name': stamp_names.get(stamp_id), 'value': None, 'accumulate': None, 'untrusted': False}
+        days.setdefault(str(date), {})[stamp_id] = recode
+        recodes[(stamp_id, date)] = recode
+    for stamp_id, date, arg_name, arg_val in arg_rows:
+        recode = recodes.get((stamp_id, date))
+        if recode == None: # recode of the boundary date, but not in this page.
+            continue
+        if arg_name == 'untrusted':
+            recode['untrusted'] = True
+        else:
+            recode[arg_name] = int(arg_val)
+
+    return {'user_id': args['user_id'],
+            'date_from': str(args['date_from']),
+            'date_to': str(args['date_to']),
+            'cursor': cursor,
+            'days': days}
+
+
+def invalidate_definition(user_id, stamp_name):
+    """
+    # invalidate_definition
+        - drop the compiled stamp from sub.definitions, after the models.Stamp rows have been changed.
+        - dropped again on commit, so the other request cannot cache the uncommitted rows.
+    """
+    sub.definitions.invalidate(user_id, stamp_name)
+    transaction.on_commit(lambda: sub.definitions.invalidate(user_id, stamp_name))
+
+
+@contextmanager
+def unique_validation(error):
+    """
+    # unique_validation
+        - insert inside of this block is checked by the unique constraint of the db, instead of exists() query.
+        - if the constraint is violated, only this block is rolled back and error is raised as ValidationError.
+        - savepoint is made only inside of the other transaction. (autocommit insert needs no BEGIN)
+    Args
+        - error : message of the ValidationError.
+    """
+    block = nullcontext()
+    if transaction.get_connection().in_atomic_block:
+        block = transaction.atomic()
+    try:
+        with block:
+            yield
+    except IntegrityError:
+        raise exceptions.ValidationError(error)
+
+
+def changed(user_id, kind, op, *keys, **key):
+    """
+    # changed
+        - every write view calls this with the changed rows' keys. after the commit,
+        - the change event is published to the push subscribers. (see broker.notify)
+        - the cached responses of the user are dropped by the new version. (see response_cache.Response_cache)
+        - keys : dicts of the keys, one event each, when many rows are changed at once. the cache is dropped once.
+    """
+    for event_key in keys or [key]:
+        broker.notify(user_id, kind, op, **event_key)
+    responses.invalidate_on_commit(user_id)
+
+
+def response_precondition(view, request):
+    # owner check, then the cache key and the ETag of the response. no query of the view is run.
+    IsOwner_permission_Mixin.query_validation(view)
+    key = responses.key(request.POST.get('user_id'), request)
+    return key, responses.etag(key)
+
+def validated_response(response, etag):
+    # per-user response : revalidated by the client, never shared by the proxies.
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def conditional_response(post):
+    """
+    # conditional_response
+        - decorator of the read views' post(). 200 gets the ETag of the per-user data version.
+        - If-None-Match with the same ETag is answered by 304 before the serializer and the queries.
+    """
+    @wraps(post)
+    def wrapper(self, request, *args, **kwargs):
+        key, etag = response_precondition(self, request)
+        if responses.not_modified(request, etag):
+            return validated_response(HttpResponseNotModified(), etag)
+        response = post(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if responses.not_modified(request, etag, exists=True):
+                return validated_response(HttpResponseNotModified(), etag)
+            validated_response(response, etag)
+        return response
+    return wrapper
+
+def cached_response(post):
+    """
+    # cached_response
+        - decorator of the retrieve views' post(). conditional_response, then the JSON response of 200 is served from response_cache.responses.
+        - owner is checked before the lookup, the other validations and the queries are skipped on the hit.
+        - the browsable API and the operations of api/batch are not cached. (batch may read its uncommitted rows)
+    """
+    @wraps(post)
+    def wrapper(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer) or getattr(request, 'batch_objects', None) != None:
+            return post(self, request, *args, **kwargs)
+        key, etag = response_precondition(self, request)
+        if responses.not_modified(request, etag):
+            return validated_response(HttpResponseNotModified(), etag)
+        cached = responses.get(key)
+        if cached != None:
+            if responses.not_modified(request, etag, exists=True):
+                return validated_response(HttpResponseNotModified(), etag)
+            return validated_response(HttpResponse(cached[1], content_type=cached[0]), etag)
+        response = post(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if responses.not_modified(request, etag, exists=True):
+                return validated_response(HttpResponseNotModified(), etag)
+            responses.store(key, validated_response(response, etag))
+        return response
+    return wrapper
+
 
 
 #region USER API
@@ -85,8 +594,152 @@ class User_UPDATE(generics.UpdateAPIView, IsOwner_permission_Mixin):
         serializer = self.serializer_class(request.user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        # email is in the export.
+        responses.invalidate_on_commit(request.user.id)
         return Response({}, status=status.HTTP_200_OK)
 
+class User_EXPORT(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # User_EXPORT
+        SECURITY LEVEL r2
+        - export every project, stamp and recode of the user, as NDJSON documents. see the document.py
+        - documents are streamed line by line.
+    POST params
+        - user_id
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        self.query_validation()
+        return models.User.objects.filter(id = self.request.POST.get('user_id'))
+
+    @conditional_response
+    def post(self, request, *args, **kwargs):
+        user = self.get_queryset().first()
+        if user == None:
+            raise exceptions.ValidationError('user_id must already exists in the db.')
+        response = StreamingHttpResponse((document.dumps(doc) for doc in document.export_documents(user)),
+                                         content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{user.username}.ndjson"'
+        return response
+
+class User_IMPORT(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # User_IMPORT
+        SECURITY LEVEL c2
+        - import the NDJSON documents made by User_EXPORT into the user. see the document.py
+        - rows are created by batched bulk_create, in one transaction.
+    POST params
+        - user_id
+        - document : uploaded NDJSON file.
+        - replace : if true, every project, stamp and recode of the user is deleted first.
+    database changes
+        - model Project, Todo, Stamp, Subelement, SubelementArg, Ledger, Main, Daily will get the rows of the documents.
+    """
+    serializer_class = serializers.User_import_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        self.query_validation()
+        return models.User.objects.filter(id = self.request.POST.get('user_id'))
+
+    def post(self, request, *args, **kwargs):
+        user = self.get_queryset().first()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if user == None:
+            raise exceptions.ValidationError('user_id must already exists in the db.')
+
+        try:
+            counts = document.import_documents(user, serializer.validated_data['document'],
+                                               replace=serializer.validated_data['replace'])
+        except ValueError as error:
+            raise exceptions.ValidationError(str(error))
+        return Response({'user_id': user.id, 'imported': counts}, status=status.HTTP_201_CREATED)
+
+#endregion
+
+#region TOKEN API
+
+class Token_View(View):
+    """
+    base of the token views. async, so the request waits for hashing.passwords without holding a worker thread.
+        - no session and no csrf, the credentials are the POST params.
+        - subclass must define the coroutine issue(), which returns the data of the response. checked by as_view().
+    """
+    http_method_names = ['post']
+    serializer_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # no default issue(), so the subclass without it fails at the url conf, not at the request.
+        assert asyncio.iscoroutinefunction(getattr(cls, 'issue', None)), (
+            f"'{cls.__name__}' should define `async def issue(self)`, which returns the data of the response.")
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, headers=headers,
+                            content_type=JSONRenderer.media_type)
+
+    def validate_args(self):
+        serializer = self.serializer_class(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def handle_exception(self, exc):
+        if isinstance(exc, exceptions.AuthenticationFailed):
+            exc.auth_header = 'Bearer realm="api"'
+        response = exception_handler(exc, {'view': self, 'request': None})
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'} # WWW-Authenticate, Retry-After
+        return self.render(response.data, response.status_code, headers)
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            return self.render(await self.issue())
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+class Token_LOGIN(Token_View):
+    """
+    # Token_LOGIN
+        SECURITY LEVEL r4
+        - login by the password, then get the tokens. see the tokens.py
+        - send the access token as "Authorization: Bearer <access>" to the other views.
+        - 429 with Retry-After if too many logins are waiting for the password check.
+    POST params
+        - username
+        - password
+    """
+    serializer_class = serializers.Token_login_argsGet
+
+    async def issue(self):
+        args = self.validate_args()
+        # the whole authenticate() in the pool, so the unknown username takes the same time as the wrong password.
+        user = await passwords.arun(authenticate, self.request, username=args['username'], password=args['password'])
+        if user == None:
+            raise exceptions.AuthenticationFailed('wrong username or password.')
+        return tokens.issue(user)
+
+class Token_REFRESH(Token_View):
+    """
+    # Token_REFRESH
+        SECURITY LEVEL r4
+        - get the new tokens by the refresh token, without the password.
+        - refresh token issued before the password change is rejected.
+    POST params
+        - refresh
+    """
+    serializer_class = serializers.Token_refresh_argsGet
+
+    async def issue(self):
+        args = self.validate_args()
+        user = await sync_to_async(tokens.verify)(args['refresh'], 'refresh')
+        if user == None:
+            raise exceptions.AuthenticationFailed('refresh token is expired or invalid.')
+        return tokens.issue(user)
+
 #endregion
 
 #region PROJECT API
@@ -102,15 +755,22 @@ class Project_CREATE_project(generics.CreateAPIView, IsOwner_permission_Mixin):
         - project_name : project_name that will be created
     database changes
         - model Project will get new row of project.
-        - row will created with todo_name='' (blank)
     """
     serializer_class = serializers.Project_project
     queryset = models.Project.objects.all()
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_create(self, serializer):
+        serializer.save(change_seq = self.change_seq)
+
     def create(self, request, *args, **kwargs):
         self.query_validation()
-        return super().create(request, *args, **kwargs)
+        with transaction.atomic():
+            # taken first, so the write lock is held before the serializer reads.
+            self.change_seq = models.Sequence.objects.next()
+            response = super().create(request, *args, **kwargs)
+            changed(self.request.POST.get('user_id'), 'project', 'update', project_name = self.request.POST.get('project_name'))
+        return response
     
 class Project_CREATE_todo(generics.CreateAPIView, IsOwner_permission_Mixin):
     """
@@ -124,8 +784,7 @@ class Project_CREATE_todo(generics.CreateAPIView, IsOwner_permission_Mixin):
         - project_name : project_name that will be created
         - todo_name : todo_name that will be created
     database changes
-        - model Project will get new row of project.
-        - row will created with todo_name=<todo_name>
+        - model Todo will get new row of todo, in the project.
     """
 
     serializer_class = serializers.Project_all
@@ -133,29 +792,32 @@ class Project_CREATE_todo(generics.CreateAPIView, IsOwner_permission_Mixin):
 
     def query_validation(self):
         super().query_validation()
-        queryset = models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with the corresponding user_id.')
+        self.fetch_validation(models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
+                                                            & Q(user_id = self.request.POST.get('user_id'))),
+                              exist_error='project_name must already exists in the db with the corresponding user_id.')
         if self.request.POST.get('todo_name') == '' or self.request.POST.get('todo_name') == None:
             raise exceptions.ValidationError('todo_name cannot be null or blank')
-        
-        queryset = models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id'))
-                                                 & Q(todo_name = self.request.POST.get('todo_name')))
-        if queryset.exists() == True:
-            raise exceptions.ValidationError('todo_name must be unique if project_name and user_id is same.')
     
     def get_queryset(self):
-        return models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                            & Q(user_id = self.request.POST.get('user_id'))
-                                            & Q(todo_name = self.request.POST.get('todo_name')))
+        return self.fetched
 
     def create(self, request, *args, **kwargs):
         self.query_validation()
-        return super().create(request, *args, **kwargs)
+        # uniqueness of todo_name is checked by models.Todo's constraint.
+        with transaction.atomic():
+            with unique_validation('todo_name must be unique if project_name and user_id is same.'):
+                todo = models.Todo.objects.create(project_id = self.fetched[0],
+                                                  todo_name = self.request.POST.get('todo_name'))
+            models.Project.objects.filter(id = self.fetched[0].id).update(updated_at = timezone.now(),
+                                                                          change_seq = models.Sequence.objects.next())
+            changed(self.request.POST.get('user_id'), 'project', 'update', project_name = self.request.POST.get('project_name'))
 
-class Project_RETRIEVE_project(mixins.ListModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
+        # make response then return
+        serializer = self.get_serializer(todo)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+class Project_RETRIEVE_project(Values_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Project_RETRIEVE_project
         SECURITY LEVEL r2
@@ -178,29 +840,30 @@ class Project_RETRIEVE_project(mixins.ListModelMixin, generics.GenericAPIView, I
     def query_validation(self):
         super().query_validation()
         if len(self.request.POST) == 0:
-            return models.Project.objects.none()
+            self.fetched = []
+            return self.fetched
         
-        queryset = models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with correct user_id.') 
+        # project with its todos. (one query)
+        self.fetch_values(models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
+                                                          & Q(user_id = self.request.POST.get('user_id'))),
+                            'todo_project',
+                            exist_error='project_name must already exists in the db with correct user_id.')
 
     def get_queryset(self):
-        return models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                             & Q(user_id = self.request.POST.get('user_id')) 
-                                             & ~Q(todo_name=''))
+        return self.fetched
 
+    @cached_response
     def post(self, request, *args, **kwargs):
         self.query_validation()
         return self.list(request, *args, **kwargs)
 
-class Project_RETRIEVE_user(mixins.ListModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
+class Project_RETRIEVE_user(Streaming_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Project_RETRIEVE_user
         SECURITY LEVEL r2
         - retrieve the list of project, with the specific user.
         - only search for target user_id
+        - rows are streamed as a JSON array, chunk by chunk.
     GET params
         - user_id
     """
@@ -216,8 +879,32 @@ class Project_RETRIEVE_user(mixins.ListModelMixin, generics.GenericAPIView, IsOw
         
     def get_queryset(self):
         self.query_validation()
-        return models.Project.objects.filter(user_id = self.request.POST.get("user_id"))
+        # in the id order of the model queryset. the (user_id, name) index covers the columns, and would order by the name.
+        return self.values_iterator(models.Project.objects.filter(user_id = self.request.POST.get("user_id")).order_by('id'))
     
+    @cached_response
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        return self.list(request, *args, **kwargs)
+
+class Project_RETRIEVE_list(Values_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Project_RETRIEVE_list
+        SECURITY LEVEL r2
+        - retrieve the list of project with the count of its todos, with the specific user.
+        - counts are aggregated in the same query.
+    POST params
+        - user_id
+    """
+
+    serializer_class = serializers.Project_count
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return self.values_rows(models.Project.objects.filter(user_id = self.request.POST.get("user_id")).annotate(
+            todo_count = Count('todo_project')).order_by('id'))
+
+    @cached_response
     def post(self, request, *args, **kwargs):
         self.query_validation()
         return self.list(request, *args, **kwargs)
@@ -241,32 +928,34 @@ class Project_DELETE_todo(mixins.ListModelMixin, mixins.DestroyModelMixin, gener
 
     def query_validation(self):
         super().query_validation()
-        # project_name, user_id check
-        queryset = models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with the corresponding user_id.')
+        # project_name, user_id check, with the targeted todos. (one query)
+        self.fetch_children(models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
+                                                          & Q(user_id = self.request.POST.get('user_id'))),
+                            'todo_project', condition=Q(todo_project__todo_name = self.request.POST.get('todo_name')),
+                            exist_error='project_name must already exists in the db with the corresponding user_id.')
         # todo_name null check.
         # if null validation not done, it can delete THE WHOLE PROJECT Ref.
         if self.request.POST.get('todo_name') == '' or self.request.POST.get('todo_name') == None:
             raise exceptions.ValidationError('target todo_name cannot be null or blank')
 
     def get_queryset(self):
-        return models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id'))
-                                                 & Q(todo_name = self.request.POST.get('todo_name')))
+        return self.fetched
 
     def post(self, request, *args, **kwargs):
         self.query_validation()
         response = self.list(request, *args, **kwargs)
-        self.get_queryset().delete()
+        with transaction.atomic():
+            self.delete_fetched(self.fetched)
+            models.Project.objects.filter(id__in = [getattr(project, 'id') for project in self.parents]).update(updated_at = timezone.now(),
+                                                                                                                change_seq = models.Sequence.objects.next())
+            changed(self.request.POST.get('user_id'), 'project', 'update', project_name = self.request.POST.get('project_name'))
         return response
     
 class Project_DELETE_project(mixins.ListModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Project_DELETE_project
         SECURITY LEVEL d2
-        - delete the rows whose have the same project_name in the model.
+        - delete the project, with its todos.
         - only search for target project_name.
     POST params
         - user_id
@@ -280,18 +969,23 @@ class Project_DELETE_project(mixins.ListModelMixin, mixins.DestroyModelMixin, ge
 
     def query_validation(self):
         super().query_validation()
-        if self.get_queryset().exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with the corresponding user_id.')
+        self.fetch_validation(models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
+                                                            & Q(user_id = self.request.POST.get('user_id'))),
+                              exist_error='project_name must already exists in the db with the corresponding user_id.')
 
     def get_queryset(self):
-        return models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
+        return self.fetched
          
 
     def post(self, request, *args, **kwargs):
         self.query_validation()
         response = self.list(request, *args, **kwargs)
-        self.get_queryset().delete()
+        # targets are read before the delete, Collector clears the pk of the deleted rows.
+        targets = [(getattr(project, 'id'), getattr(project, 'project_name'), None) for project in self.fetched]
+        with transaction.atomic():
+            self.delete_fetched(self.fetched)
+            models.Tombstone.objects.bury(self.request.POST.get('user_id'), 'project', targets)
+            changed(self.request.POST.get('user_id'), 'project', 'delete', project_name = self.request.POST.get('project_name'))
         return response
 
 
@@ -310,25 +1004,32 @@ class Stamp_CREATE_stamp(generics.CreateAPIView, IsOwner_permission_Mixin):
     database changes
         - model Stamp will get new row of stamp.
         - row will created with user_id, stamp_name and other parms = (blank)
+        - response has the id of the created stamp, the stamp_id of the other views.
     """   
 
 
-    serializer_class = serializers.Stamp_stamp
+    serializer_class = serializers.Stamp_stamp_created
     permission_classes = [permissions.IsAuthenticated]
 
-    def query_validation(self):
-        super().query_validation()
-        if self.get_queryset().exists() == True:
-            raise exceptions.ValidationError('cannot add stamp that already has been exist.')
-        
     def get_queryset(self):
         queryset = models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id')) 
                                                  & Q(stamp_name = self.request.POST.get('stamp_name')))
         return queryset
         
+    def perform_create(self, serializer):
+        serializer.save(change_seq = self.change_seq)
+
     def create(self, request, *args, **kwargs):
         self.query_validation()
-        return super().create(request, *args, **kwargs)
+        # uniqueness of stamp_name is checked by models.Stamp's constraint.
+        with transaction.atomic():
+            # taken first, so the write lock is held before the serializer reads.
+            self.change_seq = models.Sequence.objects.next()
+            with unique_validation('cannot add stamp that already has been exist.'):
+                response = super().create(request, *args, **kwargs)
+            invalidate_definition(self.request.POST.get('user_id'), self.request.POST.get('stamp_name'))
+            changed(self.request.POST.get('user_id'), 'stamp', 'update', stamp_name = self.request.POST.get('stamp_name'))
+        return response
     
 class Stamp_CREATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
     """
@@ -353,16 +1054,15 @@ class Stamp_CREATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
 
     def query_validation(self):
         super().query_validation()
-        queryset = models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id')) 
-                                                 & Q(stamp_name = self.request.POST.get('stamp_name')))
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('stamp_name must already exists in the db with the corresponding user_id.')
+        self.fetch_validation(models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id')) 
+                                                          & Q(stamp_name = self.request.POST.get('stamp_name'))),
+                              exist_error='stamp_name must already exists in the db with the corresponding user_id.')
         if self.request.POST.get('subelement_name') == '' or self.request.POST.get('subelement_name') == None or self.request.POST.get('defFunc_name') == '' or self.request.POST.get('defFunc_name') == None:
             raise exceptions.ValidationError('subelement_name and defFunc_name cannot be null or blank')
     
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id'))
-                                            & Q(stamp_name = self.request.POST.get('stamp_name'))
+        return models.Subelement.objects.filter(Q(stamp_id__user_id=self.request.POST.get('user_id'))
+                                            & Q(stamp_id__stamp_name = self.request.POST.get('stamp_name'))
                                             & Q(subelement_name = self.request.POST.get('subelement_name'))
                                             & Q(defFunc_name = self.request.POST.get('defFunc_name')))
 
@@ -394,21 +1094,20 @@ class Stamp_CREATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
             raise exceptions.ValidationError('wrong name : defFunc_name ')
 
 
-        # create arg_rows in models.Stamp
-        for k,v in set_dict.items():
-            arg_name = k
-            arg_val = v
-            models.Stamp.objects.create(user_id=models.User.objects.get(id=int(user_id)), 
-                                        stamp_name=stamp_name, 
-                                        subelement_name=subelement_name,
-                                        defFunc_name = defFunc_name,
-                                        arg_name = arg_name,
-                                        arg_val = arg_val)
-
-        models.Stamp.objects.create(user_id=models.User.objects.get(id=int(user_id)), 
-                                        stamp_name=stamp_name, 
-                                        subelement_name=subelement_name,
-                                        defFunc_name = defFunc_name) # create subelement descriptional row
+        # create subelement row, then its arg_rows in models.SubelementArg. (one transaction)
+        targetStamp = self.fetched[0]
+        with transaction.atomic():
+            subelement = models.Subelement.objects.create(stamp_id=targetStamp,
+                                                          subelement_name=subelement_name,
+                                                          defFunc_name = defFunc_name)
+            models.SubelementArg.objects.bulk_create([models.SubelementArg(subelement_id = subelement,
+                                                                           arg_name = arg_name,
+                                                                           arg_val = arg_val)
+                                                      for arg_name, arg_val in set_dict.items()])
+            models.Stamp.objects.filter(id = targetStamp.id).update(updated_at = timezone.now(),
+                                                                    change_seq = models.Sequence.objects.next())
+            invalidate_definition(user_id, stamp_name)
+            changed(user_id, 'stamp', 'update', stamp_name = stamp_name)
 
         # make response then return
         serializer = self.get_serializer(data=request.data)
@@ -416,12 +1115,13 @@ class Stamp_CREATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class Stamp_RETRIEVE_user(mixins.ListModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
+class Stamp_RETRIEVE_user(Streaming_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Project_RETRIEVE_user
         SECURITY LEVEL r2
         - retrieve the list of stamp, with the specific user.
         - only search for target user_id
+        - rows are streamed as a JSON array, chunk by chunk.
     GET params
         - user_id
     """
@@ -437,13 +1137,15 @@ class Stamp_RETRIEVE_user(mixins.ListModelMixin, generics.GenericAPIView, IsOwne
         
     def get_queryset(self):
         self.query_validation()
-        return models.Stamp.objects.filter(user_id = self.request.POST.get("user_id"))
+        # in the id order of the model queryset. the (user_id, name) index covers the columns, and would order by the name.
+        return self.values_iterator(models.Stamp.objects.filter(user_id = self.request.POST.get("user_id")).order_by('id'))
     
+    @cached_response
     def post(self, request, *args, **kwargs):
         self.query_validation()
         return self.list(request, *args, **kwargs)
     
-class Stamp_RETRIEVE_stamp(mixins.ListModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
+class Stamp_RETRIEVE_stamp(Values_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Project_RETRIEVE_project
         SECURITY LEVEL r2
@@ -465,24 +1167,24 @@ class Stamp_RETRIEVE_stamp(mixins.ListModelMixin, generics.GenericAPIView, IsOwn
     def query_validation(self):
         super().query_validation()
         if len(self.request.POST) == 0:
-            return models.Stamp.objects.none()
+            self.fetched = []
+            return self.fetched
         
-        queryset = models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with correct user_id.') 
+        # stamp with its subelements. (one query)
+        self.fetch_values(models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
+                                                        & Q(user_id = self.request.POST.get('user_id'))),
+                            'subelement_stamp',
+                            exist_error='project_name must already exists in the db with correct user_id.')
 
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                             & Q(user_id = self.request.POST.get('user_id')) 
-                                             & ~Q(subelement_name='') & Q(arg_name = ''))
+        return self.fetched
 
+    @cached_response
     def post(self, request, *args, **kwargs):
         self.query_validation()
         return self.list(request, *args, **kwargs)
 
-class Stamp_RETRIEVE_subelement(generics.ListAPIView, IsOwner_permission_Mixin):
+class Stamp_RETRIEVE_subelement(Values_list_Mixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Stamp_RETRIEVE_subelement
         SECURITY LEVEL r2
@@ -506,25 +1208,59 @@ class Stamp_RETRIEVE_subelement(generics.ListAPIView, IsOwner_permission_Mixin):
     def query_validation(self):
         super().query_validation()
         if len(self.request.POST) == 0:
-            return models.Stamp.objects.none()
+            self.fetched = []
+            return self.fetched
         
-        queryset = models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                                 & Q(subelement_name = self.request.POST.get('subelement_name'))
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('stamp_name and subelement_name must already exists in the db with correct user_id.') 
+        # subelement and its stamp, with its args. (one query)
+        self.fetch_values(models.Subelement.objects.filter(Q(stamp_id__stamp_name=self.request.POST.get('stamp_name'))
+                                                             & Q(subelement_name = self.request.POST.get('subelement_name'))
+                                                             & Q(stamp_id__user_id = self.request.POST.get('user_id'))),
+                            'arg_subelement',
+                            exist_error='stamp_name and subelement_name must already exists in the db with correct user_id.')
 
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                             & Q(subelement_name = self.request.POST.get('subelement_name'))
-                                             & Q(user_id = self.request.POST.get('user_id')) 
-                                             & ~Q(arg_name=''))
+        return self.fetched
 
+    @cached_response
     def post(self, request, *args, **kwargs):
         self.query_validation()
         return self.list(request, *args, **kwargs)
 
+class Stamp_RETRIEVE_tree(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Stamp_RETRIEVE_tree
+        SECURITY LEVEL r2
+        - retrieve every stamp of the user, with its subelements and their typed args.
+        - args are parsed by subelement_type of sub.loc[defFunc_name].
+        - read by one ordered query, then the tree is made in one pass.
+    POST params
+        - user_id
+        - stamp_name : (optional) retrieve only this stamp.
+    """
+
+    serializer_class = serializers.Stamp_tree_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def query_validation(self):
+        super().query_validation()
+        serializer = self.get_serializer(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        self.args = serializer.validated_data
+
+        self.fetch_validation(self.get_queryset(),
+                              exist_error='stamp_name must already exists in the db with correct user_id.' if self.args.get('stamp_name') != None else None)
+
+    def get_queryset(self):
+        queryset = models.Stamp.objects.filter(user_id = self.args['user_id'])
+        if self.args.get('stamp_name') != None:
+            queryset = queryset.filter(stamp_name = self.args['stamp_name'])
+        return stamp_tree_rows(queryset)
+
+    @cached_response
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        return Response(stamp_tree(self.args['user_id'], self.fetched), status=status.HTTP_200_OK)
+
 class Stamp_DELETE_stamp(mixins.ListModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Stamp_DELETE_stamp
@@ -544,16 +1280,22 @@ class Stamp_DELETE_stamp(mixins.ListModelMixin, mixins.DestroyModelMixin, generi
 
     def query_validation(self):
         super().query_validation()
-        if self.get_queryset().exists() == False:
-            raise exceptions.ValidationError('stamp_name must already exists in the db with the corresponding user_id.')
+        self.fetch_validation(models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
+                                                          & Q(user_id = self.request.POST.get('user_id'))),
+                              exist_error='stamp_name must already exists in the db with the corresponding user_id.')
 
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
+        return self.fetched
     def post(self, request, *args, **kwargs):
         self.query_validation()
         response = self.list(request, *args, **kwargs)
-        self.get_queryset().delete()
+        # targets are read before the delete, Collector clears the pk of the deleted rows.
+        targets = [(getattr(stamp, 'id'), getattr(stamp, 'stamp_name'), None) for stamp in self.fetched]
+        with transaction.atomic():
+            self.delete_fetched(self.fetched)
+            models.Tombstone.objects.bury(self.request.POST.get('user_id'), 'stamp', targets)
+            changed(self.request.POST.get('user_id'), 'stamp', 'delete', stamp_name = self.request.POST.get('stamp_name'))
+        invalidate_definition(self.request.POST.get('user_id'), self.request.POST.get('stamp_name'))
         return response
     
 class Stamp_DELETE_subelement(mixins.ListModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
@@ -575,23 +1317,29 @@ class Stamp_DELETE_subelement(mixins.ListModelMixin, mixins.DestroyModelMixin, g
 
     def query_validation(self):
         super().query_validation()
-        # validate existance of stamp_name, user_id
-        query = models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id')))
-        if query.exists() == False:
-            raise exceptions.ValidationError('stamp_name must already exists in the db with the corresponding user_id.')
+        # validate existance of stamp_name, user_id, with the targeted subelements. (one query)
+        self.fetch_children(models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
+                                                        & Q(user_id = self.request.POST.get('user_id'))),
+                            'subelement_stamp', condition=Q(subelement_stamp__subelement_name = self.request.POST.get('subelement_name')),
+                            exist_error='stamp_name must already exists in the db with the corresponding user_id.')
         # null check for subelement_name
         if self.request.POST.get('subelement_name') == '' or self.request.POST.get('subelement_name') == None:
             raise exceptions.ValidationError('target subelement_name cannot be null or blank')
 
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name')) 
-                                                 & Q(user_id = self.request.POST.get('user_id'))
-                                                 & Q(subelement_name = self.request.POST.get('subelement_name')))
+        return self.fetched
     def post(self, request, *args, **kwargs):
         self.query_validation()
         response = self.list(request, *args, **kwargs)
-        self.get_queryset().delete()
+        with transaction.atomic():
+            self.delete_fetched(self.fetched)
+            models.Ledger.objects.filter(user_id = self.request.POST.get('user_id'),
+                                         stamp_id__in = self.parents,
+                                         subelement_name = self.request.POST.get('subelement_name')).delete()
+            models.Stamp.objects.filter(id__in = [getattr(stamp, 'id') for stamp in self.parents]).update(updated_at = timezone.now(),
+                                                                                                          change_seq = models.Sequence.objects.next())
+            changed(self.request.POST.get('user_id'), 'stamp', 'update', stamp_name = self.request.POST.get('stamp_name'))
+        invalidate_definition(self.request.POST.get('user_id'), self.request.POST.get('stamp_name'))
         return response
 
 class Stamp_UPDATE_stamp(generics.CreateAPIView, IsOwner_permission_Mixin):
@@ -612,30 +1360,41 @@ class Stamp_UPDATE_stamp(generics.CreateAPIView, IsOwner_permission_Mixin):
     def query_validation(self):
         super().query_validation()
 
+        stamp_name = self.request.POST.get("stamp_name")
+        stamp_rename = self.request.POST.get("stamp_rename")
+
+        # select target and update target, at once.
+        self.fetch_validation(models.Stamp.objects.filter(user_id = self.request.POST.get("user_id"),
+                                                          stamp_name__in = [stamp_name, stamp_rename]))
+
         # select target exisistance
-        queryset = models.Stamp.objects.filter(user_id = self.request.POST.get("user_id"),
-                                           stamp_name = self.request.POST.get("stamp_name"))
-        if queryset.exists() == False:
+        if not any(getattr(stamp, 'stamp_name') == stamp_name for stamp in self.fetched):
             raise exceptions.ValidationError('cannot select stamp that was not have been exist.')
         
         # update target exisistance
-        queryset = models.Stamp.objects.filter(user_id = self.request.POST.get("user_id"),
-                                           stamp_name = self.request.POST.get("stamp_rename"))
-        if queryset.exists() == True:
+        if any(getattr(stamp, 'stamp_name') == stamp_rename for stamp in self.fetched):
             raise exceptions.ValidationError('cannot update stamp to the name that already used by other stamp.')
     
 
     def get_queryset(self):
-        self.query_validation()
-        return models.Stamp.objects.filter(user_id = self.request.POST.get("user_id"),
-                                           stamp_name = self.request.POST.get("stamp_name"))
+        return models.Stamp.objects.filter(id__in = [getattr(stamp, 'id') for stamp in self.fetched
+                                                     if getattr(stamp, 'stamp_name') == self.request.POST.get("stamp_name")])
     
     def post(self, request, *args, **kwargs):
+        self.query_validation()
+
         # update model
         stamp_rename = self.request.POST.get("stamp_rename")
         if stamp_rename == "" or stamp_rename == None: # if rename is null then replace to orig
             stamp_rename = self.request.POST.get("stamp_name")
-        self.get_queryset().update(stamp_name=self.request.POST.get("stamp_rename"))
+        # the rename raced by the other request is checked by models.Stamp's constraint.
+        with transaction.atomic():
+            with unique_validation('cannot update stamp to the name that already used by other stamp.'):
+                self.get_queryset().update(stamp_name=stamp_rename, updated_at=timezone.now(),
+                                           change_seq=models.Sequence.objects.next())
+            invalidate_definition(self.request.POST.get("user_id"), self.request.POST.get("stamp_name"))
+            changed(self.request.POST.get("user_id"), 'stamp', 'update',
+                    stamp_name = self.request.POST.get("stamp_name"), stamp_rename = stamp_rename)
 
         # make response then return
         serializer = self.get_serializer(data=request.data)
@@ -667,26 +1426,23 @@ class Stamp_UPDATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
         user_id = self.request.POST.get("user_id")
         stamp_name = self.request.POST.get("stamp_name")
 
-        # select target exisistance
-        queryset = models.Stamp.objects.filter(user_id = user_id,
-                                           stamp_name = stamp_name)
-        if queryset.exists() == False:
-            raise exceptions.ValidationError('cannot select stamp that was not have been exist.')
+        subelement_name = self.request.POST.get("subelement_name")
+        subelement_rename = self.request.POST.get("subelement_rename")
+
+        # select target exisistance, with the subelements of select target and update target. (one query)
+        self.fetch_children(models.Stamp.objects.filter(user_id = user_id,
+                                                        stamp_name = stamp_name),
+                            'subelement_stamp', condition=Q(subelement_stamp__subelement_name__in = [subelement_name, subelement_rename]),
+                            exist_error='cannot select stamp that was not have been exist.')
         
         # update target exisistance
-        subelement_rename = self.request.POST.get("subelement_rename")
         if not(subelement_rename == "" or subelement_rename == None):
-            queryset = models.Stamp.objects.filter(Q(user_id = user_id)
-                                            & Q(stamp_name = stamp_name)
-                                            & Q(subelement_name = subelement_rename)
-                                            & Q(arg_name = ""))
-            if queryset.exists() == True:
+            if any(getattr(subelement, 'subelement_name') == subelement_rename for subelement in self.fetched):
                 raise exceptions.ValidationError('cannot update subelement_rename to the name that already used by other subelements.')
         
     def get_queryset(self):
-        return models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id'))
-                                            & Q(stamp_name = self.request.POST.get('stamp_name'))
-                                            & Q(subelement_name = self.request.POST.get('subelement_name')))
+        return [subelement for subelement in self.fetched
+                if getattr(subelement, 'subelement_name') == self.request.POST.get('subelement_name')]
 
     def create(self, request, *args, **kwargs):
         self.query_validation()
@@ -699,14 +1455,19 @@ class Stamp_UPDATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
             subelement_rename = subelement_name
         defFunc_rename = self.request.POST.get('defFunc_rename')
         
-        if defFunc_rename == None or defFunc_rename == "": # for defFunc_rename NULL case, just rename all subelement and its args.
+        if defFunc_rename == None or defFunc_rename == "": # for defFunc_rename NULL case, just rename the subelement row.
             if subelement_rename == subelement_name:
                 pass
             else:
-                queryset = models.Stamp.objects.filter(user_id=models.User.objects.get(id=int(user_id)), 
-                                                stamp_name=stamp_name, 
-                                                subelement_name=subelement_name)
-                queryset.update(subelement_name = subelement_rename)
+                with transaction.atomic():
+                    models.Subelement.objects.filter(id__in = [getattr(subelement, 'id') for subelement in self.get_queryset()]).update(subelement_name = subelement_rename)
+                    models.Ledger.objects.filter(user_id = int(user_id),
+                                                 stamp_id__in = self.parents,
+                                                 subelement_name = subelement_name).update(subelement_name = subelement_rename)
+                    models.Stamp.objects.filter(id__in = [getattr(stamp, 'id') for stamp in self.parents]).update(updated_at = timezone.now(),
+                                                                                                                  change_seq = models.Sequence.objects.next())
+                    invalidate_definition(user_id, stamp_name)
+                    changed(user_id, 'stamp', 'update', stamp_name = stamp_name)
         else: # for usuall case, delete and re-creation method is applied.
 
 
@@ -729,43 +1490,48 @@ class Stamp_UPDATE_subelement(generics.CreateAPIView, IsOwner_permission_Mixin):
                 raise exceptions.ValidationError('wrong name : defFunc_name ')
 
 
-            # first delete the old arg param
-            targetUser = models.User.objects.get(id=int(user_id))
-
-            queryset = models.Stamp.objects.filter(user_id=targetUser, 
-                                            stamp_name=stamp_name, 
-                                            subelement_name=subelement_name)
-            queryset.delete()
-
-            # update arg_rows in models.Stamp
-            for k,v in set_dict.items():
-                arg_name = k
-                arg_val = v
-                models.Stamp.objects.create(user_id=targetUser, 
-                                            stamp_name=stamp_name, 
-                                            subelement_name=subelement_rename,
-                                            defFunc_name = defFunc_rename,
-                                            arg_name = arg_name,
-                                            arg_val = arg_val)
-
-            models.Stamp.objects.create(user_id=targetUser, 
-                                            stamp_name=stamp_name, 
-                                            subelement_name=subelement_rename,
-                                            defFunc_name = defFunc_rename) # create subelement descriptional row
-
-            # find all the recode from models.Main which has stamp with user, and tag UNTRUSTED=true.
-            targetStamp = models.Stamp.objects.get(Q(stamp_name = stamp_name)
-                                                & Q(subelement_name = ""))
-            queryset = models.Main.objects.filter(user_id = targetUser,
-                                                  stamp_id = targetStamp,
-                                                  arg_name = "")
-            for obj in queryset:
-                date = getattr(obj, "date")
-                models.Main.objects.create(user_id = targetUser,
-                                        stamp_id = targetStamp,
-                                        date = date,
-                                        arg_name = "untrusted",
-                                        arg_val = True)
+            # every write below is done in one transaction.
+            targetUser = int(user_id)
+            targetStamp = self.parents[0]
+            with transaction.atomic():
+                # first delete the old subelement with its args
+                self.delete_fetched(self.get_queryset())
+
+                # re-create subelement row, then its arg_rows in models.SubelementArg
+                subelement = models.Subelement.objects.create(stamp_id = targetStamp,
+                                                              subelement_name = subelement_rename,
+                                                              defFunc_name = defFunc_rename)
+                models.SubelementArg.objects.bulk_create([models.SubelementArg(subelement_id = subelement,
+                                                                               arg_name = arg_name,
+                                                                               arg_val = arg_val)
+                                                          for arg_name, arg_val in set_dict.items()])
+
+                # find all the recode from models.Main which has stamp with user, and tag UNTRUSTED=true.
+                # recode already tagged is not tagged twice.
+                dates = {}
+                for date, arg_name in models.Main.objects.filter(user_id = targetUser,
+                                                                 stamp_id = targetStamp,
+                                                                 arg_name__in = ["", "untrusted"]).values_list('date', 'arg_name'):
+                    dates[date] = dates.get(date, False) or arg_name == "untrusted"
+                tagged = models.Main.objects.bulk_create([models.Main(user_id_id = targetUser,
+                                                                      stamp_id = targetStamp,
+                                                                      date = date,
+                                                                      arg_name = "untrusted",
+                                                                      arg_val = True)
+                                                          for date, untrusted in dates.items() if untrusted == False])
+                change_seq = models.Sequence.objects.next()
+                models.Stamp.objects.filter(id = targetStamp.id).update(updated_at = timezone.now(), change_seq = change_seq)
+                if len(tagged) != 0: # every recode of the stamp is tagged now.
+                    models.Main.objects.filter(user_id = targetUser, stamp_id = targetStamp, arg_name = '').update(updated_at = timezone.now(),
+                                                                                                                   change_seq = change_seq)
+
+                # bounds may have been changed, recompute the whole accumulate history.
+                models.Ledger.objects.filter(user_id = targetUser,
+                                             stamp_id = targetStamp,
+                                             subelement_name = subelement_name).delete()
+                invalidate_definition(targetUser, stamp_name)
+                resync_accumulate(targetUser, targetStamp.id)
+                changed(targetUser, 'stamp', 'update', stamp_name = stamp_name)
 
 
         # make response then return
@@ -800,16 +1566,16 @@ class Main_CREATE_main(generics.CreateAPIView, IsOwner_permission_Mixin):
 
     def query_validation(self):
         super().query_validation()
-        # validation of existance
-        if self.get_queryset().exists() == True:
-            raise exceptions.ValidationError('cannot add recode that already has been exist.')
+        # validation of existance is done by models.Main's constraint, when the recode is created.
         
         # validation of foregin key relation matching
-        self.serializer_class = serializers.Stamp_all
-        stamp_user = models.Stamp.objects.filter(Q(user_id=self.request.POST.get('user_id'))
-                                                & Q(id = self.request.POST.get('stamp_id')))
-        if stamp_user.exists() == False:
+        # compiled definition only exists for the stamp that user owns. (no query if cached)
+        try:
+            self.definition = self.fetch_definition(self.request.POST.get('user_id'), self.request.POST.get('stamp_id'))
+        except (models.Stamp.DoesNotExist, ValueError, TypeError):
             raise exceptions.ValidationError('targeted user must already have the targeted stamp.')
+        if len(self.definition.subelements) == 0:
+            raise exceptions.ValidationError('targeted stamp must have the subelement.')
         self.serializer_class = serializers.Main_main
         
     def get_queryset(self):
@@ -825,45 +1591,191 @@ class Main_CREATE_main(generics.CreateAPIView, IsOwner_permission_Mixin):
         stamp_id = self.request.POST.get('stamp_id')
         date = self.request.POST.get('date')
 
-        # make subvar dict
-        stamp_stamp = models.Stamp.objects.get(id = int(stamp_id))
-        stamp_name = getattr(stamp_stamp, "stamp_name")
-        stamp_subelements = models.Stamp.objects.filter( Q(user_id = int(user_id))
-                                                        & Q(stamp_name = stamp_name)
-                                                        & ~Q(defFunc_name = '')
-                                                        & Q(arg_name = ''))
-        subvar_dict = None
-        for subelement in stamp_subelements:
-            subelement_name = getattr(subelement, 'subelement_name')
-            if getattr(subelement, 'defFunc_name') == 'discrete_point':
-                main_vals = self.request.POST.get("main_vals").split(' ')
-                queryset = models.Stamp.objects.filter( Q(user_id = int(user_id))
-                                                        & Q(stamp_name = stamp_name)
-                                                        & Q(subelement_name = subelement_name)
-                                                        & ~Q(arg_name = ''))
-                subvar_dict = sub.Discrete_point.subvar_set(queryset, *main_vals)
-            else :
-                raise exceptions.ValidationError('wrong name : defFunc_name ')
+        with transaction.atomic():
+            # recode descriptional row first. the same recode that already exists is rejected here.
+            with unique_validation('cannot add recode that already has been exist.'):
+                models.Main.objects.create(user_id_id = int(user_id),
+                                           stamp_id_id = int(stamp_id),
+                                           date = date,
+                                           change_seq = models.Sequence.objects.next())
+
+            # make subvar dict
+            subvar_dict = None
+            for subelement in self.definition.subelements:
+                if subelement.defFunc_name == 'discrete_point':
+                    main_vals = self.request.POST.get("main_vals").split(' ')
+
+                    # running total of the previous recodes, O(1) read from the ledger.
+                    # the ledger is unique per subelement, so the concurrent first recodes share one row.
+                    ledger = None
+                    if subelement.args['is_accumulated'] == True:
+                        ledger, _ = models.Ledger.objects.select_for_update().get_or_create(user_id_id = int(user_id),
+                                                                                            stamp_id_id = int(stamp_id),
+                                                                                            subelement_name = subelement.subelement_name)
+                    accumulated = 0 if ledger == None else getattr(ledger, 'total')
+                    subvar_dict = sub.Discrete_point.subvar_set(subelement, *main_vals, accumulated=accumulated)
+
+                    if 'accumulate' in subvar_dict:
+                        ledger.total = int(subvar_dict['accumulate']) + int(subvar_dict['value'])
+                        ledger.save(update_fields=['total'])
+                else :
+                    raise exceptions.ValidationError('wrong name : defFunc_name ')
+
+            for k,v in subvar_dict.items():
+                arg_name = k
+                arg_val = v
+                models.Main.objects.create(user_id_id = int(user_id),
+                                            stamp_id_id = int(stamp_id),
+                                            date = date,
+                                            arg_name = arg_name,
+                                            arg_val = arg_val,)
 
-        for k,v in subvar_dict.items():
-            arg_name = k
-            arg_val = v
-            models.Main.objects.create(user_id = models.User.objects.get(id=int(user_id)), 
-                                        stamp_id = models.Stamp.objects.get(id=int(stamp_id)),
+            # daily aggregate for the heatmap. recode is unique in the date, so the day row is new.
+            models.Daily.objects.create(user_id_id = int(user_id),
+                                        stamp_id_id = int(stamp_id),
                                         date = date,
-                                        arg_name = arg_name, 
-                                        arg_val = arg_val,)
+                                        count = 1,
+                                        total = int(subvar_dict.get('value', 0)))
+
+            # back-dated recode : ledger was the total of the later recodes too, so recompute from this date.
+            later = models.Main.objects.filter(user_id = int(user_id), stamp_id = int(stamp_id), arg_name = '', date__gt = date)
+            if later.exists() == True:
+                resync_accumulate(int(user_id), int(stamp_id), since=date, definition=self.definition)
+            changed(user_id, 'main', 'update', stamp_id = int(stamp_id), date = date)
 
-        models.Main.objects.create(user_id = models.User.objects.get(id=int(user_id)), 
-                                    stamp_id = models.Stamp.objects.get(id=int(stamp_id)),
-                                    date = date)
-        
         # make response then return
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+class Main_CREATE_bulk(generics.CreateAPIView, IsOwner_permission_Mixin):
+    """
+    # Main_CREATE_bulk
+        SECURITY LEVEL c2
+        - create many main recodes at once. (multi-day, multi-stamp stamping)
+        - recodes of the same stamp are evaluated in date order, so accumulate is chained correctly.
+        - if any recode is invalid or already exists, nothing will be created.
+    POST params
+        - user_id : specific user's id.
+        - records : json list of {"stamp_id": <int>, "date": <date>, "main_vals": <str>}
+            + each element is the same as Main_CREATE_main's stamp_id, date, main_vals.
+    database changes
+        - model Main will get new rows of recodes, written by bulk_create in one transaction.
+    """
+
+    serializer_class = serializers.Main_bulk_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def query_validation(self):
+        super().query_validation()
+        user_id = self.request.POST.get('user_id')
+
+        # validation of records form
+        try:
+            records = json.loads(self.request.POST.get('records'))
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError('records must be the json list of {stamp_id, date, main_vals}.')
+        serializer = serializers.Main_bulk_record(data=records, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.records = serializer.validated_data
+
+        # validation of foregin key relation matching, once per stamp
+        self.definitions = {}
+        for record in self.records:
+            stamp_id = record['stamp_id']
+            if stamp_id in self.definitions:
+                continue
+            try:
+                self.definitions[stamp_id] = self.fetch_definition(user_id, stamp_id)
+            except models.Stamp.DoesNotExist:
+                raise exceptions.ValidationError('targeted user must already have the targeted stamp.')
+            if len(self.definitions[stamp_id].subelements) == 0:
+                raise exceptions.ValidationError('targeted stamp must have the subelement.')
+
+        # validation of existance inside of the request. existance in the db is checked by models.Main's constraint.
+        keys = set((record['stamp_id'], record['date']) for record in self.records)
+        if len(keys) != len(self.records):
+            raise exceptions.ValidationError('cannot add the same recode twice.')
+
+    def get_queryset(self):
+        return models.Main.objects.filter(Q(user_id=self.request.POST.get('user_id'))
+                                          & Q(stamp_id__in = [record['stamp_id'] for record in self.records])
+                                          & Q(date__in = [record['date'] for record in self.records])
+                                          & Q(arg_name = ''))
+
+    def create(self, request, *args, **kwargs):
+        self.query_validation()
+        user_id = int(self.request.POST.get('user_id'))
+        stamp_ids = list(self.definitions.keys())
+
+        with transaction.atomic():
+            # taken first, so the write lock is held before the ledgers are read.
+            change_seq = models.Sequence.objects.next()
+
+            # running totals and the last recoded date of every targeted stamp.
+            ledgers = {}
+            for ledger in models.Ledger.objects.select_for_update().filter(user_id = user_id, stamp_id__in = stamp_ids):
+                ledgers[(getattr(ledger, 'stamp_id_id'), getattr(ledger, 'subelement_name'))] = ledger
+            latest = dict(models.Main.objects.filter(user_id = user_id, stamp_id__in = stamp_ids, arg_name = '')
+                                            .values('stamp_id').annotate(latest = Max('date')).values_list('stamp_id', 'latest'))
+
+            # evaluate every recode in one pass, chaining the ledger total by date.
+            rows = []
+            headers = []
+            days = []
+            resync_since = {}
+            for record in sorted(self.records, key=lambda record: (record['stamp_id'], record['date'])):
+                stamp_id = record['stamp_id']
+                date = record['date']
+                main_vals = record['main_vals'].split(' ')
+
+                subvar_dict = {}
+                for subelement in self.definitions[stamp_id].subelements:
+                    if subelement.defFunc_name == 'discrete_point':
+                        key = (stamp_id, subelement.subelement_name)
+                        ledger = ledgers.get(key)
+                        accumulated = 0 if ledger == None else getattr(ledger, 'total')
+                        subvar_dict = sub.Discrete_point.subvar_set(subelement, *main_vals, accumulated=accumulated)
+
+                        if 'accumulate' in subvar_dict:
+                            if ledger == None:
+                                ledger = models.Ledger(user_id_id = user_id,
+                                                       stamp_id_id = stamp_id,
+                                                       subelement_name = subelement.subelement_name)
+                                ledgers[key] = ledger
+                            ledger.total = int(subvar_dict['accumulate']) + int(subvar_dict['value'])
+                    else :
+                        raise exceptions.ValidationError('wrong name : defFunc_name ')
+
+                for k,v in subvar_dict.items():
+                    rows.append(models.Main(user_id_id = user_id, stamp_id_id = stamp_id, date = date, arg_name = k, arg_val = v))
+                header = models.Main(user_id_id = user_id, stamp_id_id = stamp_id, date = date, change_seq = change_seq)
+                rows.append(header)
+                headers.append(header)
+                days.append(models.Daily(user_id_id = user_id, stamp_id_id = stamp_id, date = date,
+                                         count = 1, total = int(subvar_dict.get('value', 0))))
+
+                # back-dated recode : the later recodes in the db should be recomputed.
+                if latest.get(stamp_id) != None and date < latest[stamp_id] and stamp_id not in resync_since:
+                    resync_since[stamp_id] = date
+
+            new_ledgers = [ledger for ledger in ledgers.values() if ledger.pk == None]
+            old_ledgers = [ledger for ledger in ledgers.values() if ledger.pk != None]
+            with unique_validation('cannot add recode that already has been exist.'):
+                models.Main.objects.bulk_create(rows)
+            models.Daily.objects.bulk_create(days)
+            models.Ledger.objects.bulk_create(new_ledgers)
+            models.Ledger.objects.bulk_update(old_ledgers, ['total'])
+
+            for stamp_id, since in resync_since.items():
+                resync_accumulate(user_id, stamp_id, since=since, definition=self.definitions[stamp_id])
+            changed(user_id, 'main', 'update', *[{'stamp_id': record['stamp_id'], 'date': str(record['date'])} for record in self.records])
+
+        # make response then return
+        serializer = serializers.Main_main(headers, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 class Main_DELETE_main(mixins.ListModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView, IsOwner_permission_Mixin):
     """
     # Main_DELETE_main
@@ -884,19 +1796,607 @@ class Main_DELETE_main(mixins.ListModelMixin, mixins.DestroyModelMixin, generics
     def query_validation(self):
         super().query_validation()
         # project_name, user_id check
-        if self.get_queryset().exists() == False:
-            raise exceptions.ValidationError('project_name must already exists in the db with the corresponding user_id.')
+        self.fetch_validation(models.Main.objects.filter(Q(user_id=self.request.POST.get('user_id')) 
+                                                         & Q(stamp_id = self.request.POST.get('stamp_id'))
+                                                         & Q(date = self.request.POST.get('date'))),
+                              exist_error='project_name must already exists in the db with the corresponding user_id.')
 
     def get_queryset(self):
-        return models.Main.objects.filter(Q(user_id=self.request.POST.get('user_id')) 
-                                                 & Q(stamp_id = self.request.POST.get('stamp_id'))
-                                                 & Q(date = self.request.POST.get('date')))
+        return self.fetched
 
     def post(self, request, *args, **kwargs):
         self.query_validation()
         response = self.list(request, *args, **kwargs)
-        self.get_queryset().delete()
+        with transaction.atomic():
+            self.delete_fetched(self.fetched)
+            models.Daily.objects.filter(user_id = self.request.POST.get('user_id'),
+                                        stamp_id = self.request.POST.get('stamp_id'),
+                                        date = self.request.POST.get('date')).delete()
+            models.Tombstone.objects.bury(self.request.POST.get('user_id'), 'main',
+                                          [(int(self.request.POST.get('stamp_id')), '', getattr(self.fetched[0], 'date'))])
+
+            # recodes after the deleted one have stale accumulate, recompute them with the ledger.
+            resync_accumulate(int(self.request.POST.get('user_id')), int(self.request.POST.get('stamp_id')), since=self.request.POST.get('date'))
+            changed(self.request.POST.get('user_id'), 'main', 'delete',
+                    stamp_id = int(self.request.POST.get('stamp_id')), date = self.request.POST.get('date'))
         return response
 
+class Main_RETRIEVE_heatmap(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Main_RETRIEVE_heatmap
+        SECURITY LEVEL r2
+        - retrieve the daily grid of the year. (365 or 366 days, starts from 01-01)
+        - each day has the count of recodes and the sum of their value.
+        - if stamp_id is not specified, every stamp of the user is summed.
+        - read from models.Daily by one indexed range query, models.Main is not scanned.
+    POST params
+        - user_id
+        - year : year of the grid.
+        - stamp_id : (optional) specific stamp_id.
+    """
+
+    serializer_class = serializers.Main_heatmap_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def query_validation(self):
+        super().query_validation()
+        serializer = self.get_serializer(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        self.args = serializer.validated_data
+
+        # validation of foregin key relation matching (no query if cached)
+        if self.args.get('stamp_id') != None:
+            try:
+                self.fetch_definition(self.args['user_id'], self.args['stamp_id'])
+            except (models.Stamp.DoesNotExist, ValueError, TypeError):
+                raise exceptions.ValidationError('targeted user must already have the targeted stamp.')
+
+    def get_queryset(self):
+        return heatmap_rows(self.args)
+
+    @cached_response
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        return Response(heatmap_grid(self.args, self.get_queryset()), status=status.HTTP_200_OK)
+
+
+class Main_RETRIEVE_range(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Main_RETRIEVE_range
+        SECURITY LEVEL r2
+        - retrieve the recodes in the date window, nested as date -> stamp_id -> {stamp_name, value, accumulate, untrusted}.
+        - paginated by the (date, id) keyset of the recode descriptional row, not by offset.
+        - if cursor is not null in the response, pass it with the same params to get the next page.
+    POST params
+        - user_id
+        - date_from, date_to : date window. (both inclusive)
+        - stamp_id : (optional) specific stamp_id.
+        - cursor : (optional) cursor of the previous page's response.
+        - limit : (optional) number of recodes per page. default 100, max 1000.
+    """
+
+    serializer_class = serializers.Main_range_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def query_validation(self):
+        super().query_validation()
+        serializer = self.get_serializer(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        self.args = serializer.validated_data
+
+        if self.args['date_from'] > self.args['date_to']:
+            raise exceptions.ValidationError('date_from cannot be later than date_to.')
+
+        self.cursor = range_cursor(self.args)
+
+    def get_queryset(self):
+        return range_headers(self.args, self.cursor)
+
+    @cached_response
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        headers, cursor = range_page(self.args, list(self.get_queryset()))
+
+        # arg rows of the page and the stamp names. (one query each)
+        arg_rows = []
+        stamp_names = {}
+        if len(headers) != 0:
+            arg_rows, stamp_names = range_detail_rows(self.args, headers)
+            stamp_names = dict(stamp_names)
+
+        return Response(range_days(self.args, headers, cursor, stamp_names, arg_rows), status=status.HTTP_200_OK)
+
+
+#endregion
+
+
+#region SYNC API
+
+class Sync_RETRIEVE(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Sync_RETRIEVE
+        SECURITY LEVEL r2
+        - retrieve the projects, stamps and recodes changed or deleted after the cursor, in the order of the change.
+        - changed : rows whose change_seq is after the cursor. deleted : models.Tombstone rows after the cursor.
+        - change_seq is given in the order of the commit (see models.Sequence), so the row committed
+          after the response is never behind its cursor.
+        - paginated by the (change_seq, kind, id) keyset. pass the cursor of the response to get the next changes.
+        - if nothing has been changed, the same cursor is returned with the empty changes.
+    POST params
+        - user_id
+        - since : (optional) cursor of the previous response. every row from the beginning if null.
+        - limit : (optional) number of changes per response. default 100, max 1000.
+    """
+
+    serializer_class = serializers.Sync_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    # kind -> rank in the cursor. changes of the same transaction are ordered by this.
+    ranks = {'project': 0, 'stamp': 1, 'main': 2, 'tombstone': 3}
+
+    def query_validation(self):
+        super().query_validation()
+        serializer = self.get_serializer(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        self.args = serializer.validated_data
+
+        # cursor : "<change_seq>,<rank>,<id>" of the last change of the previous response.
+        self.cursor = None
+        if self.args.get('since') != None and self.args['since'] != '':
+            try:
+                change_seq, rank, id = self.args['since'].split(',')
+                self.cursor = (int(change_seq), int(rank), int(id))
+            except ValueError:
+                raise exceptions.ValidationError('since must be the cursor of the previous response.')
+
+    def after_cursor(self, queryset, kind):
+        # (change_seq, rank, id) > cursor, then one more row than the limit to know the next changes exist.
+        if self.cursor != None:
+            change_seq, rank, id = self.cursor
+            condition = Q(change_seq__gt = change_seq)
+            if self.ranks[kind] > rank:
+                condition |= Q(change_seq = change_seq)
+            elif self.ranks[kind] == rank:
+                condition |= Q(change_seq = change_seq, id__gt = id)
+            queryset = queryset.filter(change_seq__gte = change_seq).filter(condition)
+        return queryset.order_by('change_seq', 'id')[:self.args.get('limit', 100) + 1]
+
+    def get_queryset(self):
+        user_id = self.args['user_id']
+        return {
+            'project': self.after_cursor(models.Project.objects.filter(user_id = user_id), 'project').values_list(
+                'change_seq', 'id', 'project_name'),
+            'stamp': self.after_cursor(models.Stamp.objects.filter(user_id = user_id), 'stamp').values_list(
+                'change_seq', 'id', 'stamp_name'),
+            'main': self.after_cursor(models.Main.objects.filter(user_id = user_id, arg_name = ''), 'main').values_list(
+                'change_seq', 'id', 'stamp_id', 'date'),
+            'tombstone': self.after_cursor(models.Tombstone.objects.filter(user_id = user_id), 'tombstone').values_list(
+                'change_seq', 'id', 'kind', 'target_id', 'target_name', 'date'),
+        }
+
+    @conditional_response
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        user_id = self.args['user_id']
+        limit = self.args.get('limit', 100)
+
+        # merge the changes of every kind in the (change_seq, rank, id) order. (one query per kind)
+        merged = heapq.merge(*[[(row[0], self.ranks[kind], row[1], kind, row) for row in rows]
+                               for kind, rows in self.get_queryset().items()])
+        page = [change for _, change in zip(range(limit + 1), merged)]
+        more = len(page) > limit
+        page = page[:limit]
+
+        cursor = self.args.get('since') or None
+        if len(page) != 0:
+            change_seq, rank, id, _, _ = page[-1]
+            cursor = f"{change_seq},{rank},{id}"
+
+        # current state of the changed rows. (one query per kind)
+        ids = {kind: [row for _, _, _, change_kind, row in page if change_kind == kind] for kind in self.ranks}
+        todos = {}
+        if len(ids['project']) != 0:
+            for project_id, todo_name in models.Todo.objects.filter(project_id__in = [row[1] for row in ids['project']]).order_by('id').values_list(
+                    'project_id', 'todo_name'):
+                todos.setdefault(project_id, []).append(todo_name)
+        stamps = {}
+        if len(ids['stamp']) != 0:
+            for stamp in stamp_tree(user_id, stamp_tree_rows(models.Stamp.objects.filter(id__in = [row[1] for row in ids['stamp']]))):
+                stamps[stamp['stamp_id']] = stamp
+        recodes = {}
+        if len(ids['main']) != 0:
+            for _, _, stamp_id, date in ids['main']:
+                recodes[(stamp_id, date)] = {'value': None, 'accumulate': None, 'untrusted': False}
+            for stamp_id, date, arg_name, arg_val in models.Main.objects.filter(user_id = user_id,
+                                                                                stamp_id__in = set(row[2] for row in ids['main']),
+                                                                                date__in = set(row[3] for row in ids['main']),
+                                                                                arg_name__in = ['value', 'accumulate', 'untrusted']).values_list(
+                                                                                    'stamp_id', 'date', 'arg_name', 'arg_val'):
+                recode = recodes.get((stamp_id, date))
+                if recode == None: # other recode of the same stamp or date, not changed.
+                    continue
+                if arg_name == 'untrusted':
+                    recode['untrusted'] = True
+                else:
+                    recode[arg_name] = int(arg_val)
+
+        changes = []
+        for _, _, _, kind, row in page:
+            if kind == 'project':
+                changes.append({'kind': 'project', 'op': 'update', 'project_id': row[1], 'project_name': row[2],
+                                'todos': todos.get(row[1], [])})
+            elif kind == 'stamp':
+                changes.append({'kind': 'stamp', 'op': 'update', **stamps[row[1]]})
+            elif kind == 'main':
+                changes.append({'kind': 'main', 'op': 'update', 'stamp_id': row[2], 'date': str(row[3]),
+                                **recodes[(row[2], row[3])]})
+            elif row[2] == 'main':
+                changes.append({'kind': 'main', 'op': 'delete', 'stamp_id': row[3], 'date': str(row[5])})
+            else:
+                changes.append({'kind': row[2], 'op': 'delete', row[2] + '_id': row[3], row[2] + '_name': row[4]})
+
+        return Response({'user_id': user_id,
+                         'cursor': cursor,
+                         'more': more,
+                         'changes': changes}, status=status.HTTP_200_OK)
+
+#endregion
+
+
+#region BATCH API
+
+class Batch_EXECUTE(generics.GenericAPIView, IsOwner_permission_Mixin):
+    """
+    # Batch_EXECUTE
+        SECURITY LEVEL rwdc2
+        - run the operations in order, in one transaction. all of them are committed, or none of them.
+        - each operation runs the view of api/<op> (project/, stamp/, main/), with the same POST params and the same response.
+        - authentication, csrf and the owner check run once for the batch. rows fetched by one operation are reused by the next ones.
+        - stops at the first failed operation, then rolls back the others. the status of the response is that of the failed one.
+    POST params
+        - user_id : user_id of every operation.
+        - operations : JSON list of {"op": <path under api/>, "params": {<POST params without user_id>}}
+            - param value "$<n>.<field>" is the field of the response of the n-th operation. (from 0)
+            ex) [{"op": "stamp/create/stamp", "params": {"stamp_name": "read"}},
+                 {"op": "stamp/create/subelement", "params": {"stamp_name": "read", "subelement_name": "pages",
+                                                             "defFunc_name": "discrete_point", "arg_names": "lowerbound", "arg_vals": "0"}},
+                 {"op": "main/create/main", "params": {"stamp_id": "$0.id", "date": "2023-03-01", "main_vals": "10"}}]
+    database changes
+        - those of the operations.
+    """
+    serializer_class = serializers.Batch_argsGet
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        self.query_validation()
+        serializer = self.get_serializer(data=request.POST)
+        serializer.is_valid(raise_exception=True)
+        try:
+            operations = batch.validate_operations(serializer.validated_data['operations'])
+        except ValueError as error:
+            raise exceptions.ValidationError(str(error))
+
+        committed, results = batch.execute(request, serializer.validated_data['user_id'], operations)
+        return Response({'committed': committed, 'results': results},
+                        status=status.HTTP_200_OK if committed == True else results[-1]['status'])
+
+#endregion
+
+
+#region CACHE API
+
+class Cache_RETRIEVE_stats(generics.GenericAPIView):
+    """
+    # Cache_RETRIEVE_stats
+        SECURITY LEVEL r0
+        - hit/miss counters of the response cache, counted in this worker process.
+        - hit_rate is null before the first lookup.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if getattr(request.user, 'is_superuser') != True:
+            raise exceptions.PermissionDenied('only the superuser can read the cache stats.')
+        return Response(responses.stats(), status=status.HTTP_200_OK)
+
+#endregion
+
+
+#region ASYNC API
+
+class Async_retrieve_View(View, IsOwner_permission_Mixin):
+    """
+    async version of the read-only views, served without a worker thread held by the request.
+        - authentication and permission_classes are run by DRF in one thread hop, then the queries are awaited by the async ORM.
+        - same POST params, same response body as the sync view. (rendered by JSONRenderer)
+        - only JSON is rendered, the browsable API stays on the sync views.
+        - subclass must define the coroutine retrieve(), which returns the data of the response. checked by as_view().
+        - ETag and 304 are same as conditional_response. the body is not cached.
+    """
+    http_method_names = ['post']
+    serializer_class = None
+    permission_classes = [permissions.IsAuthenticated]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # no default retrieve(), so the subclass without it fails at the url conf, not at the request.
+        assert asyncio.iscoroutinefunction(getattr(cls, 'retrieve', None)), (
+            f"'{cls.__name__}' should define `async def retrieve(self)`, which returns the data of the response.")
+        # csrf is checked by DRF's SessionAuthentication, same as APIView.
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def initial(self):
+        # APIView.initialize_request(), initial() : authentication, then permission_classes.
+        # parsers are needed by the csrf check of the session, which reads the POST.
+        self.drf_request = Request(self.request,
+                                   parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+                                   authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+                                   parser_context={'view': self, 'args': self.args, 'kwargs': self.kwargs})
+        for permission in self.permission_classes:
+            if not permission().has_permission(self.drf_request, self):
+                if self.drf_request.authenticators and not self.drf_request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+        self.request.user = self.drf_request.user
+
+    def precondition(self):
+        # initial(), then the ETag of the response. in the same thread hop, so the 304 costs no more hop.
+        self.initial()
+        self.query_validation()
+        return responses.etag(responses.key(self.request.POST.get('user_id'), self.request, JSONRenderer.media_type))
+
+    def handle_exception(self, exc):
+        # APIView.handle_exception() : 401 only if the first authenticator has the header, else 403.
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            header = self.drf_request.authenticators[0].authenticate_header(self.drf_request)
+            if header:
+                exc.auth_header = header
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+        response = exception_handler(exc, {'view': self, 'request': self.drf_request})
+        if response == None:
+            raise exc
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'} # WWW-Authenticate, Retry-After
+        return self.render(response.data, response.status_code, headers)
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, headers=headers,
+                            content_type=JSONRenderer.media_type)
+
+    def validate_args(self):
+        serializer = self.get_serializer_class()(data=self.request.POST)
+        serializer.is_valid(raise_exception=True)
+        self.args = serializer.validated_data
+        return self.args
+
+    async def avalues_rows(self, queryset):
+        keys, lookups = serializer_lookups(self.get_serializer_class())
+        return [dict(zip(keys, row)) async for row in queryset.values_list(*lookups)]
+
+    async def afetch_values(self, queryset, related_name, exist_error=None):
+        # async version of IsOwner_permission_Mixin.fetch_values()
+        keys, rows = related_values(queryset, related_name, self.get_serializer_class())
+        rows = [row async for row in rows]
+        if exist_error != None and len(rows) == 0:
+            raise exceptions.ValidationError(exist_error)
+        return [dict(zip(keys, row[1:])) for row in rows if row[0] != None]
+
+    async def post(self, request, *args, **kwargs):
+        self.drf_request = None
+        try:
+            etag = await sync_to_async(self.precondition)()
+            if responses.not_modified(self.request, etag):
+                return validated_response(HttpResponseNotModified(), etag)
+            data = await self.retrieve()
+            if responses.not_modified(self.request, etag, exists=True):
+                return validated_response(HttpResponseNotModified(), etag)
+            return validated_response(self.render(data), etag)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+class Project_RETRIEVE_project_async(Async_retrieve_View):
+    """
+    # Project_RETRIEVE_project_async
+        SECURITY LEVEL r2
+        - async version of Project_RETRIEVE_project.
+    POST params
+        - user_id
+        - project_name
+    """
+
+    def get_serializer_class(self):
+        if len(self.request.POST) == 0:
+            return serializers.Project_project
+        else:
+            return serializers.Project_all
+
+    async def retrieve(self):
+        self.query_validation()
+        return await self.afetch_values(models.Project.objects.filter(Q(project_name=self.request.POST.get('project_name'))
+                                                                      & Q(user_id = self.request.POST.get('user_id'))),
+                                        'todo_project',
+                                        exist_error='project_name must already exists in the db with correct user_id.')
+
+class Project_RETRIEVE_user_async(Async_retrieve_View):
+    """
+    # Project_RETRIEVE_user_async
+        SECURITY LEVEL r2
+        - async version of Project_RETRIEVE_user. rows are not streamed, Django 4.1 streams the sync iterator only.
+    POST params
+        - user_id
+    """
+
+    def get_serializer_class(self):
+        if len(self.request.POST) == 0:
+            return serializers.Project_user
+        else:
+            return serializers.Project_project
+
+    async def retrieve(self):
+        self.query_validation()
+        # in the id order of the model queryset. the (user_id, name) index covers the columns, and would order by the name.
+        return await self.avalues_rows(models.Project.objects.filter(user_id = self.request.POST.get("user_id")).order_by('id'))
+
+class Project_RETRIEVE_list_async(Async_retrieve_View):
+    """
+    # Project_RETRIEVE_list_async
+        SECURITY LEVEL r2
+        - async version of Project_RETRIEVE_list.
+    POST params
+        - user_id
+    """
+    serializer_class = serializers.Project_count
+
+    async def retrieve(self):
+        self.query_validation()
+        return await self.avalues_rows(models.Project.objects.filter(user_id = self.request.POST.get("user_id")).annotate(
+            todo_count = Count('todo_project')).order_by('id'))
+
+class Stamp_RETRIEVE_user_async(Async_retrieve_View):
+    """
+    # Stamp_RETRIEVE_user_async
+        SECURITY LEVEL r2
+        - async version of Stamp_RETRIEVE_user. rows are not streamed, Django 4.1 streams the sync iterator only.
+    POST params
+        - user_id
+    """
+
+    def get_serializer_class(self):
+        if len(self.request.POST) == 0:
+            return serializers.Stamp_user
+        else:
+            return serializers.Stamp_stamp
+
+    async def retrieve(self):
+        self.query_validation()
+        # in the id order of the model queryset. the (user_id, name) index covers the columns, and would order by the name.
+        return await self.avalues_rows(models.Stamp.objects.filter(user_id = self.request.POST.get("user_id")).order_by('id'))
+
+class Stamp_RETRIEVE_stamp_async(Async_retrieve_View):
+    """
+    # Stamp_RETRIEVE_stamp_async
+        SECURITY LEVEL r2
+        - async version of Stamp_RETRIEVE_stamp.
+    POST params
+        - user_id
+        - stamp_name
+    """
+
+    def get_serializer_class(self):
+        if len(self.request.POST) == 0:
+            return serializers.Stamp_stamp
+        else:
+            return serializers.Stamp_subelement
+
+    async def retrieve(self):
+        self.query_validation()
+        return await self.afetch_values(models.Stamp.objects.filter(Q(stamp_name=self.request.POST.get('stamp_name'))
+                                                                    & Q(user_id = self.request.POST.get('user_id'))),
+                                        'subelement_stamp',
+                                        exist_error='project_name must already exists in the db with correct user_id.')
+
+class Stamp_RETRIEVE_subelement_async(Async_retrieve_View):
+    """
+    # Stamp_RETRIEVE_subelement_async
+        SECURITY LEVEL r2
+        - async version of Stamp_RETRIEVE_subelement.
+    POST params
+        - user_id
+        - stamp_name
+        - subelement_name
+    """
+
+    def get_serializer_class(self):
+        if len(self.request.POST) == 0:
+            return serializers.Stamp_subelement_retrieve
+        else:
+            return serializers.Stamp_all
+
+    async def retrieve(self):
+        self.query_validation()
+        return await self.afetch_values(models.Subelement.objects.filter(Q(stamp_id__stamp_name=self.request.POST.get('stamp_name'))
+                                                                         & Q(subelement_name = self.request.POST.get('subelement_name'))
+                                                                         & Q(stamp_id__user_id = self.request.POST.get('user_id'))),
+                                        'arg_subelement',
+                                        exist_error='stamp_name and subelement_name must already exists in the db with correct user_id.')
+
+class Stamp_RETRIEVE_tree_async(Async_retrieve_View):
+    """
+    # Stamp_RETRIEVE_tree_async
+        SECURITY LEVEL r2
+        - async version of Stamp_RETRIEVE_tree.
+    POST params
+        - user_id
+        - stamp_name : (optional) retrieve only this stamp.
+    """
+    serializer_class = serializers.Stamp_tree_argsGet
+
+    async def retrieve(self):
+        self.query_validation()
+        args = self.validate_args()
+        queryset = models.Stamp.objects.filter(user_id = args['user_id'])
+        if args.get('stamp_name') != None:
+            queryset = queryset.filter(stamp_name = args['stamp_name'])
+        rows = [row async for row in stamp_tree_rows(queryset)]
+        if args.get('stamp_name') != None and len(rows) == 0:
+            raise exceptions.ValidationError('stamp_name must already exists in the db with correct user_id.')
+        return stamp_tree(args['user_id'], rows)
+
+class Main_RETRIEVE_heatmap_async(Async_retrieve_View):
+    """
+    # Main_RETRIEVE_heatmap_async
+        SECURITY LEVEL r2
+        - async version of Main_RETRIEVE_heatmap.
+    POST params
+        - user_id
+        - year : year of the grid.
+        - stamp_id : (optional) specific stamp_id.
+    """
+    serializer_class = serializers.Main_heatmap_argsGet
+
+    async def retrieve(self):
+        self.query_validation()
+        args = self.validate_args()
+        # validation of foregin key relation matching (no query if cached)
+        if args.get('stamp_id') != None:
+            try:
+                await sub.definitions.aget(args['user_id'], args['stamp_id'])
+            except (models.Stamp.DoesNotExist, ValueError, TypeError):
+                raise exceptions.ValidationError('targeted user must already have the targeted stamp.')
+        return heatmap_grid(args, [row async for row in heatmap_rows(args)])
+
+class Main_RETRIEVE_range_async(Async_retrieve_View):
+    """
+    # Main_RETRIEVE_range_async
+        SECURITY LEVEL r2
+        - async version of Main_RETRIEVE_range.
+    POST params
+        - user_id
+        - date_from, date_to : date window. (both inclusive)
+        - stamp_id : (optional) specific stamp_id.
+        - cursor : (optional) cursor of the previous page's response.
+        - limit : (optional) number of recodes per page. default 100, max 1000.
+    """
+    serializer_class = serializers.Main_range_argsGet
+
+    async def retrieve(self):
+        self.query_validation()
+        args = self.validate_args()
+        if args['date_from'] > args['date_to']:
+            raise exceptions.ValidationError('date_from cannot be later than date_to.')
+
+        headers, cursor = range_page(args, [row async for row in range_headers(args, range_cursor(args))])
+        arg_rows = []
+        stamp_names = {}
+        if len(headers) != 0:
+            arg_rows, stamp_names = range_detail_rows(args, headers)
+            arg_rows = [row async for row in arg_rows]
+            stamp_names = {id: stamp_name async for id, stamp_name in stamp_names}
+        return range_days(args, headers, cursor, stamp_names, arg_rows)
 
 #endregion
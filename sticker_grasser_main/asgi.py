@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sticker_grasser_main.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported after the setup of django_application, because restAPI needs the apps loaded.
+from restAPI.push import push_application
+
+
+async def application(scope, receive, send):
+    # api/push is the long lived SSE connection, served without the Django request cycle.
+    if scope['type'] == 'http' and scope['path'] == '/api/push':
+        return await push_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,7 +58,12 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-    ]
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+        'restAPI.tokens.Token_authentication',
+    ],
 }
 
 
@@ -100,9 +106,74 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # reuse the connection between the requests of the same worker thread. (seconds, DB_CONN_MAX_AGE overrides)
+        # 600 : WSGI servers (gunicorn, uwsgi) keep the worker threads, so their next requests skip the connect and the pragmas.
+        # runserver runs each request in a new thread, the kept connection is closed with its thread. set 0 to close it per request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        # file, not the in-memory db, so the threads of restAPI/tests.py wait on the lock like the production workers.
+        # made and destroyed by every test run and "manage.py bench", ignored by .gitignore.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# 'response' holds the rendered responses of the retrieve views. see restAPI/response_cache.py
+# MAX_ENTRIES bounds the count of the entries, 1/CULL_FREQUENCY of them is evicted when it is full.
+# LocMemCache is per process. for several worker processes, share the FileBasedCache instead :
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache' / 'response',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'response': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'response',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 5000, 'CULL_FREQUENCY': 4},
+    },
+    'session': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'session',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE = 'response'
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 # larger responses are not cached.
+
+# sessions and logged in users are read from the 'session' cache, the db only on the miss. see restAPI/auth_cache.py
+# with several worker processes, 'session' must be shared too, or the logout of one worker is not seen by the others.
+# changing the backend logs out the sessions of the old backend once.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'session'
+
+AUTHENTICATION_BACKENDS = ['restAPI.auth_cache.Cached_backend']
+
+USER_CACHE = 'session'
+USER_CACHE_TIMEOUT = 60 # seconds
+
+# tokens of api/token/login. see restAPI/tokens.py (seconds)
+TOKEN_ACCESS_MAX_AGE = 15 * 60
+TOKEN_REFRESH_MAX_AGE = 14 * 24 * 60 * 60
+
+# every password hash runs in this pool. see restAPI/hashing.py
+# WORKERS is the count of the cores the logins can take, BACKLOG the count of the waiting token logins before 429.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASH_BACKLOG = 64
+
+# maximum count of the operations of api/batch. see restAPI/batch.py
+BATCH_MAX_OPERATIONS = 100
+
+# pragmas of the sqlite connections, 'production' or 'default'. see restAPI/database.py
+# 'default' keeps sqlite's own durability : every commit is fsynced.
+# 'production' is opted in by SQLITE_PROFILE=production : WAL and synchronous=NORMAL, so the readers never wait for the writer,
+# but the last commits may be lost on power failure. the journal_mode=WAL is kept in the db file after that.
+# SQLITE_PRAGMAS = {'busy_timeout': 10000} overrides each pragma of the profile.
+
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -145,3 +216,8 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# broker of the api/push change events. see restAPI/broker.py
+# Local_broker reaches the subscribers of this process only, replace it for multi-worker setups.
+
+PUSH_BROKER = 'restAPI.broker.Local_broker'